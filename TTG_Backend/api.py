@@ -1,13 +1,18 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Depends, Header, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, ConfigDict
 from typing import List, Dict, Optional, ForwardRef, Any
 
-from game_logic import GameBoard, ComponentType, Marble
-from challenges import CHALLENGES, serialize_challenge
+from game_logic import GameBoard, ComponentType, Marble, DEFAULT_MAX_TICKS, RUN_MODE_JUMP, RUN_MODE_TICK
+from challenges import CHALLENGES, create_challenge_board, serialize_challenge
+from sessions import SessionStore, DEFAULT_MAX_SESSIONS, DEFAULT_MAX_BYTES, DEFAULT_TTL
+from history import BoardHistory, json_bytes, etag_matches
+from scheduler import TickScheduler
 import ai_manager
 from ai_manager import AIManager
 import traceback
+import os
+import asyncio
 
 # Create a single instance of AIManager
 ai_manager = AIManager()
@@ -25,8 +30,57 @@ app.add_middleware(
 
 GameBoardRef = Optional['GameBoard']
 
-# Initialize game board
-board = GameBoard(8, 8)
+# One board per client session, picked by the X-Session-Id header
+DEFAULT_SESSION = "default"
+MAX_SESSION_ID_LENGTH = 64
+sessions = SessionStore(
+    lambda: GameBoard(8, 8),
+    max_sessions=int(os.getenv("TTG_MAX_SESSIONS", DEFAULT_MAX_SESSIONS)),
+    max_bytes=int(os.getenv("TTG_MAX_SESSION_BYTES", DEFAULT_MAX_BYTES)),
+    ttl=float(os.getenv("TTG_SESSION_TTL", DEFAULT_TTL))
+)
+
+
+async def session_id(x_session_id: str = Header(DEFAULT_SESSION)) -> str:
+    """The client's session id; clients that send none share the default session"""
+    if not x_session_id or len(x_session_id) > MAX_SESSION_ID_LENGTH:
+        raise HTTPException(status_code=400, detail="Invalid X-Session-Id header")
+    return x_session_id
+
+
+async def session_board(session: str = Depends(session_id)):
+    """
+    The board of the client's session, locked for the whole request so
+    requests on one board take turns while other boards go ahead. Whatever
+    the request changed becomes a new version of the board afterwards.
+    """
+    current = sessions.session(session)
+    async with current.lock:
+        yield current.board
+        current.history.record()
+
+
+# Responses smaller than this are not worth gzipping
+GZIP_MIN_BYTES = 1024
+
+
+def cached_response(request: Request, history: BoardHistory, key, build) -> Response:
+    """
+    Serve the JSON of build() from the board's cache of the current version.
+    The version is the ETag, with a -gz suffix for the gzipped bytes, so a
+    client that already has it gets a bodyless 304; clients that accept gzip
+    get the cached gzipped bytes.
+    """
+    body = history.cached(key, build)
+    compressed = len(body) >= GZIP_MIN_BYTES and "gzip" in request.headers.get("accept-encoding", "")
+    etag = f'"{history.version}-gz"' if compressed else f'"{history.version}"'
+    headers = {"ETag": etag, "Vary": "Accept-Encoding"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if compressed:
+        body = history.cached(key, build, compressed=True)
+        headers["Content-Encoding"] = "gzip"
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 class ComponentRequest(BaseModel):
@@ -35,6 +89,10 @@ class ComponentRequest(BaseModel):
     y: int
 
 
+class ComponentBatchRequest(BaseModel):
+    components: List[ComponentRequest]
+
+
 class MarbleRequest(BaseModel):
     color: str
     x: Optional[int] = None
@@ -62,47 +120,29 @@ async def root():
 
 
 @app.get("/board/state")
-async def get_board_state():
-    """Get the current state of the board with full component details"""
-    components = []
-    for row in board.components:
-        component_row = []
-        for component in row:
-            component_row.append({
-                "type": component.type.value,
-                "is_occupied": component.is_occupied,
-                "is_gear": component.is_gear,
-                "gear_rotation": component.gear_rotation if component.is_gear else None,
-                "is_gear_bit": component.is_gear_bit,
-                "gear_bit_state": component.gear_bit_state if component.is_gear_bit else None,
-                "x": component.x,
-                "y": component.y
-            })
-        components.append(component_row)
-
-    marbles = []
-    for marble in board.marbles:
-        marbles.append({
-            "color": marble.color,
-            "x": marble.x,
-            "y": marble.y,
-            "direction": marble.direction,
-            "is_moving": marble.is_moving
-        })
-
-    return {
-        "components": components,
-        "marbles": marbles,
-        "red_marbles": board.red_marbles,
-        "blue_marbles": board.blue_marbles,
-        "active_launcher": board.active_launcher,
-        "width": board.width,
-        "height": board.height
-    }
+async def get_board_state(request: Request, since: Optional[int] = None, session: str = Depends(session_id)):
+    """
+    Get the current state of the board with full component details and its
+    version. With since, only what changed after that version (see
+    BoardHistory.since), or the full state with "full": true when that
+    version is no longer known. Both are served from the board's cache.
+    """
+    current = sessions.session(session)
+    async with current.lock:
+        history = current.history
+
+        def full_state():
+            return {"version": history.version, "full": True, **history.board.get_state(),
+                    "output": history.board.marble_output}
+
+        # Unknown versions share the full state's entry, so made-up ones cannot fill the cache
+        if since is None or not history.knows(since):
+            return cached_response(request, history, "state", full_state)
+        return cached_response(request, history, ("since", since), lambda: history.since(since) or full_state())
 
 
 @app.post("/components")
-async def add_component(component: ComponentRequest):
+async def add_component(component: ComponentRequest, board: GameBoard = Depends(session_board)):
     """Add a component to the board"""
     try:
         component_type = ComponentType(component.type)
@@ -112,8 +152,33 @@ async def add_component(component: ComponentRequest):
         raise HTTPException(status_code=400, detail="Invalid component type")
 
 
+@app.post("/components/batch")
+async def add_components(batch: ComponentBatchRequest, session: str = Depends(session_id)):
+    """
+    Add many components in one transaction: either every placement is valid
+    and all of them are added, or the board is left as it was. Returns the
+    one new version the whole batch makes.
+    """
+    current = sessions.session(session)
+    async with current.lock:
+        placements = []
+        for number, component in enumerate(batch.components):
+            try:
+                placements.append((ComponentType(component.type), component.x, component.y))
+            except ValueError:
+                raise HTTPException(status_code=400,
+                                    detail=f"Placement {number}: invalid component type {component.type!r}")
+        try:
+            current.board.add_components(placements)
+        except ValueError as error:
+            raise HTTPException(status_code=400, detail=str(error))
+        return {"message": f"Added {len(placements)} components",
+                "placed": len(placements),
+                "version": current.history.record()}
+
+
 @app.post("/marbles")
-async def add_marble(marble: MarbleRequest):
+async def add_marble(marble: MarbleRequest, board: GameBoard = Depends(session_board)):
     """Add a marble to the board"""
     if marble.x is not None and marble.y is not None:
         # Add marble at specific position
@@ -130,13 +195,13 @@ async def add_marble(marble: MarbleRequest):
 
 
 @app.get("/output")
-async def get_outputs():
+async def get_outputs(board: GameBoard = Depends(session_board)):
     """Get the marble outputs"""
     return board.get_marble_output()
 
 
 @app.post("/launcher")
-async def set_launcher(launcher_request: LauncherRequest):
+async def set_launcher(launcher_request: LauncherRequest, board: GameBoard = Depends(session_board)):
     """Set the active launcher"""
     if launcher_request.launcher not in ["left", "right"]:
         raise HTTPException(status_code=400, detail="Invalid launcher type")
@@ -145,42 +210,188 @@ async def set_launcher(launcher_request: LauncherRequest):
 
 
 @app.post("/update")
-async def update_board():
+async def update_board(board: GameBoard = Depends(session_board)):
     """Update the board state"""
     board.update_marble_positions()
     return {"message": "Board updated successfully"}
 
 
+@app.post("/run")
+async def run_board(max_ticks: int = DEFAULT_MAX_TICKS, mode: str = RUN_MODE_JUMP,
+                    board: GameBoard = Depends(session_board)):
+    """Simulate the board until no marble is moving and return the whole run"""
+    if max_ticks < 0:
+        raise HTTPException(status_code=400, detail="max_ticks must not be negative")
+    if mode not in (RUN_MODE_JUMP, RUN_MODE_TICK):
+        raise HTTPException(status_code=400, detail=f"Unknown run mode: {mode}")
+    # Run in a worker thread so requests on other boards are served meanwhile
+    return await asyncio.get_running_loop().run_in_executor(None, board.run_until_halt, max_ticks, mode)
+
+
+# Most ticks one /tick call may advance a board by
+MAX_TICK_STEPS = DEFAULT_MAX_TICKS
+
+
+@app.post("/tick")
+async def tick_board(steps: int = 1, session: str = Depends(session_id)):
+    """
+    Advance the board up to steps ticks and return, in one response, what
+    they changed (see BoardHistory.since): the changed cells, the marbles,
+    the counts and the new output, plus the ticks run and whether the board
+    halted. Replaces an /update, /board/state and /output round trip per tick.
+    """
+    if not 0 <= steps <= MAX_TICK_STEPS:
+        raise HTTPException(status_code=400, detail=f"steps must be between 0 and {MAX_TICK_STEPS}")
+    current = sessions.session(session)
+    async with current.lock:
+        history = current.history
+        # Long fast-forwards run in a worker thread like /run
+        return await asyncio.get_running_loop().run_in_executor(None, history.tick, steps)
+
+
+# Highest tick rate a stream may ask for, in ticks per second
+MAX_STREAM_RATE = 60.0
+
+# Ticks every streaming board on one timing wheel
+scheduler = TickScheduler()
+
+
+async def send_messages(websocket: WebSocket, queue: asyncio.Queue):
+    """Send the queued stream messages in order"""
+    while True:
+        await websocket.send_json(await queue.get())
+
+
+@app.websocket("/ws/simulation")
+async def simulation_stream(websocket: WebSocket, session: str = DEFAULT_SESSION):
+    """
+    Stream a running simulation instead of polling /update and /board/state.
+    The client sends {"action": "start", "rate": ticks per second} to run the
+    board of its session (the session query parameter) and {"action": "stop"}
+    to pause it. Once nothing on the board moves any more the stream sends
+    {"type": "halted"} and stops ticking; the client starts it again after
+    launching a marble.
+    """
+    if not session or len(session) > MAX_SESSION_ID_LENGTH:
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    queue: asyncio.Queue = asyncio.Queue()
+    sender = asyncio.create_task(send_messages(websocket, queue))
+    entry = None
+
+    def deliver(tick: int, frame: Dict[str, Any]):
+        nonlocal entry
+        if len(frame) > 1:
+            queue.put_nowait({"type": "frame", "tick": tick, **frame})
+        elif not frame["moving"]:
+            # Halted: an idle board should not keep its slot on the wheel
+            queue.put_nowait({"type": "halted", "tick": tick})
+            stop()
+            entry = None
+
+    def stop():
+        # Another connection of the session may have taken over its schedule
+        if entry is not None and scheduler.entries.get(session) is entry:
+            scheduler.remove(session)
+
+    try:
+        while True:
+            command = await websocket.receive_json()
+            stop()
+            entry = None
+            action = command.get("action")
+            if action == "start":
+                rate = command.get("rate", 1)
+                if not isinstance(rate, (int, float)) or not 0 < rate <= MAX_STREAM_RATE:
+                    queue.put_nowait({"type": "error", "detail": f"rate must be in (0, {MAX_STREAM_RATE}]"})
+                    continue
+                current = sessions.session(session)
+                async with current.lock:
+                    state = {**current.board.get_state(), "output": list(current.board.marble_output)}
+                queue.put_nowait({"type": "state", "tick": 0, **state})
+                entry = scheduler.add(session, rate, lambda current=current: current.board, deliver, current.lock)
+            elif action != "stop":
+                queue.put_nowait({"type": "error", "detail": f"Unknown action: {action}"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        stop()
+        sender.cancel()
+
+
+@app.get("/scheduler")
+async def get_scheduler_stats():
+    """Get the number of streaming boards, ticks run and how late they ran"""
+    return scheduler.stats()
+
+
+@app.get("/gear_groups")
+async def get_gear_groups(board: GameBoard = Depends(session_board)):
+    """Get the cells of every connected gear network"""
+    return {"gear_groups": board.get_gear_groups()}
+
+
+@app.get("/path_cache")
+async def get_path_cache_stats(board: GameBoard = Depends(session_board)):
+    """Get the size and hit/miss counters of the board's path cache"""
+    return board.path_cache.stats()
+
+
+@app.get("/sessions")
+async def get_session_stats():
+    """Get the number of live sessions, their estimated memory and eviction counters"""
+    return sessions.stats()
+
+
+@app.get("/board/lock")
+async def get_board_lock_stats(session: str = Depends(session_id)):
+    """Get the queue depth and wait time counters of the session's board lock"""
+    return sessions.lock(session).metrics.stats()
+
+
 @app.post("/reset")
-async def reset_board():
+async def reset_board(board: GameBoard = Depends(session_board)):
     """Reset the board"""
     board.reset()
     return {"message": "Board reset successfully"}
 
 
 @app.get("/counts")
-async def get_counts():
+async def get_counts(board: GameBoard = Depends(session_board)):
     """Get marble counts"""
     return board.get_marble_counts()
 
 
+# Serialized initial board of every challenge asked for so far; they never change
+challenge_boards: Dict[str, bytes] = {}
+
+
 @app.get("/challenge_id")
-async def get_challenge(challenge_id: str):
+async def get_challenge(challenge_id: str, session: str = Depends(session_id)):
     """Get a specific challenge"""
-    global board
     if not challenge_id:
         raise HTTPException(status_code=422, detail="Missing challenge_id parameter")
 
     challenge = CHALLENGES.get(challenge_id)
     if not challenge:
         raise HTTPException(status_code=404, detail="Challenge not found")
-    board = challenge["board"]
-    return {
-        "id": challenge["id"],
-        "initialBoard": serialize_challenge(challenge["board"]),
-        "red_marbles": challenge["board"].red_marbles,
-        "blue_marbles": challenge["board"].blue_marbles,
-    }
+    # A fresh copy, so playing never changes the challenge itself
+    board = create_challenge_board(challenge_id)
+    current = sessions.session(session)
+    async with current.lock:
+        sessions.put(session, board)
+        version = current.history.version
+    initial_board = challenge_boards.get(challenge_id)
+    if initial_board is None:
+        initial_board = challenge_boards[challenge_id] = json_bytes(serialize_challenge(board))
+    return Response(content=b"".join((
+        b'{"id":', json_bytes(challenge["id"]),
+        b',"version":', json_bytes(version),
+        b',"initialBoard":', initial_board,
+        b',"red_marbles":', json_bytes(board.red_marbles),
+        b',"blue_marbles":', json_bytes(board.blue_marbles), b"}"
+    )), media_type="application/json")
 
 @app.post("/ai/move")
 async def get_ai_move(request: Dict[str, Any]):
@@ -235,8 +446,16 @@ async def execute_ai_move(game_state: Dict[str, Any], challenge_id: str = None):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/debug/components")
-async def debug_components():
+async def debug_components(request: Request, session: str = Depends(session_id)):
     """Debug endpoint to check board components"""
+    current = sessions.session(session)
+    async with current.lock:
+        history = current.history
+        return cached_response(request, history, "debug_components", lambda: list_components(history.board))
+
+
+def list_components(board: GameBoard) -> List[Dict[str, Any]]:
+    """The placed parts of a board, for /debug/components"""
     components = []
     for y in range(board.height):
         for x in range(board.width):
@@ -0,0 +1,360 @@
+"""
+Compile a board into a finite-state machine over its bits.
+
+A board without marbles is a deterministic machine: its state is the
+direction of every bit and gear bit, its input is the launcher a marble
+starts from, and its output is where that marble ends up plus the bits it
+flipped on the way. compile_board walks every reachable marble path from
+both launchers once, branching whenever a path meets a bit whose state is
+not known yet, and stores the result as a decision tree per launcher.
+Running the machine is then a few tree lookups and XORs per marble.
+
+Machine states are integers with bit k set when the k-th bit cell of the
+board (in cell index order) points right, the same numbering as
+bit_parallel uses for configurations.
+
+Since the machine is deterministic, the sequence of marbles from a start
+state repeats as soon as a (state, launcher) pair comes back after a lever.
+BoardMachine.run_marbles finds that cycle with a hash map and skips whole
+periods of it, so long runs cost the prefix plus one period.
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from bit_parallel import BIT_CODES, gear_networks
+from game_logic import (GameBoard, CELL_TYPES, BIT_CELLS, DEFAULT_MAX_TICKS,
+                        CELL_BIT_LEFT, CELL_BIT_RIGHT, CELL_GEAR_BIT_LEFT, CELL_GEAR_BIT_RIGHT,
+                        CELL_LEVER_BLUE, CELL_LEVER_RED, ACTION_MOVE, ACTION_STOP, ACTION_INTERCEPT,
+                        ACTION_LEVER_BLUE, FLIP_GEARS, BLOCKED_WAIT, BLOCKED_STALL,
+                        HALT_NO_MARBLES, HALT_STALLED, HALT_MAX_TICKS, HALT_INFINITE_LOOP)
+
+MACHINE_CACHE_SIZE = 64
+# Paths that take longer are left to the board engine
+MAX_PATH_STEPS = 1024
+# Boards whose paths branch more often than this are not compiled
+MAX_LEAVES = 1 << 16
+
+# Leaf outcomes besides the ACTION_* codes of the cell that ended the path
+OUTCOME_RETURNED = -1  # blocked everywhere: back to its count and off the board
+OUTCOME_WAIT = -2  # blocked on a ramp for good: waits until the tick budget is used up
+OUTCOME_UNRESOLVED = -3  # longer than MAX_PATH_STEPS
+OUTCOME_LOOP = -4  # came back to a cell, direction and bit state it had already been in: moves forever
+
+# Entry cell and direction of the marble each launcher drops, as in GameBoard.launch_marble
+LAUNCHES = {"left": (5, "right", "blue"), "right": (9, "left", "red")}
+
+# Cell layout without bit states: every bit is stored pointing left
+_LAYOUT = bytes({CELL_BIT_RIGHT: CELL_BIT_LEFT, CELL_GEAR_BIT_RIGHT: CELL_GEAR_BIT_LEFT}.get(code, code)
+                for code in range(256))
+
+_machines: OrderedDict = OrderedDict()
+
+
+class BoardMachine:
+    """
+    Decision trees of every marble path of one board layout.
+    A tree node is (bit position, subtree if left, subtree if right); a leaf
+    is (-1, steps, outcome, exit cell index, exit direction, flipped bits mask).
+    """
+
+    def __init__(self, board: GameBoard):
+        self.width = board.width
+        self.height = board.height
+        self.layout = bytes(board.cells.translate(_LAYOUT))
+        self.bit_indices: Tuple[int, ...] = tuple(index for index, code in enumerate(self.layout)
+                                                  if code in BIT_CELLS)
+        self.leaves = 0
+        self._positions = {index: position for position, index in enumerate(self.bit_indices)}
+        self._networks = gear_networks(board)
+        self._transitions = board.transitions
+        self._edges = board.edges
+        self.entries = {launcher: self._walk(start, direction, 0, 0, 0, 0, set())
+                        for launcher, (start, direction, _) in LAUNCHES.items()}
+        # A marble on a lever next to a launcher blocks the first step of the
+        # marble it launches; runs through such levers are left to the board
+        self.unsafe_levers = frozenset(
+            index for index, code in enumerate(self.layout)
+            if code in (CELL_LEVER_BLUE, CELL_LEVER_RED) and any(
+                index // self.width <= 1 and abs(index % self.width - start) <= 1
+                for start, _, _ in LAUNCHES.values()))
+
+    def _walk(self, index: int, direction: str, steps: int, known: int, values: int, flips: int,
+              seen: set) -> tuple:
+        """
+        Follow a marble from a cell; known marks the bits whose starting state
+        this path already assumed (given in values), flips the bits it flipped
+        and seen holds the (cell, direction, flips) it has been in
+        """
+        layout = self.layout
+        edges = self._edges
+        transitions = self._transitions
+        while True:
+            if steps >= MAX_PATH_STEPS:
+                return self._leaf(steps, OUTCOME_UNRESOLVED, index, direction, flips)
+            code = layout[index]
+            codes = BIT_CODES.get(code)
+            if codes is not None:
+                position = self._positions[index]
+                bit = 1 << position
+                if not known & bit:
+                    # The path depends on a bit it has not seen yet: branch on it
+                    return (position,
+                            self._walk(index, direction, steps, known | bit, values, flips, set(seen)),
+                            self._walk(index, direction, steps, known | bit, values | bit, flips, seen))
+                code = codes[(values ^ flips) >> position & 1]
+            key = (index, direction, flips)
+            if key in seen:
+                return self._leaf(steps, OUTCOME_LOOP, index, direction, flips)
+            seen.add(key)
+
+            rules = transitions[code]
+            try:
+                action, effect, moves, blocked = rules[direction]
+            except KeyError:
+                action, effect, moves, blocked = rules[None]
+            steps += 1
+
+            if action != ACTION_MOVE:
+                return self._leaf(steps, action, index, direction, flips)
+            if effect is not None:
+                direction, flip = effect
+                for flipped in (self._networks[index] if flip == FLIP_GEARS else (index,)):
+                    flips ^= 1 << self._positions[flipped]
+            edge = edges[index]
+            for delta, _, _, mask, move_direction in moves:
+                if not edge & mask:
+                    index += delta
+                    if move_direction is not None:
+                        direction = move_direction
+                    break
+            else:
+                if blocked == BLOCKED_WAIT:
+                    return self._leaf(steps, OUTCOME_WAIT, index, direction, flips)
+                if blocked == BLOCKED_STALL:
+                    return self._leaf(steps, ACTION_STOP, index, direction, flips)
+                return self._leaf(steps, OUTCOME_RETURNED, index, direction, flips)
+
+    def _leaf(self, steps: int, outcome: int, index: int, direction: str, flips: int) -> tuple:
+        self.leaves += 1
+        if self.leaves > MAX_LEAVES:
+            raise ValueError("The board has too many distinct marble paths to compile")
+        return (-1, steps, outcome, index, direction, flips)
+
+    def path(self, launcher: str, state: int) -> tuple:
+        """The leaf a marble from the launcher reaches in the given state"""
+        node = self.entries[launcher]
+        while node[0] >= 0:
+            node = node[2] if state >> node[0] & 1 else node[1]
+        return node
+
+    def state_of(self, board: GameBoard) -> int:
+        """Machine state of a board with this layout"""
+        state = 0
+        for position, index in enumerate(self.bit_indices):
+            if board.cells[index] in (CELL_BIT_RIGHT, CELL_GEAR_BIT_RIGHT):
+                state |= 1 << position
+        return state
+
+    def board_for(self, state: int, red: int, blue: int) -> GameBoard:
+        """A fresh board with this layout in the given state"""
+        board = GameBoard(red, blue, self.width, self.height)
+        board.cells[:] = self.layout
+        for position, index in enumerate(self.bit_indices):
+            if state >> position & 1:
+                board.cells[index] = BIT_CODES[self.layout[index]][1]
+        board.layout_changed()
+        board.machine = self
+        return board
+
+    def bit_states(self, state: int) -> list:
+        """Bits of a state in the format of GameBoard.get_bit_states"""
+        bits = []
+        for position, index in enumerate(self.bit_indices):
+            y, x = divmod(index, self.width)
+            code = BIT_CODES[self.layout[index]][state >> position & 1]
+            bits.append({"x": x, "y": y, "type": CELL_TYPES[code].value})
+        return bits
+
+    def run(self, state: int, launcher: str = "left", red: int = 8, blue: int = 8,
+            max_ticks: int = DEFAULT_MAX_TICKS) -> Dict[str, Any]:
+        """
+        Start a run from the launcher in the given state and simulate it to
+        completion with table lookups. Returns the same result as GameBoard.run
+        on board_for(state, red, blue); the final state is in "state".
+        """
+        start = (state, launcher, red, blue)
+        ticks = 0
+        output = []
+        color = LAUNCHES[launcher][2]
+        # The first step of a marble launched by a lever happens in the lever's tick
+        same_tick = 0
+        if (red if color == "red" else blue) > 0:
+            while True:
+                _, steps, outcome, index, _, flips = self.path(launcher, state)
+                steps -= same_tick
+                if outcome in (OUTCOME_UNRESOLVED, OUTCOME_LOOP) or steps > max_ticks - ticks:
+                    return self._run_on_board(*start, max_ticks)
+                ticks += steps
+                state ^= flips
+                if outcome == ACTION_STOP:
+                    halt_reason = HALT_STALLED
+                    break
+                if outcome == OUTCOME_WAIT:
+                    ticks = max_ticks
+                    halt_reason = HALT_MAX_TICKS
+                    break
+                halt_reason = HALT_NO_MARBLES
+                change = 1 if outcome == OUTCOME_RETURNED else -1
+                if color == "red":
+                    red += change
+                else:
+                    blue += change
+                if outcome == OUTCOME_RETURNED or outcome == ACTION_INTERCEPT:
+                    break
+
+                # Lever: record the output and launch the next marble
+                if index in self.unsafe_levers:
+                    return self._run_on_board(*start, max_ticks)
+                output.append(color)
+                launcher = "left" if outcome == ACTION_LEVER_BLUE else "right"
+                color = LAUNCHES[launcher][2]
+                if (red if color == "red" else blue) <= 0 or index == LAUNCHES[launcher][0]:
+                    break
+                same_tick = 1
+        else:
+            halt_reason = HALT_NO_MARBLES
+
+        return {
+            "output": output,
+            "ticks": ticks,
+            "bits": self.bit_states(state),
+            "halt_reason": halt_reason,
+            "red_marbles": red,
+            "blue_marbles": blue,
+            "state": state
+        }
+
+    def run_marbles(self, state: int, launcher: str = "left", red: int = 8, blue: int = 8,
+                    marbles: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Run marble by marble without a tick budget, stopping after `marbles`
+        marbles if given. After every lever the (state, launcher) pair is
+        looked up in a hash map; counts only decide when the run ends, so a
+        repeated pair means the marbles from there on repeat with a fixed
+        period. Whole periods are then skipped while the counts last.
+        Returns the final "state", "launcher", counts, "ticks", "marbles"
+        launched and "halt_reason" (None when stopped after `marbles`). The
+        output is "output_length" colors long: "output_prefix" followed by
+        "output_cycle" repeated, cut to length. "cycle" is None or
+        {"prefix", "period", "ticks", "red", "blue"} with the marbles before
+        the cycle and the marbles, ticks and red and blue marbles per period.
+        """
+        ticks = 0
+        launched = 0
+        output = []
+        cycle = None
+        skipped = 0
+        halt_reason = None
+        # (state, launcher) after each lever -> (marbles launched, ticks, red, blue) at that point
+        history: Dict[Tuple[int, str], Tuple[int, int, int, int]] = {}
+        same_tick = 0
+        while marbles is None or launched < marbles:
+            color = LAUNCHES[launcher][2]
+            if (red if color == "red" else blue) <= 0:
+                halt_reason = HALT_NO_MARBLES
+                break
+            _, steps, outcome, index, _, flips = self.path(launcher, state)
+            if outcome == OUTCOME_UNRESOLVED or index in self.unsafe_levers:
+                raise ValueError("The run leaves the paths the machine covers")
+            launched += 1
+            if outcome == OUTCOME_LOOP or outcome == OUTCOME_WAIT:
+                # The marble never comes to rest: report the state it started in
+                halt_reason = HALT_INFINITE_LOOP
+                break
+            ticks += steps - same_tick
+            state ^= flips
+            if outcome == ACTION_STOP:
+                halt_reason = HALT_STALLED
+                break
+            change = 1 if outcome == OUTCOME_RETURNED else -1
+            if color == "red":
+                red += change
+            else:
+                blue += change
+            if outcome == OUTCOME_RETURNED or outcome == ACTION_INTERCEPT:
+                halt_reason = HALT_NO_MARBLES
+                break
+
+            output.append(color)
+            launcher = "left" if outcome == ACTION_LEVER_BLUE else "right"
+            if index == LAUNCHES[launcher][0]:
+                halt_reason = HALT_NO_MARBLES
+                break
+            same_tick = 1
+            if cycle is not None:
+                continue
+            key = (state, launcher)
+            seen = history.get(key)
+            if seen is None:
+                history[key] = (launched, ticks, red, blue)
+                continue
+
+            prefix, prefix_ticks, prefix_red, prefix_blue = seen
+            cycle = {"prefix": prefix, "period": launched - prefix, "ticks": ticks - prefix_ticks,
+                     "red": prefix_red - red, "blue": prefix_blue - blue}
+            # Skip whole periods while the counts cover every marble of them;
+            # every marble of a period reaches a lever, so each uses up one
+            skip = None if marbles is None else (marbles - launched) // cycle["period"]
+            for count, used in ((red, cycle["red"]), (blue, cycle["blue"])):
+                if used and (skip is None or count // used < skip):
+                    skip = count // used
+            launched += skip * cycle["period"]
+            ticks += skip * cycle["ticks"]
+            red -= skip * cycle["red"]
+            blue -= skip * cycle["blue"]
+            skipped = skip * cycle["period"]
+
+        if cycle is None:
+            output_prefix, output_cycle = output, []
+        else:
+            output_prefix = output[:cycle["prefix"]]
+            output_cycle = output[cycle["prefix"]:cycle["prefix"] + cycle["period"]]
+        return {
+            "state": state,
+            "launcher": launcher,
+            "ticks": ticks,
+            "marbles": launched,
+            "halt_reason": halt_reason,
+            "red_marbles": red,
+            "blue_marbles": blue,
+            "output_length": len(output) + skipped,
+            "output_prefix": output_prefix,
+            "output_cycle": output_cycle,
+            "cycle": cycle
+        }
+
+    def _run_on_board(self, state: int, launcher: str, red: int, blue: int, max_ticks: int) -> Dict[str, Any]:
+        """Fall back to the board engine for runs the tables do not cover"""
+        board = self.board_for(state, red, blue)
+        result = board.run(launcher, max_ticks)
+        result["state"] = self.state_of(board)
+        return result
+
+
+def compile_board(board: GameBoard) -> BoardMachine:
+    """
+    The machine of a board's layout. Machines are cached per layout, and the
+    board keeps its machine until add_component or reset change the layout.
+    """
+    machine = board.machine
+    if machine is None:
+        key = (board.width, board.height, bytes(board.cells.translate(_LAYOUT)))
+        machine = _machines.get(key)
+        if machine is None:
+            machine = _machines[key] = BoardMachine(board)
+            if len(_machines) > MACHINE_CACHE_SIZE:
+                _machines.popitem(last=False)
+        else:
+            _machines.move_to_end(key)
+        board.machine = machine
+    return machine
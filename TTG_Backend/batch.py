@@ -0,0 +1,102 @@
+"""
+Batch simulation of many challenge submissions across worker processes.
+
+Jobs are grouped per challenge into chunks. Each chunk carries the compact
+board image of its challenge once plus the part placements of its jobs, so
+workers only rebuild boards and run them headlessly.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from challenges import challenge_image
+from game_logic import GameBoard, ComponentType, CELL_CODES, CELL_TYPES, DEFAULT_MAX_TICKS
+
+DEFAULT_CHUNK_SIZE = 32
+
+# Placement as shipped to the workers: (cell code, x, y)
+PackedPlacement = Tuple[int, int, int]
+
+
+def pack_placements(placements: Iterable[Any]) -> Tuple[PackedPlacement, ...]:
+    """
+    Convert placements given as {"type", "x", "y"} dicts or (type, x, y) tuples
+    into (cell code, x, y) tuples. Types may be ComponentType members or values.
+    """
+    packed = []
+    for placement in placements:
+        if isinstance(placement, dict):
+            component_type, x, y = placement["type"], placement["x"], placement["y"]
+        else:
+            component_type, x, y = placement
+        packed.append((CELL_CODES[ComponentType(component_type)], int(x), int(y)))
+    return tuple(packed)
+
+
+def run_chunk(chunk: tuple) -> List[Tuple[int, Dict[str, Any]]]:
+    """Run every job of a chunk; returns (job index, run result) pairs"""
+    image, launcher, max_ticks, jobs = chunk
+    results = []
+    for index, placements in jobs:
+        board = GameBoard.from_image(image)
+        for code, x, y in placements:
+            board.add_component(CELL_TYPES[code], x, y)
+        results.append((index, board.run(launcher, max_ticks)))
+    return results
+
+
+def make_chunks(challenge_ids: Iterable[str], placements: Iterable[Iterable[Any]],
+                launcher: str, max_ticks: int, chunk_size: int) -> Iterator[tuple]:
+    """Group jobs per challenge into chunks of at most chunk_size jobs"""
+    images: Dict[str, tuple] = {}
+    pending: Dict[str, list] = {}
+    for index, (challenge_id, parts) in enumerate(zip(challenge_ids, placements)):
+        if challenge_id not in images:
+            images[challenge_id] = challenge_image(challenge_id)
+            pending[challenge_id] = []
+        jobs = pending[challenge_id]
+        jobs.append((index, pack_placements(parts)))
+        if len(jobs) >= chunk_size:
+            yield images[challenge_id], launcher, max_ticks, tuple(jobs)
+            jobs.clear()
+    for challenge_id, jobs in pending.items():
+        if jobs:
+            yield images[challenge_id], launcher, max_ticks, tuple(jobs)
+
+
+def simulate_batch(challenge_ids: Iterable[str], placements: Iterable[Iterable[Any]],
+                   launcher: str = "left", max_ticks: int = DEFAULT_MAX_TICKS,
+                   workers: Optional[int] = None,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Run one headless simulation per (challenge id, placements) pair: the parts
+    are added to a fresh board of the challenge, which is then run from the
+    launcher as GameBoard.run does.
+    Yields (job index, run result) pairs as soon as their chunk finishes, so
+    results arrive out of order. workers defaults to the CPU count; with a
+    single worker the jobs run in this process.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    chunks = make_chunks(challenge_ids, placements, launcher, max_ticks, chunk_size)
+
+    if workers <= 1:
+        for chunk in chunks:
+            yield from run_chunk(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Keep a couple of chunks queued per worker instead of submitting everything
+        running = set()
+        for chunk in chunks:
+            running.add(pool.submit(run_chunk, chunk))
+            if len(running) >= 2 * workers:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+        while running:
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
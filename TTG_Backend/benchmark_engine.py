@@ -0,0 +1,485 @@
+"""
+Micro-benchmarks for the simulation engine.
+
+Run with ``python benchmark_engine.py``. Every number is produced from the
+challenge boards in ``challenges.py`` so results stay comparable between
+engine changes.
+"""
+import asyncio
+import contextlib
+import copy
+import functools
+import io
+import json
+import os
+import time
+import tracemalloc
+
+import challenges
+from automaton import compile_board
+from batch import simulate_batch
+from bit_parallel import evaluate_bit_configurations
+from game_logic import GameBoard, Component, Marble, ComponentType, BIT_CELLS, RUN_MODE_JUMP, RUN_MODE_TICK
+from history import BoardHistory, json_bytes
+from scheduler import TickScheduler
+from sessions import SessionStore
+
+try:
+    from vector_engine import LockstepSimulator
+except ImportError:  # NumPy is not installed
+    LockstepSimulator = None
+
+STARTS = [("left", "blue"), ("right", "red")]
+MAX_TICKS = 3000
+
+
+def challenge_factories():
+    """Return (challenge id, board factory) pairs for every challenge"""
+    return [(challenge_id, functools.partial(challenges.create_challenge_board, challenge_id))
+            for challenge_id in challenges.CHALLENGE_BOARDS]
+
+
+def step_to_halt(board: GameBoard, launcher: str, color: str) -> int:
+    """Launch one marble and tick until nothing moves; returns the tick count"""
+    board.set_active_launcher(launcher)
+    board.launch_marble(color)
+    ticks = 0
+    moving = any(marble.is_moving for marble in board.marbles)
+    while moving and ticks < MAX_TICKS:
+        moving = board.update_marble_positions()
+        ticks += 1
+    return ticks
+
+
+def bench_tick_throughput(rounds: int = 20) -> float:
+    """Ticks per second of update_marble_positions over all challenges"""
+    factories = challenge_factories()
+    total_ticks = 0
+    elapsed = 0.0
+    for _ in range(rounds):
+        for _, factory in factories:
+            for launcher, color in STARTS:
+                board = factory()
+                start = time.perf_counter()
+                total_ticks += step_to_halt(board, launcher, color)
+                elapsed += time.perf_counter() - start
+    return total_ticks / elapsed
+
+
+def record_moves() -> list:
+    """(from cell, to cell) of every marble step in tick runs of all challenges"""
+    moves = []
+    for _, factory in challenge_factories():
+        for launcher, color in STARTS:
+            board = factory()
+            board.set_active_launcher(launcher)
+            board.launch_marble(color)
+            for _ in range(MAX_TICKS):
+                before = {id(marble): marble.y * board.width + marble.x for marble in board.marbles}
+                moving = board.update_marble_positions()
+                for marble in board.marbles:
+                    index = marble.y * board.width + marble.x
+                    if id(marble) in before and before[id(marble)] != index:
+                        moves.append((before[id(marble)], index))
+                if not moving:
+                    break
+    return moves
+
+
+def bench_occupancy(rounds: int = 20) -> tuple:
+    """
+    Nanoseconds per collision check and move as update_marble_positions does
+    them on the occupancy bytearray, and the same with an int bitset
+    """
+    moves = record_moves() * rounds
+    occupied = bytearray(15 * 17)
+    start = time.perf_counter()
+    for old, new in moves:
+        if not occupied[new]:
+            occupied[old] = 0
+            occupied[new] = 1
+    packed = (time.perf_counter() - start) / len(moves) * 1e9
+    bits = 0
+    start = time.perf_counter()
+    for old, new in moves:
+        if not bits >> new & 1:
+            bits = bits & ~(1 << old) | 1 << new
+    bitset = (time.perf_counter() - start) / len(moves) * 1e9
+    return packed, bitset
+
+
+def bench_full_runs(rounds: int = 20, mode: str = RUN_MODE_JUMP) -> float:
+    """Complete challenge runs per second through the headless GameBoard.run"""
+    factories = challenge_factories()
+    runs = 0
+    elapsed = 0.0
+    for _ in range(rounds):
+        for _, factory in factories:
+            for launcher, _ in STARTS:
+                board = factory()
+                start = time.perf_counter()
+                board.run(launcher, MAX_TICKS, mode)
+                elapsed += time.perf_counter() - start
+                runs += 1
+    return runs / elapsed
+
+
+def bench_repeated_runs(repeats: int = 20) -> float:
+    """
+    Runs per second when every challenge board is run again and again, so
+    the path cache can answer paths seen on earlier runs
+    """
+    runs = 0
+    elapsed = 0.0
+    for _, factory in challenge_factories():
+        for launcher, _ in STARTS:
+            board = factory()
+            red, blue = board.red_marbles, board.blue_marbles
+            start = time.perf_counter()
+            for _ in range(repeats):
+                board.set_number_of_marbles(red, blue)
+                board.marble_output = []
+                board.run(launcher, MAX_TICKS)
+                runs += 1
+            elapsed += time.perf_counter() - start
+    return runs / elapsed
+
+
+def bench_batch(workers: int, jobs: int = 2000) -> float:
+    """Headless runs per second through simulate_batch with the given worker count"""
+    challenge_ids = [challenge_id for challenge_id, _ in challenge_factories()]
+    ids = [challenge_ids[job % len(challenge_ids)] for job in range(jobs)]
+    start = time.perf_counter()
+    for _ in simulate_batch(ids, [()] * jobs, max_ticks=MAX_TICKS, workers=workers):
+        pass
+    return jobs / (time.perf_counter() - start)
+
+
+def lockstep_boards(count: int) -> list:
+    """count variants of challenge 3, each with one extra ramp, launched from the left"""
+    boards = []
+    for variant in range(count):
+        board = challenges.create_challenge_board("3")
+        board.add_component(ComponentType.RAMP_LEFT if variant % 2 else ComponentType.RAMP_RIGHT,
+                            2 + variant % 11, 5 + variant // 11 % 8)
+        board.set_active_launcher("left")
+        board.launch_marble("blue")
+        boards.append(board)
+    return boards
+
+
+def bench_lockstep(count: int = 2000) -> tuple:
+    """Boards run to halt per second: scalar tick loop vs LockstepSimulator"""
+    boards = lockstep_boards(count)
+    start = time.perf_counter()
+    simulator = LockstepSimulator(boards)
+    simulator.run(MAX_TICKS)
+    vector = count / (time.perf_counter() - start)
+
+    boards = lockstep_boards(count)
+    start = time.perf_counter()
+    for board in boards:
+        moving = 1
+        ticks = 0
+        while moving and ticks < MAX_TICKS:
+            moving = board.update_marble_positions()
+            ticks += 1
+    scalar = count / (time.perf_counter() - start)
+    return scalar, vector
+
+
+def bench_bit_configurations(challenge_id: str = "27") -> tuple:
+    """
+    Milliseconds to run a challenge for every starting configuration of its
+    bits: one GameBoard run per configuration vs one bit-parallel pass
+    """
+    board = challenges.create_challenge_board(challenge_id)
+    bits = [index for index, code in enumerate(board.cells) if code in BIT_CELLS]
+    image = board.to_image()
+    start = time.perf_counter()
+    for configuration in range(1 << len(bits)):
+        copy = GameBoard.from_image(image)
+        for position, index in enumerate(bits):
+            if configuration >> position & 1:
+                copy.components[index // copy.width][index % copy.width].type = ComponentType.BIT_RIGHT
+        copy.run("left", MAX_TICKS)
+    scalar = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    evaluate_bit_configurations(board, "left", MAX_TICKS)
+    parallel = (time.perf_counter() - start) * 1000
+    return scalar, parallel
+
+
+def bench_machine_runs(rounds: int = 20) -> float:
+    """Complete challenge runs per second through the compiled machine of each board"""
+    boards = [factory() for _, factory in challenge_factories()]
+    machines = [(compile_board(board), board) for board in boards]
+    runs = 0
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for machine, board in machines:
+            for launcher, _ in STARTS:
+                machine.run(machine.state_of(board), launcher, board.red_marbles, board.blue_marbles, MAX_TICKS)
+                runs += 1
+    return runs / (time.perf_counter() - start)
+
+
+def bench_long_runs(marbles: int = 2000, challenge_id: str = "27") -> tuple:
+    """
+    Milliseconds to run a challenge with `marbles` marbles of each color,
+    on the board and through the cycle-skipping run of its machine
+    """
+    board = challenges.create_challenge_board(challenge_id)
+    machine = compile_board(board)
+    state = machine.state_of(board)
+    board.set_number_of_marbles(marbles, marbles)
+    start = time.perf_counter()
+    board.run("left", marbles * 100)
+    scalar = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    machine.run_marbles(state, "left", marbles, marbles)
+    cycles = (time.perf_counter() - start) * 1000
+    return scalar, cycles
+
+
+def bench_gear_flips(count: int = 2000) -> float:
+    """Microseconds to flip a gear network that fills most of the board"""
+    board = GameBoard(8, 8)
+    for y in range(3, 12):
+        for x in range(1, 14):
+            board.add_component(ComponentType.GEAR_BIT_LEFT if (x + y) % 3 == 0 else ComponentType.GEAR, x, y)
+    start = time.perf_counter()
+    for _ in range(count):
+        board.flip_gears(5, 5)
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def bench_snapshots(count: int = 2000) -> tuple:
+    """Microseconds to snapshot and restore a board mid-run, with snapshot/restore and with deepcopy"""
+    board = challenges.create_challenge_board("8")
+    board.run("left", 40)
+    start = time.perf_counter()
+    for _ in range(count):
+        board.restore(board.snapshot())
+    register = (time.perf_counter() - start) / count * 1e6
+    start = time.perf_counter()
+    for _ in range(count // 10):
+        copy.deepcopy(board)
+    deep = (time.perf_counter() - start) / (count // 10) * 1e6
+    return register, deep
+
+
+def bench_forks(count: int = 10000) -> tuple:
+    """Microseconds and traced bytes per fork of a challenge board"""
+    board = challenges.create_challenge_board("8")
+    start = time.perf_counter()
+    for _ in range(count):
+        board.fork()
+    elapsed = (time.perf_counter() - start) / count * 1e6
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    forks = [board.fork() for _ in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del forks
+    return elapsed, (after - before) / count
+
+
+def bench_bytes_per_board(count: int = 1000) -> float:
+    """Average traced allocation size of a freshly constructed board"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    boards = [GameBoard(8, 8) for _ in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del boards
+    return (after - before) / count
+
+
+def traced_bytes(factory, count: int = 1000) -> float:
+    """Average traced allocation size of the objects factory() creates"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [factory() for _ in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return (after - before) / count
+
+
+def bench_session_memory() -> dict:
+    """
+    Bytes per component, marble and live session, where a session is a
+    challenge board in the middle of a run, and how many sessions fit in 1 GB
+    """
+    def session():
+        board = challenges.create_challenge_board("8")
+        board.run("left", 40)
+        return board
+
+    template = session()
+    session_bytes = traced_bytes(template.fork)
+    return {
+        "component": traced_bytes(lambda: Component(ComponentType.GEAR_BIT_LEFT, 3, 4), 10000),
+        "marble": traced_bytes(lambda: Marble("blue", 5, 0, "right"), 10000),
+        "session": session_bytes,
+        "sessions_per_gb": 2 ** 30 / session_bytes
+    }
+
+
+def bench_stream_bytes(challenge_id: str = "30", ticks: int = 200) -> tuple:
+    """
+    Bytes sent per tick to a player watching a run: polling (POST /update,
+    GET /board/state and GET /output every tick) against the frames of the
+    /ws/simulation stream, which skips ticks where nothing changed
+    """
+    board = challenges.create_challenge_board(challenge_id)
+    board.set_active_launcher("left")
+    board.launch_marble("blue")
+    polled = streamed = 0
+    for tick in range(1, ticks + 1):
+        frame = board.step_frame()
+        polled += len(json.dumps({"message": "Board updated successfully"}))
+        polled += len(json.dumps(board.get_state())) + len(json.dumps(board.get_marble_output()))
+        if len(frame) > 1:
+            streamed += len(json.dumps({"type": "frame", "tick": tick, **frame}))
+    return polled / ticks, streamed / ticks
+
+
+def bench_scheduler(boards: int = 500, rate: float = 20, seconds: float = 2.0) -> dict:
+    """
+    Animate `boards` challenge boards at `rate` ticks per second each on one
+    TickScheduler; returns the scheduler stats with the ticks per second reached
+    """
+    scheduler = TickScheduler()
+    store = SessionStore(lambda: None)
+    factories = challenge_factories()
+
+    async def main():
+        for index in range(boards):
+            board = factories[index % len(factories)][1]()
+            board.set_active_launcher("left")
+            board.launch_marble("blue")
+            store.put(str(index), board)
+            scheduler.add(index, rate, functools.partial(store.get, str(index)),
+                          lambda tick, frame: None, store.lock(str(index)))
+        await asyncio.sleep(seconds)
+        for index in range(boards):
+            scheduler.remove(index)
+        await scheduler.task
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        asyncio.run(main())
+    stats = scheduler.stats()
+    stats["ticks_per_second"] = stats["ticks"] / seconds
+    return stats
+
+
+def bench_state_polls(challenge_id: str = "30", ticks: int = 200) -> dict:
+    """
+    Microseconds and bytes per /board/state poll after every tick of a run:
+    the full state against the delta since the previous poll
+    """
+    board = challenges.create_challenge_board(challenge_id)
+    history = BoardHistory(board)
+    board.set_active_launcher("left")
+    board.launch_marble("blue")
+    version = history.record()
+    full_time = delta_time = full_bytes = delta_bytes = 0.0
+    for _ in range(ticks):
+        board.update_marble_positions()
+        start = time.perf_counter()
+        state = board.get_state()
+        middle = time.perf_counter()
+        delta = history.since(version)
+        full_time += middle - start
+        delta_time += time.perf_counter() - middle
+        version = delta["version"]
+        full_bytes += len(json.dumps(state))
+        delta_bytes += len(json.dumps(delta))
+    return {"full_us": full_time / ticks * 1e6, "delta_us": delta_time / ticks * 1e6,
+            "full_bytes": full_bytes / ticks, "delta_bytes": delta_bytes / ticks}
+
+
+def bench_cached_state(challenge_id: str = "30", count: int = 200) -> dict:
+    """
+    Microseconds to build and encode the full state of an unchanged board
+    against serving it from the board's cache, and its size plain and gzipped
+    """
+    board = challenges.create_challenge_board(challenge_id)
+    history = BoardHistory(board)
+    start = time.perf_counter()
+    for _ in range(count):
+        body = json_bytes(board.get_state())
+    built = (time.perf_counter() - start) / count * 1e6
+    history.cached("state", board.get_state)
+    start = time.perf_counter()
+    for _ in range(count):
+        history.cached("state", board.get_state)
+    cached = (time.perf_counter() - start) / count * 1e6
+    return {"built_us": built, "cached_us": cached, "bytes": len(body),
+            "gzip_bytes": len(history.cached("state", board.get_state, compressed=True))}
+
+
+def bench_construction(count: int = 2000) -> float:
+    """Microseconds to construct one board"""
+    start = time.perf_counter()
+    for _ in range(count):
+        GameBoard(8, 8)
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def main():
+    print(f"tick throughput:     {bench_tick_throughput():>12,.0f} ticks/s")
+    packed, bitset = bench_occupancy()
+    print(f"occupancy, bytes:    {packed:>12,.1f} ns/move")
+    print(f"occupancy, int bits: {bitset:>12,.1f} ns/move")
+    print(f"full runs (tick):    {bench_full_runs(mode=RUN_MODE_TICK):>12,.0f} runs/s")
+    print(f"full runs (jump):    {bench_full_runs(mode=RUN_MODE_JUMP):>12,.0f} runs/s")
+    print(f"compiled machine:    {bench_machine_runs():>12,.0f} runs/s")
+    print(f"repeated runs:       {bench_repeated_runs():>12,.0f} runs/s")
+    cores = os.cpu_count() or 1
+    print(f"batch, 1 worker:     {bench_batch(1):>12,.0f} runs/s")
+    print(f"batch, {cores:>2} workers:   {bench_batch(cores):>12,.0f} runs/s")
+    if LockstepSimulator is not None:
+        scalar, vector = bench_lockstep()
+        print(f"lockstep, scalar:    {scalar:>12,.0f} boards/s")
+        print(f"lockstep, NumPy:     {vector:>12,.0f} boards/s")
+    scalar, parallel = bench_bit_configurations()
+    print(f"all 2^9 bits, runs:  {scalar:>12,.1f} ms")
+    print(f"all 2^9 bits, lanes: {parallel:>12,.1f} ms")
+    scalar, cycles = bench_long_runs()
+    print(f"2000 marbles, board: {scalar:>12,.1f} ms")
+    print(f"2000 marbles, cycle: {cycles:>12,.3f} ms")
+    print(f"gear network flip:   {bench_gear_flips():>12,.2f} us")
+    register, deep = bench_snapshots()
+    print(f"snapshot + restore:  {register:>12,.2f} us")
+    print(f"deepcopy:            {deep:>12,.2f} us")
+    print(f"bytes per board:     {bench_bytes_per_board():>12,.0f} B")
+    memory = bench_session_memory()
+    print(f"bytes per component: {memory['component']:>12,.0f} B")
+    print(f"bytes per marble:    {memory['marble']:>12,.0f} B")
+    print(f"bytes per session:   {memory['session']:>12,.0f} B")
+    print(f"sessions per GB:     {memory['sessions_per_gb']:>12,.0f}")
+    fork_time, fork_bytes = bench_forks()
+    print(f"fork:                {fork_time:>12,.1f} us")
+    print(f"bytes per fork:      {fork_bytes:>12,.0f} B")
+    print(f"board construction:  {bench_construction():>12,.1f} us")
+    scheduled = bench_scheduler()
+    print(f"scheduler, 500x20/s: {scheduled['ticks_per_second']:>12,.0f} ticks/s")
+    print(f"scheduler, mean lag: {scheduled['mean_lag_seconds'] * 1e3:>12,.2f} ms")
+    print(f"scheduler, max lag:  {scheduled['max_lag_seconds'] * 1e3:>12,.2f} ms")
+    polls = bench_state_polls()
+    print(f"state poll, full:    {polls['full_us']:>12,.1f} us {polls['full_bytes']:>8,.0f} B")
+    print(f"state poll, since:   {polls['delta_us']:>12,.1f} us {polls['delta_bytes']:>8,.0f} B")
+    state = bench_cached_state()
+    print(f"state, built:        {state['built_us']:>12,.1f} us {state['bytes']:>8,.0f} B")
+    print(f"state, cached:       {state['cached_us']:>12,.1f} us {state['gzip_bytes']:>8,.0f} B gzipped")
+    polled, streamed = bench_stream_bytes()
+    print(f"polling, per tick:   {polled:>12,.0f} B")
+    print(f"stream, per tick:    {streamed:>12,.0f} B")
+
+
+if __name__ == "__main__":
+    main()
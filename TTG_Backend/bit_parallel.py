@@ -0,0 +1,225 @@
+"""
+Bit-parallel evaluation of a board over every starting configuration of its bits.
+
+Each configuration is one lane of a machine word: lane i of a word holds
+configuration base + i. The state of every bit and gear bit is a lane mask
+(set where the bit points right) and the marble is tracked per group of
+lanes that share its position, direction, counts and output. A marble on a
+bit splits its group with a bitwise select on the bit's lane mask and flips
+the bit in those lanes with an XOR, so a single pass over the board answers
+for all 2^k configurations at once. Results are the same as GameBoard.run
+on a board set to each configuration.
+"""
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from game_logic import (GameBoard, CELL_TYPES, BIT_CELLS, DEFAULT_MAX_TICKS,
+                        CELL_BIT_LEFT, CELL_BIT_RIGHT, CELL_GEAR_BIT_LEFT, CELL_GEAR_BIT_RIGHT,
+                        ACTION_MOVE, ACTION_STOP, ACTION_INTERCEPT, ACTION_LEVER_BLUE,
+                        FLIP_GEARS, BLOCKED_WAIT, BLOCKED_STALL,
+                        HALT_NO_MARBLES, HALT_STALLED, HALT_MAX_TICKS)
+
+WORD_SIZE = 64
+
+# Cell code of a bit cell for each state (False = left, True = right)
+BIT_CODES = {
+    CELL_BIT_LEFT: (CELL_BIT_LEFT, CELL_BIT_RIGHT),
+    CELL_BIT_RIGHT: (CELL_BIT_LEFT, CELL_BIT_RIGHT),
+    CELL_GEAR_BIT_LEFT: (CELL_GEAR_BIT_LEFT, CELL_GEAR_BIT_RIGHT),
+    CELL_GEAR_BIT_RIGHT: (CELL_GEAR_BIT_LEFT, CELL_GEAR_BIT_RIGHT),
+}
+_RIGHT_CODES = (CELL_BIT_RIGHT, CELL_GEAR_BIT_RIGHT)
+
+
+def gear_networks(board: GameBoard) -> Dict[int, Tuple[int, ...]]:
+    """Bit cells flipped by flip_gears for every gear cell, as cell indices"""
+    return {index: group[1] for index, group in board.gear_groups.items()}
+
+
+def evaluate_word(board: GameBoard, launcher: str, configurations: Sequence[int], bit_indices: Sequence[int],
+                  max_ticks: int = DEFAULT_MAX_TICKS,
+                  accept: Optional[Callable[[Tuple[str, ...]], bool]] = None) -> List[Dict[str, Any]]:
+    """
+    Run the board once for a word of configurations, one lane each.
+    Bit j of a configuration sets bit_indices[j] to right (1) or left (0).
+    With accept, lanes whose output so far is rejected stop early and are
+    reported with halt_reason "rejected".
+    Returns the run result of every lane, in the order of configurations.
+    """
+    cells = board.cells
+    width = board.width
+    edges = board.edges
+    transitions = board.transitions
+    networks = gear_networks(board)
+    lanes = len(configurations)
+    all_lanes = (1 << lanes) - 1
+
+    # Lane masks of the bits pointing right
+    right = {index: all_lanes if cells[index] in _RIGHT_CODES else 0
+             for index, code in enumerate(cells) if code in BIT_CELLS}
+    for position, index in enumerate(bit_indices):
+        mask = 0
+        for lane, configuration in enumerate(configurations):
+            if configuration >> position & 1:
+                mask |= 1 << lane
+        right[index] = mask
+
+    results: List[Optional[Dict[str, Any]]] = [None] * lanes
+
+    def finish(mask: int, ticks: int, halt_reason: str, red: int, blue: int, output: tuple) -> None:
+        while mask:
+            lowest = mask & -mask
+            results[lowest.bit_length() - 1] = {
+                "output": list(output), "ticks": ticks, "halt_reason": halt_reason,
+                "red_marbles": red, "blue_marbles": blue
+            }
+            mask ^= lowest
+
+    # Marble groups: (cell index, direction, color, red, blue, output, lever cell) -> lanes.
+    # The lever cell stays blocked during the first step of a marble it launched.
+    groups: Dict[tuple, int] = {}
+    red, blue = board.red_marbles, board.blue_marbles
+    color = "blue" if launcher == "left" else "red"
+    if (red if color == "red" else blue) > 0:
+        start = 5 if launcher == "left" else 9
+        groups[(start, "right" if launcher == "left" else "left", color, red, blue, (), -1)] = all_lanes
+    else:
+        finish(all_lanes, 0, HALT_NO_MARBLES, red, blue, ())
+
+    ticks = 0
+    while groups and ticks < max_ticks:
+        ticks += 1
+        pending = groups
+        groups = {}
+        while pending:
+            launched: Dict[tuple, int] = {}
+            for (index, direction, color, red, blue, output, lever), mask in pending.items():
+                code = cells[index]
+                if code in BIT_CODES:
+                    # Bitwise select: the lanes where the bit points right and the others
+                    left_code, right_code = BIT_CODES[code]
+                    state = right[index]
+                    splits = ((mask & ~state, left_code), (mask & state, right_code))
+                else:
+                    splits = ((mask, code),)
+
+                for lanes_mask, lane_code in splits:
+                    if not lanes_mask:
+                        continue
+                    rules = transitions[lane_code]
+                    try:
+                        action, effect, moves, blocked = rules[direction]
+                    except KeyError:
+                        action, effect, moves, blocked = rules[None]
+
+                    if action == ACTION_MOVE:
+                        lane_direction = direction
+                        if effect is not None:
+                            lane_direction, flip = effect
+                            for flipped in (networks[index] if flip == FLIP_GEARS else (index,)):
+                                right[flipped] ^= lanes_mask
+                        edge = edges[index]
+                        for delta, dx, dy, edge_mask, move_direction in moves:
+                            if not edge & edge_mask and index + delta != lever:
+                                key = (index + delta, move_direction or lane_direction, color, red, blue, output, -1)
+                                groups[key] = groups.get(key, 0) | lanes_mask
+                                break
+                        else:
+                            if blocked == BLOCKED_WAIT:
+                                if lever < 0:
+                                    # Nothing else moves, so the marble waits for the rest of the run
+                                    finish(lanes_mask, max_ticks, HALT_MAX_TICKS, red, blue, output)
+                                else:
+                                    key = (index, lane_direction, color, red, blue, output, -1)
+                                    groups[key] = groups.get(key, 0) | lanes_mask
+                            elif blocked == BLOCKED_STALL:
+                                finish(lanes_mask, ticks, HALT_STALLED, red, blue, output)
+                            else:
+                                # Returned to its count
+                                lane_red, lane_blue = (red + 1, blue) if color == "red" else (red, blue + 1)
+                                finish(lanes_mask, ticks, HALT_NO_MARBLES, lane_red, lane_blue, output)
+                        continue
+
+                    if action == ACTION_STOP:
+                        finish(lanes_mask, ticks, HALT_STALLED, red, blue, output)
+                        continue
+
+                    lane_red, lane_blue = (red - 1, blue) if color == "red" else (red, blue - 1)
+                    if action == ACTION_INTERCEPT:
+                        finish(lanes_mask, ticks, HALT_NO_MARBLES, lane_red, lane_blue, output)
+                        continue
+
+                    lane_output = output + (color,)
+                    if accept is not None and not accept(lane_output):
+                        finish(lanes_mask, ticks, "rejected", lane_red, lane_blue, lane_output)
+                        continue
+                    next_color = "blue" if action == ACTION_LEVER_BLUE else "red"
+                    start = 5 if next_color == "blue" else 9
+                    if (lane_red if next_color == "red" else lane_blue) > 0 and start != index:
+                        key = (start, "right" if next_color == "blue" else "left", next_color,
+                               lane_red, lane_blue, lane_output, index)
+                        launched[key] = launched.get(key, 0) | lanes_mask
+                    else:
+                        finish(lanes_mask, ticks, HALT_NO_MARBLES, lane_red, lane_blue, lane_output)
+            # Marbles launched by a lever take their first step in the same tick
+            pending = launched
+
+    for (index, direction, color, red, blue, output, lever), mask in groups.items():
+        finish(mask, ticks, HALT_MAX_TICKS, red, blue, output)
+
+    # Final bit states of every lane, in the format of GameBoard.get_bit_states
+    for lane, result in enumerate(results):
+        bits = []
+        for index, mask in right.items():
+            y, x = divmod(index, width)
+            bits.append({"x": x, "y": y, "type": CELL_TYPES[BIT_CODES[cells[index]][mask >> lane & 1]].value})
+        result["bits"] = bits
+    return results
+
+
+def evaluate_bit_configurations(board: GameBoard, launcher: str = "left", max_ticks: int = DEFAULT_MAX_TICKS,
+                                bit_cells: Optional[Sequence[Tuple[int, int]]] = None,
+                                word_size: int = WORD_SIZE,
+                                accept: Optional[Callable[[Tuple[str, ...]], bool]] = None) -> List[Dict[str, Any]]:
+    """
+    Run the board from the launcher for all 2^k starting configurations of its
+    bits, word_size configurations per pass. bit_cells lists the (x, y) bits
+    to vary (default: every bit and gear bit on the board); configuration c
+    sets the j-th of them to right when bit j of c is set.
+    Returns the run result of each configuration, indexed by configuration.
+    """
+    if board.marbles:
+        raise ValueError("The board must not hold any marbles")
+    if word_size < 1:
+        raise ValueError("word_size must be at least 1")
+    if bit_cells is None:
+        bit_indices = [index for index, code in enumerate(board.cells) if code in BIT_CELLS]
+    else:
+        bit_indices = [y * board.width + x for x, y in bit_cells]
+        if any(board.cells[index] not in BIT_CELLS for index in bit_indices):
+            raise ValueError("bit_cells must point at bits or gear bits")
+
+    count = 1 << len(bit_indices)
+    results = []
+    for base in range(0, count, word_size):
+        configurations = range(base, min(base + word_size, count))
+        results.extend(evaluate_word(board, launcher, configurations, bit_indices, max_ticks, accept))
+    return results
+
+
+def verify_all_configurations(board: GameBoard, expected_output: Sequence[str], launcher: str = "left",
+                              max_ticks: int = DEFAULT_MAX_TICKS,
+                              bit_cells: Optional[Sequence[Tuple[int, int]]] = None,
+                              word_size: int = WORD_SIZE) -> List[int]:
+    """
+    Check that the board produces expected_output for every starting
+    configuration of its bits. Returns the failing configurations, so an
+    empty list means the board works for every start state.
+    """
+    expected = tuple(expected_output)
+
+    def accept(output: Tuple[str, ...]) -> bool:
+        return output == expected[:len(output)]
+
+    results = evaluate_bit_configurations(board, launcher, max_ticks, bit_cells, word_size, accept)
+    return [configuration for configuration, result in enumerate(results)
+            if tuple(result["output"]) != expected]
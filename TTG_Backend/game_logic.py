@@ -1,5 +1,8 @@
-from typing import List, Tuple, Optional, Dict
+from typing import List, Tuple, Optional, Dict, Any
 #import numpy as np
+import random
+import re
+from collections import OrderedDict
 from enum import Enum
 
 
@@ -27,19 +30,352 @@ class ComponentType(Enum):
     GEAR_BIT_RIGHT = "gear_bit_right" # Right gear bit
 
 
+# Packed cell codes: the board stores one byte per cell instead of a Component
+# object. Codes follow the declaration order of ComponentType.
+CELL_TYPES: Tuple[ComponentType, ...] = tuple(ComponentType)
+CELL_CODES: Dict[ComponentType, int] = {component_type: code for code, component_type in enumerate(CELL_TYPES)}
+
+CELL_EMPTY = CELL_CODES[ComponentType.EMPTY]
+CELL_RAMP_LEFT = CELL_CODES[ComponentType.RAMP_LEFT]
+CELL_RAMP_RIGHT = CELL_CODES[ComponentType.RAMP_RIGHT]
+CELL_CROSSOVER = CELL_CODES[ComponentType.CROSSOVER]
+CELL_INTERCEPTOR = CELL_CODES[ComponentType.INTERCEPTOR]
+CELL_LAUNCHER = CELL_CODES[ComponentType.LAUNCHER]
+CELL_BIT_LEFT = CELL_CODES[ComponentType.BIT_LEFT]
+CELL_BIT_RIGHT = CELL_CODES[ComponentType.BIT_RIGHT]
+CELL_BORDER_VERTICAL = CELL_CODES[ComponentType.BORDER_VERTICAL]
+CELL_BORDER_HORIZONTAL = CELL_CODES[ComponentType.BORDER_HORIZONTAL]
+CELL_BORDER_DIAGONAL_LEFT = CELL_CODES[ComponentType.BORDER_DIAGONAL_LEFT]
+CELL_BORDER_DIAGONAL_RIGHT = CELL_CODES[ComponentType.BORDER_DIAGONAL_RIGHT]
+CELL_CORNER_LEFT = CELL_CODES[ComponentType.CORNER_LEFT]
+CELL_CORNER_RIGHT = CELL_CODES[ComponentType.CORNER_RIGHT]
+CELL_INVALID = CELL_CODES[ComponentType.INVALID]
+CELL_GRAY_SPACE = CELL_CODES[ComponentType.GRAY_SPACE]
+CELL_LEVER_BLUE = CELL_CODES[ComponentType.LEVER_BLUE]
+CELL_LEVER_RED = CELL_CODES[ComponentType.LEVER_RED]
+CELL_GEAR = CELL_CODES[ComponentType.GEAR]
+CELL_GEAR_BIT_LEFT = CELL_CODES[ComponentType.GEAR_BIT_LEFT]
+CELL_GEAR_BIT_RIGHT = CELL_CODES[ComponentType.GEAR_BIT_RIGHT]
+
+BORDER_CELLS = frozenset([
+    CELL_BORDER_VERTICAL,
+    CELL_BORDER_HORIZONTAL,
+    CELL_BORDER_DIAGONAL_LEFT,
+    CELL_BORDER_DIAGONAL_RIGHT,
+    CELL_CORNER_LEFT,
+    CELL_CORNER_RIGHT
+])
+GEAR_CELLS = frozenset([CELL_GEAR, CELL_GEAR_BIT_LEFT, CELL_GEAR_BIT_RIGHT])
+BIT_CELLS = frozenset([CELL_BIT_LEFT, CELL_BIT_RIGHT, CELL_GEAR_BIT_LEFT, CELL_GEAR_BIT_RIGHT])
+# Cells of the base layout that parts may be placed on
+_OPEN_CELLS = frozenset([CELL_EMPTY, CELL_GRAY_SPACE])
+
+# Headless runs
+DEFAULT_MAX_TICKS = 10000
+HALT_NO_MARBLES = "no_marbles"  # every marble reached a lever, interceptor or left the board
+HALT_STALLED = "stalled"  # marbles remain on the board but none of them can move
+HALT_MAX_TICKS = "max_ticks"  # the tick budget ran out while marbles were still moving
+HALT_INFINITE_LOOP = "infinite_loop"  # a marble never stops moving or waits for good (automaton.run_marbles)
+RUN_MODE_JUMP = "jump"  # follow a lone marble along its whole path at once
+RUN_MODE_TICK = "tick"  # advance the whole board one tick at a time
+
+# Path cache: whole marble paths remembered per board, keyed by entry cell,
+# direction and the state of every bit and gear bit
+PATH_CACHE_SIZE = 1024
+# bytearray.translate tables: the code a bit flips to, and the kind of each
+# cell so that bits and gears can be found with one regex over the board
+_KIND_BIT_LEFT, _KIND_BIT_RIGHT, _KIND_GEAR, _KIND_GEAR_BIT_LEFT, _KIND_GEAR_BIT_RIGHT = range(1, 6)
+_CELL_KINDS = bytes(
+    {CELL_BIT_LEFT: _KIND_BIT_LEFT, CELL_BIT_RIGHT: _KIND_BIT_RIGHT, CELL_GEAR: _KIND_GEAR,
+     CELL_GEAR_BIT_LEFT: _KIND_GEAR_BIT_LEFT, CELL_GEAR_BIT_RIGHT: _KIND_GEAR_BIT_RIGHT}.get(code, 0)
+    for code in range(256)
+)
+_CELL_KIND_PATTERN = re.compile(b"[\x01-\x05]")
+_FLIPPED_BITS = bytes(
+    {CELL_BIT_LEFT: CELL_BIT_RIGHT, CELL_BIT_RIGHT: CELL_BIT_LEFT,
+     CELL_GEAR_BIT_LEFT: CELL_GEAR_BIT_RIGHT, CELL_GEAR_BIT_RIGHT: CELL_GEAR_BIT_LEFT}.get(code, code)
+    for code in range(256)
+)
+
+
+# Transition table: transition_table(width)[cell code][marble direction] is a rule
+# (action, effect, moves, blocked).
+#   action     what the cell does with the marble
+#   effect     None, or (direction, flip) applied as soon as the marble is on the
+#              cell: the marble turns to direction and the cell turns into the
+#              flip code, or flips its connected gear network for FLIP_GEARS
+#   moves      candidate steps (index delta, dx, dy, edge mask, direction after
+#              moving or None), tried in order; a step is off the board when the
+#              edge flags of the current cell intersect its edge mask
+#   blocked    what happens when every candidate cell is occupied or off the board
+# The None direction key holds the rule for directions the cell does not know.
+ACTION_MOVE = 0
+ACTION_STOP = 1
+ACTION_INTERCEPT = 2
+ACTION_LEVER_BLUE = 3
+ACTION_LEVER_RED = 4
+
+FLIP_GEARS = -1
+
+BLOCKED_WAIT = 0  # keep moving and try again next tick
+BLOCKED_STALL = 1  # stop where it is and stay on the board
+BLOCKED_RETURN = 2  # stop, return the marble to its color count and remove it
+
+# follow_marble outcome for a marble returned to its count (see BLOCKED_RETURN)
+_OUTCOME_RETURNED = -1
+
+EDGE_LEFT = 1
+EDGE_RIGHT = 2
+EDGE_TOP = 4
+EDGE_BOTTOM = 8
+
+DIRECTIONS = ("left", "right", "up", "down")
+
+_SIDE_STEPS = {
+    "left": ((-1, 0, None), (-1, 1, None)),
+    "right": ((1, 0, None), (1, 1, None)),
+}
+_FALL_STEPS = {
+    "left": ((0, 1, None), (-1, 0, None), (-1, 1, None)),
+    "right": ((0, 1, None), (1, 0, None), (1, 1, None)),
+    "up": ((0, 1, None), (0, -1, None)),
+    "down": ((0, 1, None),),
+    None: ((0, 1, None),),
+}
+
+_transition_tables: Dict[int, list] = {}
+_edge_flags: Dict[Tuple[int, int], bytes] = {}
+_zobrist_keys: Dict[int, Tuple[int, ...]] = {}
+_base_layouts: Dict[Tuple[int, int], bytes] = {}
+
+
+def _moves(width: int, steps: tuple) -> tuple:
+    """Resolve (dx, dy, direction) steps into index deltas and edge masks"""
+    moves = []
+    for dx, dy, direction in steps:
+        mask = ((EDGE_LEFT if dx < 0 else 0) | (EDGE_RIGHT if dx > 0 else 0) |
+                (EDGE_TOP if dy < 0 else 0) | (EDGE_BOTTOM if dy > 0 else 0))
+        moves.append((dy * width + dx, dx, dy, mask, direction))
+    return tuple(moves)
+
+
+def _same_rule(rule: tuple) -> Dict[Optional[str], tuple]:
+    """Rule that does not depend on the marble direction"""
+    return {direction: rule for direction in DIRECTIONS + (None,)}
+
+
+def build_transition_table(width: int) -> List[Dict[Optional[str], tuple]]:
+    """Build the (cell code, marble direction) -> rule table for a board width"""
+    side = {direction: _moves(width, steps) for direction, steps in _SIDE_STEPS.items()}
+
+    # Empty, invalid, gray spaces, launchers and gears: fall, then roll sideways
+    fall = {direction: (ACTION_MOVE, None, _moves(width, _FALL_STEPS[direction]),
+                        BLOCKED_RETURN if direction is not None else BLOCKED_WAIT)
+            for direction in DIRECTIONS + (None,)}
+    table = [fall] * len(CELL_TYPES)
+
+    table[CELL_RAMP_LEFT] = _same_rule((ACTION_MOVE, None, _moves(width, ((-1, 1, "left"),)), BLOCKED_WAIT))
+    table[CELL_RAMP_RIGHT] = _same_rule((ACTION_MOVE, None, _moves(width, ((1, 1, "right"),)), BLOCKED_WAIT))
+    table[CELL_BIT_LEFT] = _same_rule((ACTION_MOVE, ("right", CELL_BIT_RIGHT), side["right"], BLOCKED_STALL))
+    table[CELL_BIT_RIGHT] = _same_rule((ACTION_MOVE, ("left", CELL_BIT_LEFT), side["left"], BLOCKED_STALL))
+    table[CELL_GEAR_BIT_LEFT] = _same_rule((ACTION_MOVE, ("right", FLIP_GEARS), side["right"], BLOCKED_STALL))
+    table[CELL_GEAR_BIT_RIGHT] = _same_rule((ACTION_MOVE, ("left", FLIP_GEARS), side["left"], BLOCKED_STALL))
+    # Crossovers keep the marble going the way it came; anything but left goes right
+    table[CELL_CROSSOVER] = {
+        direction: (ACTION_MOVE, None, side["left" if direction == "left" else "right"], BLOCKED_STALL)
+        for direction in DIRECTIONS + (None,)
+    }
+    table[CELL_INTERCEPTOR] = _same_rule((ACTION_INTERCEPT, None, (), BLOCKED_STALL))
+    table[CELL_LEVER_BLUE] = _same_rule((ACTION_LEVER_BLUE, None, (), BLOCKED_STALL))
+    table[CELL_LEVER_RED] = _same_rule((ACTION_LEVER_RED, None, (), BLOCKED_STALL))
+    for code in BORDER_CELLS:
+        table[code] = _same_rule((ACTION_STOP, None, (), BLOCKED_STALL))
+    return table
+
+
+def transition_table(width: int) -> List[Dict[Optional[str], tuple]]:
+    """Shared transition table for boards of the given width"""
+    table = _transition_tables.get(width)
+    if table is None:
+        table = _transition_tables[width] = build_transition_table(width)
+    return table
+
+
+def edge_flags(width: int, height: int) -> bytes:
+    """EDGE_* flags of every cell, indexed y * width + x"""
+    flags = _edge_flags.get((width, height))
+    if flags is None:
+        flags = bytes(
+            (EDGE_LEFT if x == 0 else 0) | (EDGE_RIGHT if x == width - 1 else 0) |
+            (EDGE_TOP if y == 0 else 0) | (EDGE_BOTTOM if y == height - 1 else 0)
+            for y in range(height) for x in range(width)
+        )
+        _edge_flags[(width, height)] = flags
+    return flags
+
+
+def zobrist_keys(size: int) -> Tuple[int, ...]:
+    """One fixed random 64-bit key per cell of a board with size cells"""
+    keys = _zobrist_keys.get(size)
+    if keys is None:
+        rng = random.Random(size)
+        keys = _zobrist_keys[size] = tuple(rng.getrandbits(64) for _ in range(size))
+    return keys
+
+
 class Component:
+    __slots__ = ("type", "x", "y", "is_occupied", "gear_rotation", "gear_bit_state")
+
     def __init__(self, type: ComponentType, x: int, y: int):
         self.type = type
         self.x = x
         self.y = y
         self.is_occupied = False
         # Gear properties - simplified
-        self.is_gear = type == ComponentType.GEAR
-        self.is_gear_bit = type == ComponentType.GEAR_BIT_LEFT or type == ComponentType.GEAR_BIT_RIGHT
         self.gear_rotation = 0  # 0, 90, 180, 270 degrees
         self.gear_bit_state = False  # False = 0, True = 1
 
+    @property
+    def is_gear(self) -> bool:
+        return self.type == ComponentType.GEAR
+
+    @property
+    def is_gear_bit(self) -> bool:
+        return self.type == ComponentType.GEAR_BIT_LEFT or self.type == ComponentType.GEAR_BIT_RIGHT
+
+
+class ComponentView:
+    """
+    Live view of one packed board cell with the attribute API of Component.
+    Reads and writes go straight to the board arrays.
+    """
+    __slots__ = ("board", "x", "y", "index")
+
+    def __init__(self, board: "GameBoard", x: int, y: int):
+        self.board = board
+        self.x = x
+        self.y = y
+        self.index = y * board.width + x
+
+    @property
+    def type(self) -> ComponentType:
+        return CELL_TYPES[self.board.cells[self.index]]
+
+    @type.setter
+    def type(self, value: ComponentType) -> None:
+        self.board.cells[self.index] = CELL_CODES[value]
+        self.board.layout_changed()
+
+    @property
+    def is_occupied(self) -> bool:
+        return bool(self.board.occupied[self.index])
+
+    @is_occupied.setter
+    def is_occupied(self, value: bool) -> None:
+        self.board.occupied[self.index] = 1 if value else 0
+
+    @property
+    def is_gear(self) -> bool:
+        return self.board.cells[self.index] == CELL_GEAR
+
+    @property
+    def is_gear_bit(self) -> bool:
+        code = self.board.cells[self.index]
+        return code == CELL_GEAR_BIT_LEFT or code == CELL_GEAR_BIT_RIGHT
+
+    @property
+    def gear_rotation(self) -> int:
+        return self.board.gear_rotations.get(self.index, 0)
+
+    @gear_rotation.setter
+    def gear_rotation(self, value: int) -> None:
+        if value:
+            self.board.gear_rotations[self.index] = value
+        else:
+            self.board.gear_rotations.pop(self.index, None)
+
+    @property
+    def gear_bit_state(self) -> bool:
+        return self.board.gear_bit_states.get(self.index, False)
+
+    @gear_bit_state.setter
+    def gear_bit_state(self, value: bool) -> None:
+        if value:
+            self.board.gear_bit_states[self.index] = True
+        else:
+            self.board.gear_bit_states.pop(self.index, None)
+
+
+def _cell_state(component: ComponentView) -> Dict[str, Any]:
+    return {
+        "type": component.type.value,
+        "is_occupied": component.is_occupied,
+        "is_gear": component.is_gear,
+        "gear_rotation": component.gear_rotation if component.is_gear else None,
+        "is_gear_bit": component.is_gear_bit,
+        "gear_bit_state": component.gear_bit_state if component.is_gear_bit else None,
+        "x": component.x,
+        "y": component.y
+    }
+
+
+class ComponentRow:
+    """One row of the components[y][x] compatibility view"""
+    __slots__ = ("board", "y")
+
+    def __init__(self, board: "GameBoard", y: int):
+        self.board = board
+        self.y = y
+
+    def __len__(self) -> int:
+        return self.board.width
+
+    def __getitem__(self, x: int) -> ComponentView:
+        if x < 0:
+            x += self.board.width
+        if not 0 <= x < self.board.width:
+            raise IndexError("component index out of range")
+        return ComponentView(self.board, x, self.y)
+
+    def __setitem__(self, x: int, component: Component) -> None:
+        view = self[x]
+        view.type = component.type
+        view.is_occupied = component.is_occupied
+        view.gear_rotation = component.gear_rotation
+        view.gear_bit_state = component.gear_bit_state
+
+    def __iter__(self):
+        for x in range(self.board.width):
+            yield ComponentView(self.board, x, self.y)
+
+
+class ComponentGrid:
+    """
+    Compatibility layer exposing the packed cells as board.components[y][x].
+    """
+    __slots__ = ("board",)
+
+    def __init__(self, board: "GameBoard"):
+        self.board = board
+
+    def __len__(self) -> int:
+        return self.board.height
+
+    def __getitem__(self, y: int) -> ComponentRow:
+        if y < 0:
+            y += self.board.height
+        if not 0 <= y < self.board.height:
+            raise IndexError("component index out of range")
+        return ComponentRow(self.board, y)
+
+    def __iter__(self):
+        for y in range(self.board.height):
+            yield ComponentRow(self.board, y)
+
+
 class Marble:
+    __slots__ = ("color", "x", "y", "direction", "is_moving")
+
     def __init__(self, color: str, x: int, y: int, direction: str):
         self.color = color
         self.x = x
@@ -48,11 +384,92 @@ class Marble:
         self.is_moving = True
 
 
+class PathCache:
+    """
+    Bounded LRU cache of whole marble paths on one board.
+    Keys are (entry cell index, direction, state) where state is the board's
+    bit register. Values are (steps, outcome, exit
+    cell index, exit x, exit y, exit direction, flipped cell indices); the
+    flipped cells are the XOR mask the path applies to the state.
+    """
+    __slots__ = ("maxsize", "entries", "hits", "misses", "evictions")
+
+    def __init__(self, maxsize: int = PATH_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: tuple) -> Optional[tuple]:
+        """Look up a path and mark it as recently used"""
+        path = self.entries.get(key)
+        if path is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return path
+
+    def put(self, key: tuple, path: tuple) -> None:
+        """Store a path, evicting the least recently used one when full"""
+        self.entries[key] = path
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Forget every path; the counters keep running"""
+        self.entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Size and hit/miss/eviction counters"""
+        return {
+            "size": len(self.entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+
 class GameBoard:
+    __slots__ = ("width", "height", "cells", "occupied", "gear_rotations", "gear_bit_states", "components",
+                 "transitions", "edges", "zobrist", "bit_cells", "bit_register", "bit_hash", "gear_groups",
+                 "path_cache", "machine", "marbles", "active_launcher", "red_marbles", "blue_marbles",
+                 "initial_red", "initial_blue", "marble_output")
+
     def __init__(self, red: int, blue: int, width: int = 15, height: int = 17):
         self.width = width
         self.height = height
-        self.components: List[List[Component]] = []
+        # Packed board: one type code and one occupancy flag per cell, indexed y * width + x.
+        # Occupancy stays a bytearray rather than an int bitset: Python ints are
+        # immutable, so every move would build a new int (see bench_occupancy)
+        self.cells = bytearray(width * height)
+        self.occupied = bytearray(width * height)
+        # Sparse per-cell gear attributes; missing entries mean 0 / False
+        self.gear_rotations: Dict[int, int] = {}
+        self.gear_bit_states: Dict[int, bool] = {}
+        self.components = ComponentGrid(self)
+        # Shared, read-only engine tables for this board geometry
+        self.transitions = transition_table(width)
+        self.edges = edge_flags(width, height)
+        self.zobrist = zobrist_keys(width * height)
+        # Bit register: bit i is set while cell i is a bit or gear bit pointing
+        # right, and bit_hash XORs the Zobrist keys of those cells. Both follow
+        # every flip the engine makes; code writing bits into cells directly
+        # calls layout_changed to recount them
+        self.bit_cells: Tuple[int, ...] = ()
+        self.bit_register = 0
+        self.bit_hash = 0
+        # Gear groups: every gear and gear bit cell -> its connected network as
+        # (gear cells, gear bit cells, register mask, Zobrist XOR of the bits)
+        self.gear_groups: Dict[int, tuple] = {}
+        # Derived from the cell layout and replaced by layout_changed: cached
+        # marble paths and the compiled machine of automaton.compile_board.
+        # Forks share them with their board until either layout changes
+        self.path_cache = PathCache()
+        self.machine = None
         self.marbles: List[Marble] = []
         self.active_launcher = "left"
         self.red_marbles = red
@@ -68,13 +485,20 @@ class GameBoard:
         self.blue_marbles = blue
 
     def initialize_board(self) -> None:
-        """Initialize the board with empty components"""
-        self.components = [[Component(ComponentType.EMPTY, x, y)
-                            for x in range(self.width)]
-                           for y in range(self.height)]
+        """Initialize the board with a copy of the static layout: borders, invalid spaces, levers and launchers"""
+        self.cells[:] = base_layout(self.width, self.height)
+        self.occupied[:] = bytes(self.width * self.height)
+        self.gear_rotations.clear()
+        self.gear_bit_states.clear()
+        self.layout_changed()
+
+    def set_cell(self, x: int, y: int, type: ComponentType) -> None:
+        """Write a component type into the packed cell array"""
+        self.cells[y * self.width + x] = CELL_CODES[type]
 
-        # Set up borders and invalid spaces
-        self.setup_board_structure()
+    def get_cell(self, x: int, y: int) -> ComponentType:
+        """Read the component type of a cell from the packed cell array"""
+        return CELL_TYPES[self.cells[y * self.width + x]]
 
     def setup_board_structure(self) -> None:
         """Set up the board structure with borders and invalid spaces"""
@@ -84,82 +508,82 @@ class GameBoard:
 
         # Set vertical borders
         for y in range(self.height):
-            self.components[y][0].type = ComponentType.BORDER_VERTICAL
-            self.components[y][14].type = ComponentType.BORDER_VERTICAL
+            self.set_cell(0, y, ComponentType.BORDER_VERTICAL)
+            self.set_cell(14, y, ComponentType.BORDER_VERTICAL)
 
         # Set horizontal border (last row)
         for x in range(self.width):
-            self.components[16][x].type = ComponentType.BORDER_HORIZONTAL
+            self.set_cell(x, 16, ComponentType.BORDER_HORIZONTAL)
 
         # Add levers at the bottom
-        self.components[14][6].type = ComponentType.LEVER_BLUE
-        self.components[14][5].type = ComponentType.LEVER_BLUE
-        self.components[14][3].type = ComponentType.LEVER_BLUE
-        self.components[14][8].type = ComponentType.LEVER_RED
-        self.components[14][9].type = ComponentType.LEVER_RED
-        self.components[14][11].type = ComponentType.LEVER_RED
+        self.set_cell(6, 14, ComponentType.LEVER_BLUE)
+        self.set_cell(5, 14, ComponentType.LEVER_BLUE)
+        self.set_cell(3, 14, ComponentType.LEVER_BLUE)
+        self.set_cell(8, 14, ComponentType.LEVER_RED)
+        self.set_cell(9, 14, ComponentType.LEVER_RED)
+        self.set_cell(11, 14, ComponentType.LEVER_RED)
 
         # Add corners
-        self.components[16][0].type = ComponentType.CORNER_LEFT
-        self.components[16][14].type = ComponentType.CORNER_RIGHT
+        self.set_cell(0, 16, ComponentType.CORNER_LEFT)
+        self.set_cell(14, 16, ComponentType.CORNER_RIGHT)
 
         # Add launchers at the top
-        self.components[2][5].type = ComponentType.LAUNCHER  # Left launcher
-        self.components[2][9].type = ComponentType.LAUNCHER  # Right launcher
+        self.set_cell(5, 2, ComponentType.LAUNCHER)  # Left launcher
+        self.set_cell(9, 2, ComponentType.LAUNCHER)  # Right launcher
 
         for y in range (1, self.width-1):
-            self.components[13][y].type = ComponentType.INVALID
+            self.set_cell(y, 13, ComponentType.INVALID)
 
-        self.components[13][7].type = ComponentType.EMPTY
-        self.components[14][7].type = ComponentType.INVALID
-        self.components[15][7].type = ComponentType.INVALID
+        self.set_cell(7, 13, ComponentType.EMPTY)
+        self.set_cell(7, 14, ComponentType.INVALID)
+        self.set_cell(7, 15, ComponentType.INVALID)
 
     def setup_diamond_pattern(self) -> None:
         """Set up the diamond pattern of invalid spaces"""
         # Row 1 (index 0)
         for x in range(1, self.width - 1):
             if x == 1 or (3 <= x <= 11) or x == 13:
-                self.components[0][x].type = ComponentType.INVALID
+                self.set_cell(x, 0, ComponentType.INVALID)
             elif x == 2:
-                self.components[0][x].type = ComponentType.BORDER_DIAGONAL_LEFT
+                self.set_cell(x, 0, ComponentType.BORDER_DIAGONAL_LEFT)
             elif x == 12:
-                self.components[0][x].type = ComponentType.BORDER_DIAGONAL_RIGHT
+                self.set_cell(x, 0, ComponentType.BORDER_DIAGONAL_RIGHT)
 
         # Row 2 (index 1)
         for x in range(1, self.width - 1):
             if x in [1, 2] or (4 <= x <= 10) or x in [12, 13]:
-                self.components[1][x].type = ComponentType.INVALID
+                self.set_cell(x, 1, ComponentType.INVALID)
             elif x == 3:
-                self.components[1][x].type = ComponentType.BORDER_DIAGONAL_LEFT
+                self.set_cell(x, 1, ComponentType.BORDER_DIAGONAL_LEFT)
             elif x == 11:
-                self.components[1][x].type = ComponentType.BORDER_DIAGONAL_RIGHT
+                self.set_cell(x, 1, ComponentType.BORDER_DIAGONAL_RIGHT)
 
         # Row 3 (index 2)
         for x in range(1, self.width - 1):
             if x in [1, 2, 3] or (5 <= x <= 9) or x in [11, 12, 13]:
-                self.components[2][x].type = ComponentType.INVALID
+                self.set_cell(x, 2, ComponentType.INVALID)
             elif x == 4:
-                self.components[2][x].type = ComponentType.BORDER_DIAGONAL_LEFT
+                self.set_cell(x, 2, ComponentType.BORDER_DIAGONAL_LEFT)
             elif x == 10:
-                self.components[2][x].type = ComponentType.BORDER_DIAGONAL_RIGHT
+                self.set_cell(x, 2, ComponentType.BORDER_DIAGONAL_RIGHT)
 
         # Row 4 (index 3)
         for x in range(1, self.width - 1):
             if x in [1,2,3,7,11,12,13]:
-                self.components[3][x].type = ComponentType.INVALID
+                self.set_cell(x, 3, ComponentType.INVALID)
             elif x % 2 == 0:
-                self.components[3][x].type = ComponentType.GRAY_SPACE
+                self.set_cell(x, 3, ComponentType.GRAY_SPACE)
             else:
-                self.components[3][x].type = ComponentType.EMPTY
+                self.set_cell(x, 3, ComponentType.EMPTY)
 
         # Row 5 (index 4)
         for x in range(1, self.width):
             if x in [1,2,12,13]:
-                self.components[4][x].type = ComponentType.INVALID
+                self.set_cell(x, 4, ComponentType.INVALID)
             elif x % 2 == 1:
-                self.components[4][x].type = ComponentType.GRAY_SPACE
+                self.set_cell(x, 4, ComponentType.GRAY_SPACE)
             else:
-                self.components[4][x].type = ComponentType.EMPTY
+                self.set_cell(x, 4, ComponentType.EMPTY)
 
 
 
@@ -167,29 +591,124 @@ class GameBoard:
         for y in range(5, 13):
             for x in range(2,14):
                 if (x + y) % 2 == 1:
-                    self.components[y][x].type = ComponentType.GRAY_SPACE
+                    self.set_cell(x, y, ComponentType.GRAY_SPACE)
                 else:
-                    self.components[y][x].type = ComponentType.EMPTY
-            self.components[y][1].type = ComponentType.INVALID
-            self.components[y][13].type = ComponentType.INVALID
+                    self.set_cell(x, y, ComponentType.EMPTY)
+            self.set_cell(1, y, ComponentType.INVALID)
+            self.set_cell(13, y, ComponentType.INVALID)
 
         # Bottom rows
         for y in range(self.height - 3, self.height - 1):
             for x in range(1, self.width - 1):
                 if (x <= 6) or (x >= 8):
-                    self.components[y][x].type = ComponentType.INVALID
+                    self.set_cell(x, y, ComponentType.INVALID)
 
-        self.components[14][6].type = ComponentType.LEVER_BLUE
-        self.components[14][5].type = ComponentType.LEVER_BLUE
-        self.components[14][3].type = ComponentType.LEVER_BLUE
-        self.components[14][8].type = ComponentType.LEVER_RED
-        self.components[14][9].type = ComponentType.LEVER_RED
-        self.components[14][11].type = ComponentType.LEVER_RED
+        self.set_cell(6, 14, ComponentType.LEVER_BLUE)
+        self.set_cell(5, 14, ComponentType.LEVER_BLUE)
+        self.set_cell(3, 14, ComponentType.LEVER_BLUE)
+        self.set_cell(8, 14, ComponentType.LEVER_RED)
+        self.set_cell(9, 14, ComponentType.LEVER_RED)
+        self.set_cell(11, 14, ComponentType.LEVER_RED)
 
     def add_component(self, type: ComponentType, x: int, y: int) -> None:
         """Add a component to the board"""
         if 0 <= x < self.width and 0 <= y < self.height:
-            self.components[y][x] = Component(type, x, y)
+            index = y * self.width + x
+            self.cells[index] = CELL_CODES[type]
+            self.occupied[index] = 0
+            self.gear_rotations.pop(index, None)
+            self.gear_bit_states.pop(index, None)
+            self.layout_changed()
+
+    def add_components(self, placements: List[Tuple[ComponentType, int, int]]) -> None:
+        """
+        Add many components at once: all of them or, if any placement is
+        invalid, none. Parts go on cells that are empty or gray on the base
+        layout; the fixed cells (borders, levers, launchers) only take their
+        own type again, so a whole board can be sent back. The layout is
+        recounted once for the whole batch.
+        """
+        width = self.width
+        layout = base_layout(width, self.height)
+        indices = []
+        for number, (type, x, y) in enumerate(placements):
+            if type not in CELL_CODES:
+                raise ValueError(f"Placement {number}: invalid component type {type!r}")
+            if not (0 <= x < width and 0 <= y < self.height):
+                raise ValueError(f"Placement {number}: ({x}, {y}) is off the board")
+            index = y * width + x
+            code = CELL_CODES[type]
+            if layout[index] not in _OPEN_CELLS and code != layout[index]:
+                raise ValueError(f"Placement {number}: ({x}, {y}) is a fixed "
+                                 f"{CELL_TYPES[layout[index]].value} cell")
+            indices.append((index, code))
+        if not indices:
+            return
+        for index, code in indices:
+            self.cells[index] = code
+            self.occupied[index] = 0
+            self.gear_rotations.pop(index, None)
+            self.gear_bit_states.pop(index, None)
+        self.layout_changed()
+
+    def layout_changed(self) -> None:
+        """
+        Drop everything derived from the cell layout after it changed, recount
+        the bits and regroup the gears
+        """
+        # A new cache rather than clear(), which would also empty it for forks
+        self.path_cache = PathCache(self.path_cache.maxsize)
+        self.machine = None
+        zobrist = self.zobrist
+        bit_cells = []
+        gear_cells = []
+        register = 0
+        bit_hash = 0
+        for match in _CELL_KIND_PATTERN.finditer(self.cells.translate(_CELL_KINDS)):
+            index = match.start()
+            kind = match.group()[0]
+            if kind != _KIND_GEAR:
+                bit_cells.append(index)
+                if kind == _KIND_BIT_RIGHT or kind == _KIND_GEAR_BIT_RIGHT:
+                    register |= 1 << index
+                    bit_hash ^= zobrist[index]
+            if kind >= _KIND_GEAR:
+                gear_cells.append(index)
+        self.bit_cells = tuple(bit_cells)
+        self.bit_register = register
+        self.bit_hash = bit_hash
+        self.gear_groups = self.group_gears(gear_cells)
+
+    def group_gears(self, gear_cells: List[int]) -> Dict[int, tuple]:
+        """Split gear and gear bit cells into networks connected up, down, left and right"""
+        width = self.width
+        cells = self.cells
+        zobrist = self.zobrist
+        ungrouped = set(gear_cells)
+        groups: Dict[int, tuple] = {}
+        for start in gear_cells:
+            if start not in ungrouped:
+                continue
+            ungrouped.discard(start)
+            network = [start]
+            for index in network:
+                x = index % width
+                for neighbour, inside in ((index - width, True), (index + width, True),
+                                          (index - 1, x > 0), (index + 1, x < width - 1)):
+                    if inside and neighbour in ungrouped:
+                        ungrouped.discard(neighbour)
+                        network.append(neighbour)
+            network.sort()
+            bits = tuple(index for index in network if cells[index] != CELL_GEAR)
+            mask = 0
+            bit_hash = 0
+            for index in bits:
+                mask |= 1 << index
+                bit_hash ^= zobrist[index]
+            group = (tuple(network), bits, mask, bit_hash)
+            for index in network:
+                groups[index] = group
+        return groups
 
     def set_active_launcher(self, launcher: str) -> None:
         """Set the active launcher (left or right)"""
@@ -210,13 +729,13 @@ class GameBoard:
             if 0 <= x < self.width and 0 <= y < self.height:
                 if not self.check_collision(x, y):
                     self.marbles.append(Marble(color, x, y, direction))
-                    self.components[y][x].is_occupied = True
+                    self.occupied[y * self.width + x] = 1
         else:
             print(f"Cannot launch marble: {color} marbles are not available")
 
     def check_collision(self, x: int, y: int) -> bool:
         """Check if a position is occupied"""
-        return self.components[y][x].is_occupied
+        return self.occupied[y * self.width + x] == 1
 
     def set_bit_type(self, component: Component) -> None:
         """
@@ -232,260 +751,349 @@ class GameBoard:
             return "left"
         return None  # If no change is made, return None
 
-    def flip_gears(self, x: int, y: int, visited=None) -> None:
+    def flip_gears(self, x: int, y: int) -> None:
         """
-        Flip all connected gears starting from position (x, y).
-        This is a depth-first search to find all connected gears.
+        Flip every gear bit of the gear network at (x, y), looked up in the
+        gear groups: the cells flip one by one and the register with one XOR.
         """
-        if visited is None:
-            visited = set()
-
-        # Mark current position as visited
-        visited.add((x, y))
-
-        # Get the current component
-        component = self.components[y][x]
-
-        # If not a gear or gear bit, return
-        if not (component.is_gear or component.is_gear_bit):
+        group = self.gear_groups.get(y * self.width + x)
+        if group is None:
             return
+        cells = self.cells
+        for index in group[1]:
+            cells[index] = _FLIPPED_BITS[cells[index]]
+        self.bit_register ^= group[2]
+        self.bit_hash ^= group[3]
 
-        # Flip gear bits
-        if component.type == ComponentType.GEAR_BIT_LEFT:
-            component.type = ComponentType.GEAR_BIT_RIGHT
-        elif component.type == ComponentType.GEAR_BIT_RIGHT:
-            component.type = ComponentType.GEAR_BIT_LEFT
-
-        # Check adjacent cells (up, right, down, left)
-        directions = [(0, -1), (1, 0), (0, 1), (-1, 0)]
-        for dx, dy in directions:
-            new_x, new_y = x + dx, y + dy
+    def get_gear_groups(self) -> List[List[Dict[str, int]]]:
+        """Cells of every gear network as lists of {"x", "y"}, in cell order"""
+        groups = []
+        seen = set()
+        for group in self.gear_groups.values():
+            if id(group) not in seen:
+                seen.add(id(group))
+                groups.append([{"x": index % self.width, "y": index // self.width} for index in group[0]])
+        return groups
 
-            # Check if the new position is valid and not visited
-            if (0 <= new_x < self.width and 0 <= new_y < self.height and
-                    (new_x, new_y) not in visited):
-                # Recursively flip connected gears
-                self.flip_gears(new_x, new_y, visited)
-
-    def update_marble_positions(self) -> None:
-        """Update all marble positions based on components and physics"""
-        marbles_to_remove = []
+    def update_marble_positions(self) -> int:
+        """
+        Update all marble positions based on components and physics.
+        Returns the number of marbles that are still moving after the tick.
+        """
+        marbles_to_remove = ()
+        moving = 0
+        cells = self.cells
+        occupied = self.occupied
+        edges = self.edges
+        transitions = self.transitions
+        width = self.width
 
         for marble in self.marbles:
             if not marble.is_moving:
                 continue
 
-            current_component = self.components[marble.y][marble.x]
-
-            if current_component.type == ComponentType.RAMP_LEFT:
-                if (marble.y + 1 < self.height and
-                        marble.x - 1 >= 0 and
-                        not self.check_collision(marble.x - 1, marble.y + 1)):
-                    marble.direction = "left"
-                    self.components[marble.y][marble.x].is_occupied = False
-                    marble.y += 1
-                    marble.x -= 1
-                    self.components[marble.y][marble.x].is_occupied = True
-            elif current_component.type == ComponentType.RAMP_RIGHT:
-                if (marble.y + 1 < self.height and
-                        marble.x + 1 < self.width and
-                        not self.check_collision(marble.x + 1, marble.y + 1)):
-                    marble.direction = "right"
-                    self.components[marble.y][marble.x].is_occupied = False
-                    marble.y += 1
-                    marble.x += 1
-                    self.components[marble.y][marble.x].is_occupied = True
-            elif current_component.type == ComponentType.BIT_LEFT:
-                marble.direction = "right"
-                self.set_bit_type(current_component)
-                new_x, new_y = marble.x, marble.y
-                if new_x + 1 < self.width and not self.check_collision(new_x + 1, new_y):
-                    new_x += 1
-                elif (new_y + 1 < self.height and new_x + 1 < self.width and
-                      not self.check_collision(new_x + 1, new_y + 1)):
-                    new_x += 1
-                    new_y += 1
-                else:
-                    marble.is_moving = False
-
-                if marble.is_moving and 0 <= new_x < self.width and 0 <= new_y < self.height:
-                    self.components[marble.y][marble.x].is_occupied = False
-                    marble.x, marble.y = new_x, new_y
-                    self.components[new_y][new_x].is_occupied = True
-            elif current_component.type == ComponentType.BIT_RIGHT:
-                marble.direction = "left"
-                self.set_bit_type(current_component)
-                new_x, new_y = marble.x, marble.y
-                if new_x - 1 >= 0 and not self.check_collision(new_x - 1, new_y):
-                    new_x -= 1
-                elif (new_y + 1 < self.height and new_x - 1 >= 0 and
-                      not self.check_collision(new_x - 1, new_y + 1)):
-                    new_x -= 1
-                    new_y += 1
-                else:
-                    marble.is_moving = False
-
-                if marble.is_moving and 0 <= new_x < self.width and 0 <= new_y < self.height:
-                    self.components[marble.y][marble.x].is_occupied = False
-                    marble.x, marble.y = new_x, new_y
-                    self.components[new_y][new_x].is_occupied = True
-            elif current_component.type == ComponentType.CROSSOVER:
-                new_x, new_y = marble.x, marble.y
-                if marble.direction == "left":
-                    if new_x - 1 >= 0 and not self.check_collision(new_x - 1, new_y):
-                        new_x -= 1
-                    elif (new_y + 1 < self.height and new_x - 1 >= 0 and
-                          not self.check_collision(new_x - 1, new_y + 1)):
-                        new_x -= 1
-                        new_y += 1
-                    else:
-                        marble.is_moving = False
-                else:
-                    if new_x + 1 < self.width and not self.check_collision(new_x + 1, new_y):
-                        new_x += 1
-                    elif (new_y + 1 < self.height and new_x + 1 < self.width and
-                          not self.check_collision(new_x + 1, new_y + 1)):
-                        new_x += 1
-                        new_y += 1
+            x, y = marble.x, marble.y
+            index = y * width + x
+            rules = transitions[cells[index]]
+            try:
+                action, effect, moves, blocked = rules[marble.direction]
+            except KeyError:
+                action, effect, moves, blocked = rules[None]
+
+            if action == ACTION_MOVE:
+                if effect is not None:
+                    marble.direction, flip = effect
+                    if flip == FLIP_GEARS:
+                        self.flip_gears(x, y)
                     else:
-                        marble.is_moving = False
+                        cells[index] = flip
+                        self.bit_register ^= 1 << index
+                        self.bit_hash ^= self.zobrist[index]
 
-                if marble.is_moving and 0 <= new_x < self.width and 0 <= new_y < self.height:
-                    self.components[marble.y][marble.x].is_occupied = False
-                    marble.x, marble.y = new_x, new_y
-                    self.components[new_y][new_x].is_occupied = True
-            elif current_component.type == ComponentType.GEAR_BIT_LEFT:
-                # Flip all connected gears and change direction
-                self.flip_gears(marble.x, marble.y)
-                marble.direction = "right"
-                new_x, new_y = marble.x, marble.y
-                if new_x + 1 < self.width and not self.check_collision(new_x + 1, new_y):
-                    new_x += 1
-                elif (new_y + 1 < self.height and new_x + 1 < self.width and
-                      not self.check_collision(new_x + 1, new_y + 1)):
-                    new_x += 1
-                    new_y += 1
+                # Take the first free candidate cell
+                edge = edges[index]
+                for delta, dx, dy, mask, move_direction in moves:
+                    if not edge & mask and not occupied[index + delta]:
+                        occupied[index] = 0
+                        occupied[index + delta] = 1
+                        marble.x, marble.y = x + dx, y + dy
+                        if move_direction is not None:
+                            marble.direction = move_direction
+                        moving += 1
+                        break
                 else:
-                    marble.is_moving = False
-
-                if marble.is_moving and 0 <= new_x < self.width and 0 <= new_y < self.height:
-                    self.components[marble.y][marble.x].is_occupied = False
-                    marble.x, marble.y = new_x, new_y
-                    self.components[new_y][new_x].is_occupied = True
-            elif current_component.type == ComponentType.GEAR_BIT_RIGHT:
-                # Flip all connected gears and change direction
-                self.flip_gears(marble.x, marble.y)
-                marble.direction = "left"
-
-                new_x, new_y = marble.x, marble.y
-                if new_x - 1 >= 0 and not self.check_collision(new_x - 1, new_y):
-                    new_x -= 1
-                elif (new_y + 1 < self.height and new_x - 1 >= 0 and
-                      not self.check_collision(new_x - 1, new_y + 1)):
-                    new_x -= 1
-                    new_y += 1
-                else:
-                    marble.is_moving = False
-
-                if marble.is_moving and 0 <= new_x < self.width and 0 <= new_y < self.height:
-                    self.components[marble.y][marble.x].is_occupied = False
-                    marble.x, marble.y = new_x, new_y
-                    self.components[new_y][new_x].is_occupied = True
-            elif current_component.type == ComponentType.LEVER_BLUE:
-                if marble.color == "red":
-                    self.red_marbles -= 1
-                else:
-                    self.blue_marbles -= 1
-                self.set_active_launcher("left")
-                self.launch_marble("blue")
-                marble.is_moving = False
-                self.marble_output.append(marble.color)
-                marbles_to_remove.append(marble)
-            elif current_component.type == ComponentType.LEVER_RED:
-                if marble.color == "red":
-                    self.red_marbles -= 1
-                else:
-                    self.blue_marbles -= 1
-                self.set_active_launcher("right")
-                self.launch_marble("red")
+                    if blocked == BLOCKED_WAIT:
+                        moving += 1
+                    elif blocked == BLOCKED_STALL:
+                        marble.is_moving = False
+                    elif blocked == BLOCKED_RETURN:
+                        # Marble cannot go anywhere, count it before removing
+                        marble.is_moving = False
+                        if marble.color == "red":
+                            self.red_marbles += 1
+                        else:
+                            self.blue_marbles += 1
+                        marbles_to_remove += (marble,)
+            elif action == ACTION_STOP:
                 marble.is_moving = False
-                self.marble_output.append(marble.color)
-                marbles_to_remove.append(marble)
-            elif current_component.type == ComponentType.INTERCEPTOR:
+            else:
+                # Levers and interceptors take the marble off the board
                 marble.is_moving = False
                 if marble.color == "red":
                     self.red_marbles -= 1
                 else:
                     self.blue_marbles -= 1
-                marbles_to_remove.append(marble)
-            elif current_component.type in [
-                ComponentType.BORDER_VERTICAL,
-                ComponentType.BORDER_HORIZONTAL,
-                ComponentType.BORDER_DIAGONAL_LEFT,
-                ComponentType.BORDER_DIAGONAL_RIGHT,
-                ComponentType.CORNER_LEFT,
-                ComponentType.CORNER_RIGHT
-            ]:
-                marble.is_moving = False
-            else:  # EMPTY or other components
-                # Calculate new position based on current direction and gravity
-                new_x, new_y = marble.x, marble.y
+                if action == ACTION_LEVER_BLUE:
+                    self.set_active_launcher("left")
+                    self.launch_marble("blue")
+                    self.marble_output.append(marble.color)
+                elif action == ACTION_LEVER_RED:
+                    self.set_active_launcher("right")
+                    self.launch_marble("red")
+                    self.marble_output.append(marble.color)
+                marbles_to_remove += (marble,)
 
-                # First try to move down (gravity)
-                if new_y + 1 < self.height and not self.check_collision(new_x, new_y + 1):
-                    new_y += 1
+        # Remove marbles that went out of bounds or hit the interceptor
+        if marbles_to_remove:
+            for marble in marbles_to_remove:
+                occupied[marble.y * width + marble.x] = 0
+                self.marbles.remove(marble)
+
+        return moving
+
+    def follow_marble(self, marble: Marble, max_ticks: int) -> int:
+        """
+        Follow a lone moving marble along its whole path in one call instead of
+        ticking the board cell by cell. Bits and gear networks flip on the way;
+        a lever hit records the output and launches the next marble, which is
+        followed in turn. Stops when no marble is moving or after max_ticks
+        ticks, leaving the board exactly as update_marble_positions would.
+        Other marbles on the board must not be moving. Paths of a marble alone
+        on the board are looked up in and stored to the path cache.
+        Returns the number of ticks simulated.
+        """
+        cells = self.cells
+        occupied = self.occupied
+        edges = self.edges
+        transitions = self.transitions
+        width = self.width
+        cache = self.path_cache
+        zobrist = self.zobrist
+        ticks = 0
+        # A freshly launched marble takes its first step in the lever's tick,
+        # while the marble on the lever still blocks its cell
+        same_tick = False
+        lever_index = -1
+
+        while True:
+            x, y, direction = marble.x, marble.y, marble.direction
+            index = y * width + x
+            # The marble's own cell is tracked in index until it stops
+            occupied[index] = 0
+            outcome = None
+
+            # A lone marble's path only depends on where it enters and the bit
+            # states, unless the marble on the lever is next to its first step
+            key = None
+            if len(self.marbles) == 1 and (lever_index < 0 or
+                                           abs(lever_index // width - y) > 1 or
+                                           abs(lever_index % width - x) > 1):
+                key = (index, direction, self.bit_register)
+                path = cache.get(key)
+                if path is not None and path[0] - same_tick <= max_ticks - ticks:
+                    steps, outcome, index, x, y, direction, flips = path
+                    ticks += steps - same_tick
+                    same_tick = False
+                    register = self.bit_register
+                    bit_hash = self.bit_hash
+                    for flipped in flips:
+                        cells[flipped] = _FLIPPED_BITS[cells[flipped]]
+                        register ^= 1 << flipped
+                        bit_hash ^= zobrist[flipped]
+                    self.bit_register = register
+                    self.bit_hash = bit_hash
+                    if lever_index >= 0:
+                        occupied[lever_index] = 0
+                        lever_index = -1
+                    key = None
+            start_ticks = ticks - same_tick
+
+            while outcome is None:
+                if same_tick:
+                    same_tick = False
+                elif ticks < max_ticks:
+                    ticks += 1
                 else:
-                    # If can't move down, try moving horizontally based on direction
-                    if marble.direction == "left":
-                        if new_x - 1 >= 0 and not self.check_collision(new_x - 1, new_y):
-                            new_x -= 1
-                        else:
-                            # If blocked, try to move down-left if possible
-                            if (new_y + 1 < self.height and new_x - 1 >= 0 and
-                                    not self.check_collision(new_x - 1, new_y + 1)):
-                                new_x -= 1
-                                new_y += 1
-                            else:
-                                marble.is_moving = False
-                    elif marble.direction == "right":
-                        if new_x + 1 < self.width and not self.check_collision(new_x + 1, new_y):
-                            new_x += 1
-                        else:
-                            # If blocked, try to move down-right if possible
-                            if (new_y + 1 < self.height and new_x + 1 < self.width and
-                                    not self.check_collision(new_x + 1, new_y + 1)):
-                                new_x += 1
-                                new_y += 1
-                            else:
-                                marble.is_moving = False
-                    elif marble.direction == "up":
-                        if new_y - 1 >= 0 and not self.check_collision(new_x, new_y - 1):
-                            new_y -= 1
-                        else:
-                            marble.is_moving = False
-                    elif marble.direction == "down":
-                        if new_y + 1 < self.height and not self.check_collision(new_x, new_y + 1):
-                            new_y += 1
+                    # Out of budget mid-path
+                    marble.x, marble.y, marble.direction = x, y, direction
+                    occupied[index] = 1
+                    return ticks
+
+                rules = transitions[cells[index]]
+                try:
+                    action, effect, moves, blocked = rules[direction]
+                except KeyError:
+                    action, effect, moves, blocked = rules[None]
+
+                if action == ACTION_MOVE:
+                    if effect is not None:
+                        direction, flip = effect
+                        if flip == FLIP_GEARS:
+                            self.flip_gears(x, y)
                         else:
-                            marble.is_moving = False
+                            cells[index] = flip
+                            self.bit_register ^= 1 << index
+                            self.bit_hash ^= self.zobrist[index]
 
-                # Update position if still moving
-                if marble.is_moving and 0 <= new_x < self.width and 0 <= new_y < self.height:
-                    self.components[marble.y][marble.x].is_occupied = False
-                    marble.x, marble.y = new_x, new_y
-                    self.components[new_y][new_x].is_occupied = True
-                else:
-                    # Marble is out of bounds, count it before removing
-                    if marble.color == "red":
-                        self.red_marbles += 1
+                    edge = edges[index]
+                    for delta, dx, dy, mask, move_direction in moves:
+                        if not edge & mask and not occupied[index + delta]:
+                            index += delta
+                            x += dx
+                            y += dy
+                            if move_direction is not None:
+                                direction = move_direction
+                            break
                     else:
-                        self.blue_marbles += 1
-                    marbles_to_remove.append(marble)
+                        if blocked == BLOCKED_STALL:
+                            outcome = ACTION_STOP
+                        elif blocked == BLOCKED_RETURN:
+                            outcome = _OUTCOME_RETURNED
+                        elif lever_index < 0:
+                            # Nothing else moves, so the marble waits for the rest of the run
+                            ticks = max_ticks
+                else:
+                    outcome = action
 
-        # Remove marbles that went out of bounds or hit the interceptor
-        for marble in marbles_to_remove:
-            self.components[marble.y][marble.x].is_occupied = False
+                if lever_index >= 0:
+                    occupied[lever_index] = 0
+                    lever_index = -1
+
+            if key is not None:
+                changed = key[2] ^ self.bit_register
+                flips = []
+                while changed:
+                    lowest = changed & -changed
+                    flips.append(lowest.bit_length() - 1)
+                    changed ^= lowest
+                cache.put(key, (ticks - start_ticks, outcome, index, x, y, direction, tuple(flips)))
+
+            # The marble stopped, left the board or hit a lever
+            marble.is_moving = False
+            marble.x, marble.y, marble.direction = x, y, direction
+            if outcome == ACTION_STOP:
+                occupied[index] = 1
+                return ticks
+            change = 1 if outcome == _OUTCOME_RETURNED else -1
+            if marble.color == "red":
+                self.red_marbles += change
+            else:
+                self.blue_marbles += change
             self.marbles.remove(marble)
+            if outcome != ACTION_LEVER_BLUE and outcome != ACTION_LEVER_RED:
+                return ticks
+
+            # Lever hit: launch the next marble and follow it
+            occupied[index] = 1
+            lever_index = index
+            launched = len(self.marbles)
+            if outcome == ACTION_LEVER_BLUE:
+                self.set_active_launcher("left")
+                self.launch_marble("blue")
+            else:
+                self.set_active_launcher("right")
+                self.launch_marble("red")
+            self.marble_output.append(marble.color)
+            if len(self.marbles) == launched:
+                occupied[lever_index] = 0
+                return ticks
+            marble = self.marbles[-1]
+            same_tick = True
+
+    def run_until_halt(self, max_ticks: int = DEFAULT_MAX_TICKS, mode: str = RUN_MODE_JUMP) -> Dict[str, Any]:
+        """
+        Simulate the board headlessly until no marble is moving or max_ticks is used up.
+        In jump mode a lone moving marble is followed along its whole path with
+        follow_marble; tick mode calls update_marble_positions once per tick.
+        Both give the same result. Returns the marble output, tick count, final
+        bit states and the halt reason.
+        """
+        ticks = 0
+        moving = [marble for marble in self.marbles if marble.is_moving]
+        while moving and ticks < max_ticks:
+            if mode == RUN_MODE_JUMP and len(moving) == 1:
+                ticks += self.follow_marble(moving[0], max_ticks - ticks)
+                moving = [marble for marble in self.marbles if marble.is_moving]
+            elif self.update_marble_positions():
+                ticks += 1
+            else:
+                ticks += 1
+                moving = []
+
+        if moving:
+            halt_reason = HALT_MAX_TICKS
+        elif self.marbles:
+            halt_reason = HALT_STALLED
+        else:
+            halt_reason = HALT_NO_MARBLES
+
+        return {
+            "output": list(self.marble_output),
+            "ticks": ticks,
+            "bits": self.get_bit_states(),
+            "halt_reason": halt_reason,
+            "red_marbles": self.red_marbles,
+            "blue_marbles": self.blue_marbles
+        }
+
+    def run(self, launcher: str = "left", max_ticks: int = DEFAULT_MAX_TICKS,
+            mode: str = RUN_MODE_JUMP) -> Dict[str, Any]:
+        """
+        Start a run from the given launcher and simulate it to completion.
+        The left launcher drops a blue marble and the right one a red marble,
+        like the start buttons of the frontend.
+        """
+        self.set_active_launcher(launcher)
+        self.launch_marble("blue" if launcher == "left" else "red")
+        return self.run_until_halt(max_ticks, mode)
+
+    def get_bit_states(self) -> List[Dict[str, Any]]:
+        """Get the position and current type of every bit and gear bit"""
+        bits = []
+        for index, code in enumerate(self.cells):
+            if code in BIT_CELLS:
+                y, x = divmod(index, self.width)
+                bits.append({"x": x, "y": y, "type": CELL_TYPES[code].value})
+        return bits
+
+    def get_cell_state(self, x: int, y: int) -> Dict[str, Any]:
+        """Type, occupancy and gear attributes of one cell, as listed by get_state"""
+        return _cell_state(ComponentView(self, x, y))
+
+    def get_state(self) -> Dict[str, Any]:
+        """Full state of the board with component details, as served by /board/state"""
+        components = [[_cell_state(component) for component in row] for row in self.components]
+
+        return {
+            "components": components,
+            "marbles": self.get_marble_states(),
+            "red_marbles": self.red_marbles,
+            "blue_marbles": self.blue_marbles,
+            "active_launcher": self.active_launcher,
+            "width": self.width,
+            "height": self.height,
+            "gear_groups": self.get_gear_groups()
+        }
+
+    def get_marble_states(self) -> List[Dict[str, Any]]:
+        """Position, direction and motion of every marble on the board"""
+        return [{
+            "color": marble.color,
+            "x": marble.x,
+            "y": marble.y,
+            "direction": marble.direction,
+            "is_moving": marble.is_moving
+        } for marble in self.marbles]
 
     def get_marble_counts(self) -> Dict[str, int]:
         """Get the current marble counts"""
@@ -498,10 +1106,186 @@ class GameBoard:
         """Get the marble output sequence"""
         return {"output": self.marble_output}
 
+    def fork(self) -> "GameBoard":
+        """
+        Cheap copy of the board for search and what-if runs. The fork gets its
+        own cells, occupancy, gear attributes, marbles, counts and output, and
+        shares everything derived from the layout (engine tables, bit cells,
+        gear groups, path cache and compiled machine) with this board. Layout
+        changes on either board replace the shared parts instead of writing to them.
+        """
+        board = GameBoard.__new__(GameBoard)
+        board.width = self.width
+        board.height = self.height
+        board.cells = bytearray(self.cells)
+        board.occupied = bytearray(self.occupied)
+        board.gear_rotations = dict(self.gear_rotations)
+        board.gear_bit_states = dict(self.gear_bit_states)
+        board.components = ComponentGrid(board)
+        board.transitions = self.transitions
+        board.edges = self.edges
+        board.zobrist = self.zobrist
+        board.bit_cells = self.bit_cells
+        board.bit_register = self.bit_register
+        board.bit_hash = self.bit_hash
+        board.gear_groups = self.gear_groups
+        board.path_cache = self.path_cache
+        board.machine = self.machine
+        board.marbles = []
+        for marble in self.marbles:
+            copy = Marble(marble.color, marble.x, marble.y, marble.direction)
+            copy.is_moving = marble.is_moving
+            board.marbles.append(copy)
+        board.active_launcher = self.active_launcher
+        board.red_marbles = self.red_marbles
+        board.blue_marbles = self.blue_marbles
+        board.initial_red = self.initial_red
+        board.initial_blue = self.initial_blue
+        board.marble_output = list(self.marble_output)
+        return board
+
+    def snapshot(self) -> tuple:
+        """
+        Cheap snapshot of the mutable state for search, undo and caching: the
+        bit register, marble counts, active launcher, marbles and output length.
+        Snapshots of the same layout compare equal when the states are equal.
+        """
+        return (self.bit_register, self.red_marbles, self.blue_marbles, self.active_launcher,
+                tuple((m.color, m.x, m.y, m.direction, m.is_moving) for m in self.marbles),
+                len(self.marble_output))
+
+    def restore(self, snapshot: tuple) -> None:
+        """
+        Return to a snapshot taken on this layout. Only the bits that differ
+        are flipped back, and the output is cut to its length at the time.
+        """
+        register, red, blue, active_launcher, marbles, output_length = snapshot
+        cells = self.cells
+        zobrist = self.zobrist
+        changed = register ^ self.bit_register
+        while changed:
+            lowest = changed & -changed
+            index = lowest.bit_length() - 1
+            cells[index] = _FLIPPED_BITS[cells[index]]
+            self.bit_hash ^= zobrist[index]
+            changed ^= lowest
+        self.bit_register = register
+
+        for marble in self.marbles:
+            self.occupied[marble.y * self.width + marble.x] = 0
+        self.marbles = []
+        for color, x, y, direction, is_moving in marbles:
+            marble = Marble(color, x, y, direction)
+            marble.is_moving = is_moving
+            self.marbles.append(marble)
+            self.occupied[y * self.width + x] = 1
+        self.red_marbles = red
+        self.blue_marbles = blue
+        self.active_launcher = active_launcher
+        del self.marble_output[output_length:]
+
+    def frame_since(self, snapshot: tuple) -> Dict[str, Any]:
+        """
+        What changed since a snapshot taken on this layout, for streaming:
+        the marbles if any of them moved, the bits and gear bits that flipped
+        (read off the bit register), the new outputs and the marble counts
+        and launcher if they changed. Unchanged parts are left out.
+        """
+        register, red, blue, active_launcher, marbles, output_length = snapshot
+        frame: Dict[str, Any] = {}
+        current = tuple((m.color, m.x, m.y, m.direction, m.is_moving) for m in self.marbles)
+        if current != marbles:
+            frame["marbles"] = [{"color": color, "x": x, "y": y} for color, x, y, _, _ in current]
+        changed = register ^ self.bit_register
+        if changed:
+            flipped = []
+            while changed:
+                lowest = changed & -changed
+                index = lowest.bit_length() - 1
+                flipped.append({"x": index % self.width, "y": index // self.width,
+                                "type": CELL_TYPES[self.cells[index]].value})
+                changed ^= lowest
+            frame["flipped"] = flipped
+        if len(self.marble_output) != output_length:
+            frame["output"] = self.marble_output[output_length:]
+        if (self.red_marbles, self.blue_marbles) != (red, blue):
+            frame["red_marbles"] = self.red_marbles
+            frame["blue_marbles"] = self.blue_marbles
+        if self.active_launcher != active_launcher:
+            frame["active_launcher"] = self.active_launcher
+        return frame
+
+    def step_frame(self) -> Dict[str, Any]:
+        """Advance one tick and return its frame, with the number of marbles still moving"""
+        snapshot = self.snapshot()
+        moving = self.update_marble_positions()
+        frame = self.frame_since(snapshot)
+        frame["moving"] = moving
+        return frame
+
+    def state_hash(self) -> int:
+        """Hash of the bits, counts, launcher and marbles, built on the incremental Zobrist hash"""
+        return hash((self.bit_hash, self.red_marbles, self.blue_marbles, self.active_launcher,
+                     tuple((m.color, m.x, m.y, m.direction, m.is_moving) for m in self.marbles)))
+
+    def to_image(self) -> tuple:
+        """
+        Compact, picklable snapshot of the whole board: packed cells, occupancy,
+        gear attributes, marbles, launcher, marble counts and output.
+        """
+        return (
+            self.width, self.height, bytes(self.cells), bytes(self.occupied),
+            tuple(self.gear_rotations.items()), tuple(self.gear_bit_states),
+            tuple((m.color, m.x, m.y, m.direction, m.is_moving) for m in self.marbles),
+            self.active_launcher, self.red_marbles, self.blue_marbles,
+            self.initial_red, self.initial_blue, tuple(self.marble_output)
+        )
+
+    @classmethod
+    def from_image(cls, image: tuple) -> "GameBoard":
+        """Rebuild a board from a snapshot taken with to_image"""
+        (width, height, cells, occupied, gear_rotations, gear_bit_states, marbles,
+         active_launcher, red, blue, initial_red, initial_blue, output) = image
+        board = cls(initial_red, initial_blue, width, height)
+        board.cells[:] = cells
+        board.layout_changed()
+        board.occupied[:] = occupied
+        board.gear_rotations.update(gear_rotations)
+        board.gear_bit_states.update(dict.fromkeys(gear_bit_states, True))
+        for color, x, y, direction, is_moving in marbles:
+            marble = Marble(color, x, y, direction)
+            marble.is_moving = is_moving
+            board.marbles.append(marble)
+        board.active_launcher = active_launcher
+        board.red_marbles = red
+        board.blue_marbles = blue
+        board.marble_output = list(output)
+        return board
+
     def reset(self) -> None:
         """Reset the game board"""
         self.marbles = []
         self.red_marbles = self.initial_red
         self.blue_marbles = self.initial_blue
         self.marble_output = []
-        self.initialize_board()
\ No newline at end of file
+        self.initialize_board()
+
+
+def base_layout(width: int, height: int) -> bytes:
+    """
+    Cell codes of an empty board as set up by setup_board_structure,
+    built once per board geometry and shared by every board and reset
+    """
+    layout = _base_layouts.get((width, height))
+    if layout is None:
+        scratch = GameBoard.__new__(GameBoard)
+        scratch.width = width
+        scratch.height = height
+        scratch.cells = bytearray(width * height)
+        scratch.setup_board_structure()
+        layout = _base_layouts[(width, height)] = bytes(scratch.cells)
+    return layout
+
+
+# The standard board's layout is ready before the first board is created
+base_layout(15, 17)
@@ -0,0 +1,219 @@
+"""
+Versioned board state with a cell-level change log.
+
+A BoardHistory watches one board. record() compares the board with the state
+it recorded last and, if anything changed, bumps the version and logs which
+cells changed (type, occupancy or gear attributes), whether the marbles
+moved and from where the output changed. Comparing at request boundaries
+keeps the engine itself free of bookkeeping: the packed cells and occupancy
+compare as bytes, so an unchanged board costs a few comparisons.
+
+since(version) merges the log entries after a version into one delta. The
+log keeps the last `limit` versions; older versions, and versions of other
+boards, get None and the caller falls back to a full snapshot. Every
+history draws its versions from its own range, so a version handed out for
+one board is never mistaken for a version of another.
+
+tick(steps) advances the board and answers with the delta of those ticks,
+so a client fast-forwarding a run needs one call rather than a tick, a
+state poll and an output poll per step.
+
+cached(key, build) serves responses as JSON bytes built once per version,
+so repeated reads of an unchanged board skip building and encoding them.
+Any change the next record() sees drops the cached bytes.
+"""
+import gzip
+import itertools
+import json
+from collections import deque
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from game_logic import GameBoard, BIT_CELLS, GEAR_CELLS, HALT_MAX_TICKS, RUN_MODE_JUMP
+
+DEFAULT_HISTORY_LIMIT = 32
+
+# Each history counts versions from its own multiple of 2^32
+_version_ranges = itertools.count(1)
+
+
+def json_bytes(content: Any) -> bytes:
+    """Encode content the way Starlette's JSONResponse does"""
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Whether an If-None-Match header matches etag: "*", or any tag of its
+    list compared weakly (a W/ prefix on either side is ignored)
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    etag = etag[2:] if etag.startswith("W/") else etag
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if (tag[2:] if tag.startswith("W/") else tag) == etag:
+            return True
+    return False
+
+
+def _changed_cells(old: bytes, new: bytes) -> List[int]:
+    """Indices of the bytes that differ between two equally long byte strings"""
+    changed = int.from_bytes(old, "little") ^ int.from_bytes(new, "little")
+    cells = []
+    while changed:
+        lowest = changed & -changed
+        cells.append((lowest.bit_length() - 1) // 8)
+        changed &= ~(0xFF << cells[-1] * 8)
+    return cells
+
+
+class BoardHistory:
+    def __init__(self, board: GameBoard, limit: int = DEFAULT_HISTORY_LIMIT):
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        self.board = board
+        self.version = next(_version_ranges) << 32
+        # Log entries (version, changed cells, layout changed, marbles moved, output start)
+        self.log: deque = deque(maxlen=limit)
+        # Serialized responses of the current version
+        self.cache: Dict[Hashable, bytes] = {}
+        self.cache_bytes = 0
+        self._remember()
+
+    def _remember(self) -> None:
+        board = self.board
+        self.cells = bytes(board.cells)
+        self.occupied = bytes(board.occupied)
+        self.gear_rotations = dict(board.gear_rotations)
+        self.gear_bit_states = dict(board.gear_bit_states)
+        self.marbles = tuple((m.color, m.x, m.y, m.direction, m.is_moving) for m in board.marbles)
+        self.output = tuple(board.marble_output)
+        self.counts = (board.red_marbles, board.blue_marbles, board.active_launcher)
+
+    @property
+    def oldest(self) -> int:
+        """Oldest version since() can still answer for"""
+        return self.log[0][0] - 1 if self.log else self.version
+
+    def knows(self, version: int) -> bool:
+        """Whether since(version) can answer with a delta, after recording"""
+        self.record()
+        return self.oldest <= version <= self.version
+
+    def record(self) -> int:
+        """Log what changed since the last record and return the current version"""
+        board = self.board
+        cells = set()
+        layout = False
+        if board.cells != self.cells:
+            for index in _changed_cells(self.cells, board.cells):
+                cells.add(index)
+                old, new = self.cells[index], board.cells[index]
+                # Anything but a bit flipping to its other side changes the layout
+                layout = layout or not (old in BIT_CELLS and new in BIT_CELLS
+                                        and (old in GEAR_CELLS) == (new in GEAR_CELLS))
+        if board.occupied != self.occupied:
+            cells.update(_changed_cells(self.occupied, board.occupied))
+        for old, new in ((self.gear_rotations, board.gear_rotations),
+                         (self.gear_bit_states, board.gear_bit_states)):
+            if old != new:
+                cells.update(index for index in old.keys() | new.keys() if old.get(index) != new.get(index))
+        marbles = tuple((m.color, m.x, m.y, m.direction, m.is_moving) for m in board.marbles)
+        output = board.marble_output
+        output_start = len(self.output)
+        if len(output) < output_start or tuple(output[:output_start]) != self.output:
+            # Changed before its end (a reset): find where the old and new output part
+            output_start = 0
+            shared = min(len(output), len(self.output))
+            while output_start < shared and output[output_start] == self.output[output_start]:
+                output_start += 1
+        elif len(output) == output_start:
+            output_start = None
+        counts = (board.red_marbles, board.blue_marbles, board.active_launcher)
+
+        if not cells and marbles == self.marbles and output_start is None and counts == self.counts:
+            return self.version
+        self.version += 1
+        self.cache.clear()
+        self.cache_bytes = 0
+        self.log.append((self.version, frozenset(cells), layout, marbles != self.marbles, output_start))
+        self._remember()
+        return self.version
+
+    def since(self, version: int) -> Optional[Dict[str, Any]]:
+        """
+        Record, then return everything that changed after version: the
+        changed cells in the format of GameBoard.get_state, the marbles if they
+        moved, the output from output_start on if it changed, and the marble
+        counts and launcher. None when the version is no longer in the log.
+        """
+        if not self.knows(version):
+            return None
+        board = self.board
+        cells = set()
+        layout = marbles = False
+        output_start = None
+        for entry_version, entry_cells, entry_layout, entry_marbles, entry_output in reversed(self.log):
+            if entry_version <= version:
+                break
+            cells |= entry_cells
+            layout = layout or entry_layout
+            marbles = marbles or entry_marbles
+            if entry_output is not None:
+                output_start = entry_output if output_start is None else min(output_start, entry_output)
+
+        width = board.width
+        delta: Dict[str, Any] = {
+            "version": self.version,
+            "since": version,
+            "cells": [board.get_cell_state(index % width, index // width) for index in sorted(cells)],
+            "red_marbles": board.red_marbles,
+            "blue_marbles": board.blue_marbles,
+            "active_launcher": board.active_launcher
+        }
+        if marbles:
+            delta["marbles"] = board.get_marble_states()
+        if output_start is not None:
+            delta["output_start"] = output_start
+            delta["output"] = board.marble_output[output_start:]
+        if layout:
+            delta["gear_groups"] = board.get_gear_groups()
+        return delta
+
+    def tick(self, steps: int, mode: str = RUN_MODE_JUMP) -> Dict[str, Any]:
+        """
+        Advance the board up to steps ticks (see GameBoard.run_until_halt) and
+        return what they changed as the delta since the version before them,
+        with the ticks run, whether the board halted and why.
+        """
+        version = self.record()
+        run = self.board.run_until_halt(steps, mode)
+        delta = self.since(version)
+        delta["ticks"] = run["ticks"]
+        delta["halted"] = run["halt_reason"] != HALT_MAX_TICKS
+        delta["halt_reason"] = run["halt_reason"]
+        return delta
+
+    def cached(self, key: Hashable, build: Callable[[], Any], compressed: bool = False) -> bytes:
+        """
+        Record, then return the JSON bytes of build() for the current version,
+        building them only on the first call per version and key. With
+        compressed, the bytes are gzipped (and cached as such).
+        """
+        self.record()
+        cache_key = (key, compressed)
+        body = self.cache.get(cache_key)
+        if body is None:
+            body = self.cache.get((key, False))
+            if body is None:
+                body = json_bytes(build())
+                self.cache[(key, False)] = body
+                self.cache_bytes += len(body)
+            if compressed:
+                body = gzip.compress(body, compresslevel=6)
+                self.cache[cache_key] = body
+                self.cache_bytes += len(body)
+        return body
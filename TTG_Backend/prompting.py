@@ -1,7 +1,7 @@
 from mako.template import Template
 from typing import Dict, Any, Optional
 import os
-from challenges import CHALLENGES
+from challenges import CHALLENGES, create_challenge_board
 from board_encoder import BoardEncoder
 import json
 import re
@@ -52,7 +52,7 @@ class PromptManager:
         if challenge_id and challenge_id in CHALLENGES:
             challenge = CHALLENGES[challenge_id]
             try:
-                board_layout = BoardEncoder._encode_board_layout(challenge['board'])
+                board_layout = BoardEncoder._encode_board_layout(create_challenge_board(challenge_id))
                 challenge_context = f"""
 Challenge Description:
 {challenge.get('description', 'No description available')}
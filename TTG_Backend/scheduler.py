@@ -0,0 +1,211 @@
+"""
+Server-side tick scheduler for live boards.
+
+Every animating board is an entry with its own tick rate on one hashed
+timing wheel: the wheel has `slots` buckets of `slot_seconds` each and an
+entry sits in the bucket of the first slot that starts at or after its next
+deadline, so a wheel step only looks at the boards due by then, however
+many boards are live, and no board ticks before it is due. Due boards are
+stepped most overdue first. They tick inline on the event loop until the
+step has used its time budget; the rest of the due boards tick together in
+a worker thread so a slow slot does not hold up the requests and streams
+served by the loop.
+
+A board ticks under its BoardLock. A board whose lock is held or waited for
+by a request (a long /run, say) skips the slot and is tried again in the
+next one; the wheel step never waits for a board's lock.
+"""
+import asyncio
+import contextlib
+import math
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from game_logic import GameBoard
+
+DEFAULT_SLOT_SECONDS = 1 / 120
+DEFAULT_SLOTS = 256
+DEFAULT_BUDGET = 0.004
+
+
+class ScheduledBoard:
+    __slots__ = ("key", "interval", "source", "deliver", "lock", "deadline", "slot", "ticks", "active")
+
+    def __init__(self, key: Any, interval: float, source: Callable[[], GameBoard],
+                 deliver: Callable[[int, Dict[str, Any]], None], lock: Any, deadline: float):
+        self.key = key
+        self.interval = interval
+        self.source = source
+        self.deliver = deliver
+        self.lock = lock
+        self.deadline = deadline
+        self.slot = 0
+        self.ticks = 0
+        self.active = True
+
+
+class TickScheduler:
+    def __init__(self, slot_seconds: float = DEFAULT_SLOT_SECONDS, slots: int = DEFAULT_SLOTS,
+                 budget: float = DEFAULT_BUDGET):
+        if slot_seconds <= 0 or slots < 1:
+            raise ValueError("slot_seconds and slots must be positive")
+        self.slot_seconds = slot_seconds
+        self.slots = slots
+        self.budget = budget
+        self.wheel: List[List[ScheduledBoard]] = [[] for _ in range(slots)]
+        self.entries: Dict[Any, ScheduledBoard] = {}
+        self.position = 0
+        self.task: Optional[asyncio.Task] = None
+        self.ticks = 0
+        self.offloaded = 0
+        self.skipped_busy = 0
+        self.over_budget = 0
+        self.early = 0
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, key: Any, rate: float, source: Callable[[], GameBoard],
+            deliver: Callable[[int, Dict[str, Any]], None], lock: Any) -> ScheduledBoard:
+        """
+        Tick the board source() returns rate times per second under lock and
+        hand every frame to deliver(tick, frame) on the event loop. Adding a
+        key that is already scheduled replaces it. Returns the new entry.
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.remove(key)
+        loop = asyncio.get_running_loop()
+        interval = 1 / rate
+        entry = ScheduledBoard(key, interval, source, deliver, lock, loop.time() + interval)
+        self.entries[key] = entry
+        if self.task is None or self.task.done():
+            self.position = self._slot_of(loop.time())
+            self.task = loop.create_task(self._run())
+        self._schedule(entry)
+        return entry
+
+    def remove(self, key: Any) -> None:
+        """Stop ticking a board; it leaves its wheel bucket when the wheel reaches it"""
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            entry.active = False
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Live boards, ticks run and how they ran, and how far from their
+        deadlines they ran: the lag is the absolute error, and early counts
+        the ticks that ran before their deadline
+        """
+        return {
+            "boards": len(self.entries),
+            "ticks": self.ticks,
+            "offloaded": self.offloaded,
+            "skipped_busy": self.skipped_busy,
+            "over_budget": self.over_budget,
+            "early": self.early,
+            "mean_lag_seconds": self.total_lag / self.ticks if self.ticks else 0.0,
+            "max_lag_seconds": self.max_lag
+        }
+
+    def _slot_of(self, now: float) -> int:
+        return int(now / self.slot_seconds)
+
+    def _schedule(self, entry: ScheduledBoard) -> None:
+        entry.slot = max(math.ceil(entry.deadline / self.slot_seconds), self.position + 1)
+        self.wheel[entry.slot % self.slots].append(entry)
+
+    def _retry(self, entry: ScheduledBoard) -> None:
+        """Busy with a request: try again in the next slot"""
+        self.skipped_busy += 1
+        entry.slot = self.position + 1
+        self.wheel[entry.slot % self.slots].append(entry)
+
+    def _due(self, current: int) -> List[ScheduledBoard]:
+        """Take the entries due by slot current out of the buckets passed since the last step"""
+        due = []
+        for slot in range(self.position + 1, min(current, self.position + self.slots) + 1):
+            bucket = self.wheel[slot % self.slots]
+            if not bucket:
+                continue
+            waiting = []
+            for entry in bucket:
+                if not entry.active:
+                    continue
+                if entry.slot <= current:
+                    due.append(entry)
+                else:
+                    waiting.append(entry)
+            bucket[:] = waiting
+        self.position = current
+        due.sort(key=lambda entry: entry.deadline)
+        return due
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self.entries:
+            await self._step(loop)
+            next_slot = (self.position + 1) * self.slot_seconds
+            await asyncio.sleep(max(0.0, next_slot - loop.time()))
+
+    async def _step(self, loop: asyncio.AbstractEventLoop) -> None:
+        start = time.perf_counter()
+        now = loop.time()
+        inline = []
+        batch = []
+        for entry in self._due(self._slot_of(now)):
+            if entry.deadline > now:
+                # Rounded into a slot that starts a hair before its deadline
+                entry.slot = self.position + 1
+                self.wheel[entry.slot % self.slots].append(entry)
+            elif entry.lock.busy():
+                self._retry(entry)
+            elif batch or time.perf_counter() - start >= self.budget:
+                batch.append(entry)
+            else:
+                async with entry.lock:
+                    frame = entry.source().step_frame()
+                inline.append((entry, frame))
+        if batch:
+            async with contextlib.AsyncExitStack() as locks:
+                taken = []
+                for entry in batch:
+                    # Boards removed or taken by a request meanwhile are not waited for
+                    if not entry.active:
+                        continue
+                    if entry.lock.busy():
+                        self._retry(entry)
+                        continue
+                    await locks.enter_async_context(entry.lock)
+                    taken.append(entry)
+                if taken:
+                    boards = [entry.source() for entry in taken]
+                    frames = await loop.run_in_executor(None, _step_boards, boards)
+                    self.over_budget += 1
+                    self.offloaded += len(taken)
+                    inline.extend(zip(taken, frames))
+
+        for entry, frame in inline:
+            # Every tick that ran counts, even if its board was removed meanwhile
+            lag = now - entry.deadline
+            if lag < 0:
+                self.early += 1
+            self.ticks += 1
+            self.total_lag += abs(lag)
+            self.max_lag = max(self.max_lag, abs(lag))
+            entry.ticks += 1
+            if not entry.active:
+                continue
+            entry.deliver(entry.ticks, frame)
+            entry.deadline += entry.interval
+            if entry.deadline < now:
+                # Fell behind by a whole interval: carry on from now instead of catching up in a burst
+                entry.deadline = now + entry.interval
+            self._schedule(entry)
+
+
+def _step_boards(boards: List[GameBoard]) -> List[Dict[str, Any]]:
+    """One tick of every board, run in a worker thread"""
+    return [board.step_frame() for board in boards]
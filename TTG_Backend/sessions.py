@@ -0,0 +1,259 @@
+"""
+Per-session board store for the API.
+
+Every client session owns one GameBoard. Sessions are kept in least recently
+used order; idle sessions expire after ttl seconds and the least recently
+used ones are evicted while there are more than max_sessions of them or
+their estimated memory is over max_bytes. The session being accessed is
+never evicted, and neither is one whose board lock is held or waited for:
+a request resolves its Session once and works on it until it is done, so
+the caps may be exceeded until those requests finish. Memory is estimated from the sizes bench_session_memory
+measures instead of being traced, so the accounting costs a few additions
+per request; each estimate is as of the last access to its session.
+
+Every session also has a BoardHistory, which versions its board and caches
+its serialized responses (counted in its memory), and a BoardLock. Requests on one board take turns on
+its lock while requests on other boards go ahead, and the locks count how
+many requests wait and for how long.
+"""
+import asyncio
+import itertools
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from game_logic import GameBoard
+from history import BoardHistory
+
+# Estimated bytes of a board and of what grows on it while it is played
+BOARD_BYTES = 1500
+MARBLE_BYTES = 90
+OUTPUT_BYTES = 8
+PATH_BYTES = 300
+HISTORY_ENTRY_BYTES = 250
+
+DEFAULT_MAX_SESSIONS = 10000
+DEFAULT_MAX_BYTES = 64 * 2 ** 20
+DEFAULT_TTL = 3600.0
+
+
+def board_bytes(board: GameBoard) -> int:
+    """Estimated memory of a board, its marbles, output and cached paths"""
+    return (BOARD_BYTES + MARBLE_BYTES * len(board.marbles) + OUTPUT_BYTES * len(board.marble_output)
+            + PATH_BYTES * len(board.path_cache.entries))
+
+
+class LockMetrics:
+    """Queue depth and wait time counters of one or more board locks"""
+
+    def __init__(self):
+        self.waiting = 0
+        self.max_waiting = 0
+        self.acquisitions = 0
+        self.contended = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+            "acquisitions": self.acquisitions,
+            "contended": self.contended,
+            "wait_seconds": self.wait_seconds,
+            "max_wait_seconds": self.max_wait_seconds
+        }
+
+
+class BoardLock:
+    """
+    asyncio lock of one board, used with async with. Keeps its own metrics
+    and adds them to totals, the metrics shared by every lock of a store.
+    """
+
+    def __init__(self, totals: LockMetrics, clock: Callable[[], float] = time.perf_counter):
+        self.lock = asyncio.Lock()
+        self.metrics = LockMetrics()
+        self.totals = totals
+        self.clock = clock
+
+    def locked(self) -> bool:
+        return self.lock.locked()
+
+    def busy(self) -> bool:
+        """Held, or waited for by a request that will hold it"""
+        return self.lock.locked() or self.metrics.waiting > 0
+
+    async def __aenter__(self) -> "BoardLock":
+        metrics = (self.metrics, self.totals)
+        if not self.lock.locked():
+            await self.lock.acquire()
+            for m in metrics:
+                m.acquisitions += 1
+            return self
+
+        start = self.clock()
+        for m in metrics:
+            m.waiting += 1
+            m.max_waiting = max(m.max_waiting, m.waiting)
+        try:
+            await self.lock.acquire()
+        finally:
+            for m in metrics:
+                m.waiting -= 1
+        wait = self.clock() - start
+        for m in metrics:
+            m.acquisitions += 1
+            m.contended += 1
+            m.wait_seconds += wait
+            m.max_wait_seconds = max(m.max_wait_seconds, wait)
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.lock.release()
+
+
+class Session:
+    """The board of one session with its lock, history and store bookkeeping"""
+    __slots__ = ("board", "lock", "history", "last", "bytes")
+
+    def __init__(self, board: GameBoard, lock: BoardLock, now: float):
+        self.board = board
+        self.lock = lock
+        self.history = BoardHistory(board)
+        self.last = now
+        self.bytes = 0
+
+
+class SessionStore:
+    def __init__(self, factory: Callable[[], GameBoard], max_sessions: int = DEFAULT_MAX_SESSIONS,
+                 max_bytes: int = DEFAULT_MAX_BYTES, ttl: float = DEFAULT_TTL,
+                 clock: Callable[[], float] = time.monotonic):
+        if max_sessions < 1:
+            raise ValueError("max_sessions must be at least 1")
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        # Session id -> Session, least recently used first
+        self.sessions: OrderedDict = OrderedDict()
+        self.lock_metrics = LockMetrics()
+        self.total_bytes = 0
+        self.hits = 0
+        self.created = 0
+        self.evicted_lru = 0
+        self.evicted_ttl = 0
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self.sessions
+
+    def session(self, session_id: str) -> Session:
+        """
+        A session, created with the factory on first access. Take its lock
+        before reading or changing its board; a locked session is not evicted.
+        """
+        return self._touch(session_id)
+
+    def get(self, session_id: str) -> GameBoard:
+        """The board of a session"""
+        return self._touch(session_id).board
+
+    def lock(self, session_id: str) -> BoardLock:
+        """The lock of a session's board"""
+        return self._touch(session_id).lock
+
+    def history(self, session_id: str) -> BoardHistory:
+        """The version history of a session's board"""
+        return self._touch(session_id).history
+
+    def put(self, session_id: str, board: GameBoard) -> None:
+        """Replace the board of a session; its history starts over"""
+        now = self.clock()
+        self.expire(now)
+        entry = self.sessions.get(session_id)
+        if entry is None:
+            entry = self.sessions[session_id] = Session(board, BoardLock(self.lock_metrics), now)
+        else:
+            self.sessions.move_to_end(session_id)
+            entry.board = board
+            entry.last = now
+            entry.history = BoardHistory(board)
+        self._account(entry)
+        self._evict()
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Drop the sessions idle for longer than the TTL, unless busy; returns how many"""
+        if now is None:
+            now = self.clock()
+        expired = []
+        for session_id, entry in self.sessions.items():
+            if now - entry.last <= self.ttl:
+                break
+            if not entry.lock.busy():
+                expired.append(session_id)
+        for session_id in expired:
+            self._drop(session_id)
+        self.evicted_ttl += len(expired)
+        return len(expired)
+
+    def stats(self) -> Dict[str, Any]:
+        """Occupancy, estimated memory and eviction counters"""
+        return {
+            "sessions": len(self.sessions),
+            "max_sessions": self.max_sessions,
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "created": self.created,
+            "evicted_lru": self.evicted_lru,
+            "evicted_ttl": self.evicted_ttl,
+            "locks": self.lock_metrics.stats()
+        }
+
+    def _touch(self, session_id: str) -> Session:
+        now = self.clock()
+        self.expire(now)
+        entry = self.sessions.get(session_id)
+        if entry is None:
+            self.created += 1
+            entry = self.sessions[session_id] = Session(self.factory(), BoardLock(self.lock_metrics), now)
+        else:
+            self.hits += 1
+            self.sessions.move_to_end(session_id)
+            entry.last = now
+        self._account(entry)
+        self._evict()
+        return entry
+
+    def _account(self, entry: Session) -> None:
+        history = entry.history
+        size = board_bytes(entry.board) + HISTORY_ENTRY_BYTES * len(history.log) + history.cache_bytes
+        self.total_bytes += size - entry.bytes
+        entry.bytes = size
+
+    def _evict(self) -> None:
+        # The session just accessed is the most recently used one, so it is never a victim
+        if len(self.sessions) <= self.max_sessions and self.total_bytes <= self.max_bytes:
+            return
+        victims = []
+        count = len(self.sessions)
+        size = self.total_bytes
+        for session_id, entry in itertools.islice(self.sessions.items(), count - 1):
+            if count <= self.max_sessions and size <= self.max_bytes:
+                break
+            if entry.lock.busy():
+                continue
+            victims.append(session_id)
+            count -= 1
+            size -= entry.bytes
+        for session_id in victims:
+            self._drop(session_id)
+        self.evicted_lru += len(victims)
+
+    def _drop(self, session_id: str) -> None:
+        self.total_bytes -= self.sessions.pop(session_id).bytes
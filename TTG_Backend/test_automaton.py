@@ -0,0 +1,109 @@
+import challenges
+from automaton import compile_board
+from game_logic import GameBoard, ComponentType, RUN_MODE_TICK, HALT_NO_MARBLES, HALT_MAX_TICKS, HALT_INFINITE_LOOP
+
+
+def test_machine_runs_match_board_runs():
+    for challenge_id in ("10", "17", "23", "27"):
+        machine = compile_board(challenges.create_challenge_board(challenge_id))
+        for state in range(0, 1 << len(machine.bit_indices), 7):
+            for launcher in ("left", "right"):
+                for max_ticks in (3, 40, 10000):
+                    board = machine.board_for(state, 8, 8)
+                    expected = board.run(launcher, max_ticks, RUN_MODE_TICK)
+                    expected["state"] = machine.state_of(board)
+                    assert machine.run(state, launcher, 8, 8, max_ticks) == expected
+
+
+def test_machine_chains_runs_through_states():
+    board = challenges.create_challenge_board("17")
+    machine = compile_board(board)
+    state = machine.state_of(board)
+    for _ in range(5):
+        board.set_number_of_marbles(3, 3)
+        board.marble_output = []
+        result = machine.run(state, "left", 3, 3)
+        expected = board.run("left")
+        assert result["output"] == expected["output"] and result["bits"] == expected["bits"]
+        state = result["state"]
+
+
+def test_machines_are_cached_per_layout():
+    first = challenges.create_challenge_board("27")
+    second = challenges.create_challenge_board("27")
+    second.add_component(ComponentType.BIT_RIGHT, 4, 4)
+    machine = compile_board(first)
+    assert compile_board(second) is machine
+    assert machine.state_of(second) == 1
+
+    second.add_component(ComponentType.RAMP_LEFT, 5, 3)
+    assert second.machine is None
+    assert compile_board(second) is not machine
+    assert compile_board(first) is machine
+
+
+def create_alternating_board():
+    """Challenge 23 with levers that alternate red and blue with a period of four marbles"""
+    board = challenges.create_challenge_board("23")
+    board.add_component(ComponentType.LEVER_BLUE, 9, 11)
+    board.add_component(ComponentType.LEVER_RED, 6, 3)
+    board.add_component(ComponentType.LEVER_RED, 4, 8)
+    return board
+
+
+def test_run_marbles_skips_cycles():
+    board = create_alternating_board()
+    machine = compile_board(board)
+    state = machine.state_of(board)
+    for red, blue in ((0, 5), (7, 5), (40, 41), (300, 200)):
+        result = machine.run_marbles(state, "left", red, blue)
+        expected = machine.run(state, "left", red, blue, 100000)
+        output = result["output_prefix"] + result["output_cycle"] * result["output_length"]
+        assert output[:result["output_length"]] == expected["output"]
+        for key in ("ticks", "state", "halt_reason", "red_marbles", "blue_marbles"):
+            assert result[key] == expected[key]
+
+    result = machine.run_marbles(state, "left", 10 ** 9, 10 ** 9)
+    assert result["cycle"] == {"prefix": 1, "period": 4, "ticks": 35, "red": 2, "blue": 2}
+    assert result["output_cycle"] == ["red", "blue", "red", "blue"]
+    assert result["marbles"] == result["output_length"] == 2 * 10 ** 9
+    assert result["halt_reason"] == HALT_NO_MARBLES
+
+
+def test_run_marbles_jumps_to_marble():
+    board = create_alternating_board()
+    machine = compile_board(board)
+    state, launcher, red, blue = machine.state_of(board), "left", 10 ** 6, 10 ** 6
+    output = []
+    for _ in range(23):
+        result = machine.run_marbles(state, launcher, red, blue, marbles=1)
+        output += result["output_prefix"]
+        state, launcher, red, blue = result["state"], result["launcher"], result["red_marbles"], result["blue_marbles"]
+
+    result = machine.run_marbles(machine.state_of(board), "left", 10 ** 6, 10 ** 6, marbles=23)
+    assert result["halt_reason"] is None and result["marbles"] == 23
+    assert (result["state"], result["launcher"], result["red_marbles"], result["blue_marbles"]) == (state, launcher, red, blue)
+    cycle_output = result["output_prefix"] + result["output_cycle"] * 23
+    assert cycle_output[:result["output_length"]] == output
+
+
+def test_run_marbles_reports_infinite_loops():
+    # Two gear bits next to each other flip each other and send the marble back and forth
+    board = GameBoard(8, 8)
+    board.add_component(ComponentType.RAMP_LEFT, 5, 1)
+    board.add_component(ComponentType.GEAR_BIT_LEFT, 4, 2)
+    board.add_component(ComponentType.GEAR_BIT_LEFT, 5, 2)
+    machine = compile_board(board)
+    result = machine.run_marbles(0, "left", 8, 8)
+    assert result["halt_reason"] == HALT_INFINITE_LOOP and result["marbles"] == 1
+    assert machine.run(0, "left", 8, 8, 500)["halt_reason"] == HALT_MAX_TICKS
+
+
+if __name__ == "__main__":
+    test_machine_runs_match_board_runs()
+    test_machine_chains_runs_through_states()
+    test_machines_are_cached_per_layout()
+    test_run_marbles_skips_cycles()
+    test_run_marbles_jumps_to_marble()
+    test_run_marbles_reports_infinite_loops()
+    print("All automaton tests passed!")
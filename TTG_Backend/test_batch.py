@@ -0,0 +1,55 @@
+import challenges
+from batch import simulate_batch, pack_placements
+from game_logic import ComponentType, CELL_CODES
+
+JOBS = [
+    ("1", [{"type": "ramp_left", "x": 5, "y": 5}]),
+    ("1", []),
+    ("3", [(ComponentType.BIT_LEFT, 7, 9), (ComponentType.RAMP_RIGHT, 6, 10)]),
+    ("16", []),
+    ("1", [{"type": "crossover", "x": 4, "y": 6}, {"type": "ramp_right", "x": 6, "y": 7}]),
+]
+
+
+def expected_results(launcher: str = "left"):
+    results = {}
+    for index, (challenge_id, placements) in enumerate(JOBS):
+        board = challenges.create_challenge_board(challenge_id)
+        for component_type, x, y in [(p["type"], p["x"], p["y"]) if isinstance(p, dict) else p
+                                     for p in placements]:
+            board.add_component(ComponentType(component_type), x, y)
+        results[index] = board.run(launcher)
+    return results
+
+
+def test_batch_matches_single_runs():
+    challenge_ids = [challenge_id for challenge_id, _ in JOBS]
+    placements = [parts for _, parts in JOBS]
+    expected = expected_results()
+    for workers in (1, 2):
+        results = list(simulate_batch(challenge_ids, placements, workers=workers, chunk_size=2))
+        assert sorted(index for index, _ in results) == list(range(len(JOBS)))
+        assert dict(results) == expected
+
+
+def test_batch_rejects_bad_input():
+    for challenge_ids, placements, chunk_size in ((["1"], [[]], 0), (["nope"], [[]], 1),
+                                                  (["1"], [[("wheel", 1, 1)]], 1)):
+        try:
+            list(simulate_batch(challenge_ids, placements, workers=1, chunk_size=chunk_size))
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("bad batch input was accepted")
+
+
+def test_pack_placements():
+    assert pack_placements([{"type": "ramp_left", "x": 1, "y": 2}, (ComponentType.GEAR, 3, 4)]) == \
+        ((CELL_CODES[ComponentType.RAMP_LEFT], 1, 2), (CELL_CODES[ComponentType.GEAR], 3, 4))
+
+
+if __name__ == "__main__":
+    test_batch_matches_single_runs()
+    test_batch_rejects_bad_input()
+    test_pack_placements()
+    print("All batch tests passed!")
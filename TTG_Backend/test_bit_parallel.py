@@ -0,0 +1,57 @@
+import challenges
+from bit_parallel import evaluate_bit_configurations, verify_all_configurations
+from game_logic import GameBoard, CELL_BIT_LEFT, CELL_BIT_RIGHT, CELL_GEAR_BIT_LEFT, CELL_GEAR_BIT_RIGHT, BIT_CELLS
+
+
+def run_configuration(board: GameBoard, launcher: str, configuration: int) -> dict:
+    """Reference: one scalar run with the bits set to the configuration"""
+    board = GameBoard.from_image(board.to_image())
+    bits = [index for index, code in enumerate(board.cells) if code in BIT_CELLS]
+    for position, index in enumerate(bits):
+        right = configuration >> position & 1
+        if board.cells[index] in (CELL_BIT_LEFT, CELL_BIT_RIGHT):
+            board.cells[index] = CELL_BIT_RIGHT if right else CELL_BIT_LEFT
+        else:
+            board.cells[index] = CELL_GEAR_BIT_RIGHT if right else CELL_GEAR_BIT_LEFT
+    board.layout_changed()
+    return board.run(launcher)
+
+
+def test_matches_scalar_runs_for_every_configuration():
+    for challenge_id in ("27", "17", "10"):
+        board = challenges.create_challenge_board(challenge_id)
+        for launcher in ("left", "right"):
+            for word_size in (64, 5):
+                results = evaluate_bit_configurations(board, launcher, word_size=word_size)
+                assert len(results) == 1 << sum(code in BIT_CELLS for code in board.cells)
+                for configuration, result in enumerate(results):
+                    assert result == run_configuration(board, launcher, configuration)
+
+
+def test_verify_reports_failing_configurations():
+    board = challenges.create_challenge_board("23")
+    results = evaluate_bit_configurations(board, "left")
+    expected = results[5]["output"]
+    failing = [configuration for configuration, result in enumerate(results) if result["output"] != expected]
+    assert len(failing) == len(results) - 1
+    assert verify_all_configurations(board, expected, "left") == failing
+
+
+def test_bit_cells_selects_the_varied_bits():
+    board = challenges.create_challenge_board("27")
+    results = evaluate_bit_configurations(board, bit_cells=[(4, 4), (7, 5)])
+    assert len(results) == 4
+    assert results[0] == board.run("left")
+    try:
+        evaluate_bit_configurations(challenges.create_challenge_board("27"), bit_cells=[(5, 5)])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("a cell without a bit was accepted")
+
+
+if __name__ == "__main__":
+    test_matches_scalar_runs_for_every_configuration()
+    test_verify_reports_failing_configurations()
+    test_bit_cells_selects_the_varied_bits()
+    print("All bit-parallel tests passed!")
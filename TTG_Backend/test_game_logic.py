@@ -0,0 +1,420 @@
+import challenges
+from game_logic import (GameBoard, ComponentType, Component, Marble, CELL_CODES, CELL_TYPES,
+                        DIRECTIONS, HALT_NO_MARBLES, HALT_STALLED, HALT_MAX_TICKS, RUN_MODE_TICK,
+                        PathCache, transition_table, base_layout)
+
+# (challenge id, start launcher) -> (ticks until halt, output initials, red left, blue left)
+# Recorded from the reference engine; every engine change must reproduce these runs.
+EXPECTED_CHALLENGE_RUNS = {
+    ("default", "left"): (113, "bbbbbbbb", 8, 0),
+    ("default", "right"): (113, "rrrrrrrr", 0, 8),
+    ("1", "left"): (113, "bbbbbbbb", 8, 0),
+    ("1", "right"): (113, "rrrrrrrr", 0, 8),
+    ("2", "left"): (127, "brrrrrrrr", 0, 7),
+    ("2", "right"): (113, "rrrrrrrr", 0, 8),
+    ("3", "left"): (113, "bbbbbbbb", 8, 0),
+    ("3", "right"): (113, "rrrrrrrr", 0, 8),
+    ("4", "left"): (17, "", 8, 8),
+    ("4", "right"): (17, "", 8, 8),
+    ("5", "left"): (128, "brrrrrrrr", 0, 7),
+    ("5", "right"): (113, "rrrrrrrr", 0, 8),
+    ("6", "left"): (113, "bbbbbbbb", 8, 0),
+    ("6", "right"): (113, "rrrrrrrr", 0, 8),
+    ("7", "left"): (19, "", 8, 8),
+    ("7", "right"): (113, "rrrrrrrr", 0, 8),
+    ("8", "left"): (226, "bbrbrbrbrbrbrbr", 1, 0),
+    ("8", "right"): (241, "rbrbrbrbrbrbrbrb", 0, 0),
+    ("9", "left"): (18, "", 8, 8),
+    ("9", "right"): (33, "r", 7, 8),
+    ("10", "left"): (18, "", 8, 8),
+    ("10", "right"): (18, "", 8, 8),
+    ("11", "left"): (33, "b", 0, 1),
+    ("11", "right"): (0, "", 0, 2),
+    ("12", "left"): (28, "b", 8, 6),
+    ("12", "right"): (12, "", 7, 8),
+    ("13", "left"): (28, "b", 8, 6),
+    ("13", "right"): (12, "", 7, 8),
+    ("14", "left"): (113, "bbbbbbbb", 8, 0),
+    ("14", "right"): (113, "rrrrrrrr", 0, 8),
+    ("15", "left"): (18, "", 8, 8),
+    ("15", "right"): (6, "", 7, 8),
+    ("16", "left"): (55, "bbb", 8, 4),
+    ("16", "right"): (113, "rrrrrrrr", 0, 8),
+    ("17", "left"): (19, "", 3, 3),
+    ("17", "right"): (18, "", 3, 3),
+    ("18", "left"): (10, "", 8, 7),
+    ("18", "right"): (10, "", 7, 8),
+    ("19", "left"): (113, "bbbbbbbb", 8, 0),
+    ("19", "right"): (113, "rrrrrrrr", 0, 8),
+    ("20", "left"): (113, "bbbbbbbb", 0, 0),
+    ("20", "right"): (0, "", 0, 8),
+    ("21", "left"): (18, "", 0, 15),
+    ("21", "right"): (0, "", 0, 15),
+    ("22", "left"): (18, "", 0, 15),
+    ("22", "right"): (0, "", 0, 15),
+    ("23", "left"): (12, "", 8, 7),
+    ("23", "right"): (113, "rrrrrrrr", 0, 8),
+    ("24", "left"): (33, "b", 8, 7),
+    ("24", "right"): (113, "rrrrrrrr", 0, 8),
+    ("25", "left"): (113, "bbbbbbbb", 8, 0),
+    ("25", "right"): (113, "rrrrrrrr", 0, 8),
+    ("26", "left"): (141, "bbbbbbbbbb", 10, 0),
+    ("26", "right"): (6, "", 9, 10),
+    ("27", "left"): (113, "bbbbbbbb", 8, 0),
+    ("27", "right"): (113, "rrrrrrrr", 0, 8),
+    ("28", "left"): (226, "bbrbrbrbrbrbrbr", 1, 0),
+    ("28", "right"): (241, "rbrbrbrbrbrbrbrb", 0, 0),
+    ("29", "left"): (33, "b", 8, 7),
+    ("29", "right"): (113, "rrrrrrrr", 0, 8),
+    ("30", "left"): (125, "bbbbbbbb", 8, 0),
+    ("30", "right"): (113, "rrrrrrrr", 0, 8),
+}
+
+
+def create_board(challenge_id: str) -> GameBoard:
+    return challenges.create_challenge_board(challenge_id)
+
+
+def step_to_halt(board: GameBoard, launcher: str, max_ticks: int = 3000) -> int:
+    board.set_active_launcher(launcher)
+    board.launch_marble("blue" if launcher == "left" else "red")
+    ticks = 0
+    while ticks < max_ticks and any(marble.is_moving for marble in board.marbles):
+        board.update_marble_positions()
+        ticks += 1
+    return ticks
+
+
+def test_challenge_runs_match_reference():
+    for (challenge_id, launcher), expected in EXPECTED_CHALLENGE_RUNS.items():
+        board = create_board(challenge_id)
+        ticks = step_to_halt(board, launcher)
+        output = "".join(color[0] for color in board.marble_output)
+        actual = (ticks, output, board.red_marbles, board.blue_marbles)
+        assert actual == expected, f"challenge {challenge_id} ({launcher}): {actual} != {expected}"
+
+
+def test_run_matches_stepping():
+    for (challenge_id, launcher), (ticks, output, red, blue) in EXPECTED_CHALLENGE_RUNS.items():
+        result = create_board(challenge_id).run(launcher)
+        assert result["ticks"] == ticks
+        assert "".join(color[0] for color in result["output"]) == output
+        assert (result["red_marbles"], result["blue_marbles"]) == (red, blue)
+        assert result["halt_reason"] in (HALT_NO_MARBLES, HALT_STALLED)
+
+
+def test_jump_mode_matches_tick_mode():
+    # Cut runs off at arbitrary budgets, then resume, to land mid-path and on levers
+    for challenge_id, launcher in EXPECTED_CHALLENGE_RUNS:
+        for max_ticks in (0, 1, 2, 7, 30):
+            jump = create_board(challenge_id)
+            tick = create_board(challenge_id)
+            assert jump.run(launcher, max_ticks) == tick.run(launcher, max_ticks, RUN_MODE_TICK)
+            assert jump.run_until_halt() == tick.run_until_halt(mode=RUN_MODE_TICK)
+            assert [(m.color, m.x, m.y, m.direction, m.is_moving) for m in jump.marbles] == \
+                [(m.color, m.x, m.y, m.direction, m.is_moving) for m in tick.marbles]
+            assert bytes(jump.occupied) == bytes(tick.occupied)
+
+
+def test_path_cache_replays_runs():
+    cached = create_board("3")
+    walked = create_board("3")
+    for _ in range(4):
+        for board in (cached, walked):
+            board.set_number_of_marbles(8, 8)
+            board.marble_output = []
+        assert cached.run("left") == walked.run("left", mode=RUN_MODE_TICK)
+        assert bytes(cached.cells) == bytes(walked.cells)
+    stats = cached.path_cache.stats()
+    assert stats["hits"] > 0 and stats["size"] == stats["misses"]
+
+    cached.add_component(ComponentType.RAMP_LEFT, 3, 5)
+    assert cached.path_cache.stats()["size"] == 0
+
+
+def test_path_cache_evicts_least_recently_used():
+    cache = PathCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats() == {"size": 2, "maxsize": 2, "hits": 3, "misses": 1, "evictions": 1}
+
+
+def test_board_image_round_trip():
+    board = create_board("17")
+    board.components[4][4].gear_rotation = 90
+    board.components[8][4].gear_bit_state = True
+    board.run("right", 5)
+    image = board.to_image()
+    copy = GameBoard.from_image(image)
+    assert copy.to_image() == image
+    assert copy.run_until_halt() == board.run_until_halt()
+
+
+def test_challenge_boards_are_fresh_copies():
+    image = challenges.challenge_image("17")
+    board = create_board("17")
+    board.add_component(ComponentType.RAMP_LEFT, 7, 9)
+    board.run("left", 20)
+    assert challenges.challenge_image("17") is image
+    assert create_board("17").to_image() == image
+    assert create_board("17").run("left") == create_board("17").run("left")
+    try:
+        create_board("nope")
+        assert False, "unknown challenges must be rejected"
+    except ValueError:
+        pass
+
+
+def apply_frame(state: dict, output: list, frame: dict) -> None:
+    if "marbles" in frame:
+        state["marbles"] = [(marble["color"], marble["x"], marble["y"]) for marble in frame["marbles"]]
+    for cell in frame.get("flipped", ()):
+        state["components"][cell["y"]][cell["x"]]["type"] = cell["type"]
+    output.extend(frame.get("output", ()))
+    for key in ("red_marbles", "blue_marbles", "active_launcher"):
+        state[key] = frame.get(key, state[key])
+
+
+def test_step_frames_replay_ticks():
+    outputs = flips = 0
+    for challenge_id in ("8", "17", "30"):
+        board = create_board(challenge_id)
+        board.set_active_launcher("left")
+        board.launch_marble("blue")
+        state = board.get_state()
+        state["marbles"] = [(marble["color"], marble["x"], marble["y"]) for marble in state["marbles"]]
+        output = []
+        frames = 0
+        while board.marbles and frames < 400:
+            frame = board.step_frame()
+            apply_frame(state, output, frame)
+            flips += len(frame.get("flipped", ()))
+            expected = board.get_state()
+            assert state["marbles"] == [(m["color"], m["x"], m["y"]) for m in expected["marbles"]]
+            assert [[c["type"] for c in row] for row in state["components"]] == \
+                [[c["type"] for c in row] for row in expected["components"]]
+            assert [state[key] for key in ("red_marbles", "blue_marbles", "active_launcher")] == \
+                [expected[key] for key in ("red_marbles", "blue_marbles", "active_launcher")]
+            assert frame["moving"] == sum(marble.is_moving for marble in board.marbles)
+            frames += 1
+        assert output == board.marble_output
+        outputs += len(output)
+    assert outputs and flips
+
+
+def test_bit_register_follows_every_flip():
+    for challenge_id in ("8", "17", "23", "27"):
+        for mode in ("jump", RUN_MODE_TICK):
+            board = create_board(challenge_id)
+            board.run("left", 200, mode)
+            board.marble_output = []
+            board.run("right", 3000, mode)
+            recounted = GameBoard.from_image(board.to_image())
+            assert board.bit_register == recounted.bit_register
+            assert board.bit_hash == recounted.bit_hash
+
+
+def test_gear_groups_follow_placements():
+    board = GameBoard(8, 8)
+    for x in range(2, 8):
+        board.add_component(ComponentType.GEAR, x, 5)
+    board.add_component(ComponentType.GEAR_BIT_LEFT, 2, 4)
+    board.add_component(ComponentType.GEAR_BIT_RIGHT, 7, 6)
+    board.add_component(ComponentType.GEAR_BIT_LEFT, 11, 5)
+    assert len(board.get_gear_groups()) == 2
+    assert board.get_gear_groups()[0][0] == {"x": 2, "y": 4}
+
+    board.flip_gears(5, 5)
+    assert board.get_cell(2, 4) == ComponentType.GEAR_BIT_RIGHT
+    assert board.get_cell(7, 6) == ComponentType.GEAR_BIT_LEFT
+    assert board.get_cell(11, 5) == ComponentType.GEAR_BIT_LEFT
+    assert board.bit_register == GameBoard.from_image(board.to_image()).bit_register
+
+    # Gears joining and splitting networks regroup them
+    for x in range(8, 11):
+        board.add_component(ComponentType.GEAR, x, 5)
+    assert len(board.get_gear_groups()) == 1
+    board.add_component(ComponentType.EMPTY, 4, 5)
+    assert [len(cells) for cells in board.get_gear_groups()] == [3, 8]
+    board.flip_gears(9, 5)
+    assert board.get_cell(2, 4) == ComponentType.GEAR_BIT_RIGHT
+    assert board.get_cell(11, 5) == ComponentType.GEAR_BIT_RIGHT
+
+
+def test_batch_placements_are_all_or_nothing():
+    placements = [(ComponentType.GEAR, x, 5) for x in range(2, 8)]
+    placements += [(ComponentType.GEAR_BIT_LEFT, 3, 4), (ComponentType.BIT_RIGHT, 5, 3),
+                   (ComponentType.RAMP_LEFT, 5, 3), (ComponentType.CROSSOVER, 6, 7)]
+    one_by_one = create_board("17")
+    for placement in placements:
+        one_by_one.add_component(*placement)
+    batched = create_board("17")
+    batched.add_components(placements)
+    assert batched.to_image() == one_by_one.to_image()
+    assert batched.get_gear_groups() == one_by_one.get_gear_groups()
+    assert batched.run_until_halt() == one_by_one.run_until_halt()
+
+    # Sending a whole board back is allowed: fixed cells may take their own type again
+    resent = create_board("17")
+    resent.add_components([(ComponentType(cell["type"]), x, y)
+                           for y, row in enumerate(batched.get_state()["components"])
+                           for x, cell in enumerate(row)])
+    assert bytes(resent.cells) == bytes(batched.cells)
+
+    board = create_board("17")
+    image = board.to_image()
+    for bad in ((ComponentType.RAMP_LEFT, 15, 3), (ComponentType.RAMP_LEFT, 3, -1), ("ramp_left", 3, 3),
+                (ComponentType.RAMP_LEFT, 0, 5), (ComponentType.GEAR, 5, 14), (ComponentType.EMPTY, 5, 2),
+                (ComponentType.LEVER_BLUE, 3, 3)):
+        try:
+            board.add_components(placements + [bad])
+            assert False, "a batch with a bad placement must be rejected"
+        except ValueError as error:
+            assert f"Placement {len(placements)}" in str(error)
+        assert board.to_image() == image
+
+
+def test_boards_start_from_the_base_layout():
+    built = GameBoard(8, 8)
+    built.cells[:] = bytes(len(built.cells))
+    built.setup_board_structure()
+    assert bytes(built.cells) == base_layout(15, 17)
+
+    board = create_board("17")
+    board.run("left")
+    board.reset()
+    assert bytes(board.cells) == base_layout(15, 17) and not any(board.occupied)
+    assert board.bit_register == 0 and not board.gear_groups and board.path_cache.stats()["size"] == 0
+
+
+def test_forks_are_independent():
+    board = create_board("8")
+    board.run("left", 40)
+    image = board.to_image()
+    fork = board.fork()
+    assert fork.to_image() == image and fork.path_cache is board.path_cache
+
+    expected = GameBoard.from_image(image).run_until_halt(mode=RUN_MODE_TICK)
+    assert fork.run_until_halt() == expected
+    assert board.to_image() == image
+    assert board.run_until_halt() == expected
+
+    # A layout change on the fork leaves the board's cache alone
+    board.set_number_of_marbles(8, 8)
+    other = board.fork()
+    other.add_component(ComponentType.RAMP_LEFT, 5, 3)
+    assert other.path_cache is not board.path_cache and other.gear_groups is not board.gear_groups
+    other.run("left")
+    expected = GameBoard.from_image(board.to_image()).run("left", mode=RUN_MODE_TICK)
+    assert board.run("left") == expected
+
+
+def test_snapshot_restores_state():
+    board = create_board("8")
+    start = board.snapshot()
+    image = board.to_image()
+    start_hash = board.state_hash()
+    board.run("left", 40)
+    middle = board.snapshot()
+    middle_image = board.to_image()
+    assert middle != start and board.state_hash() != start_hash
+
+    board.run_until_halt()
+    board.restore(middle)
+    assert board.to_image() == middle_image and board.snapshot() == middle
+    board.restore(start)
+    assert board.to_image() == image and board.state_hash() == start_hash
+
+
+def test_run_reports_halt_reason_and_bits():
+    result = create_board("17").run("right", max_ticks=5)
+    assert result["ticks"] == 5
+    assert result["halt_reason"] == HALT_MAX_TICKS
+
+    result = create_board("10").run("left")
+    assert result["halt_reason"] == HALT_STALLED
+    assert {"x": 9, "y": 3, "type": "bit_left"} in result["bits"]
+
+    result = create_board("16").run("left")
+    assert result["halt_reason"] == HALT_NO_MARBLES
+    assert result["output"] == ["blue", "blue", "blue"]
+
+
+def test_transition_table_covers_every_cell_and_direction():
+    table = transition_table(15)
+    assert len(table) == len(CELL_TYPES)
+    for rules in table:
+        for direction in DIRECTIONS + (None,):
+            action, effect, moves, blocked = rules[direction]
+            assert effect is None or len(effect) == 2
+
+
+def test_crossover_keeps_direction_and_bit_flips():
+    board = GameBoard(8, 8)
+    board.add_component(ComponentType.CROSSOVER, 7, 5)
+    board.add_component(ComponentType.BIT_LEFT, 5, 7)
+    board.marbles.append(Marble("red", 7, 5, "left"))
+    board.marbles.append(Marble("blue", 5, 7, "left"))
+
+    assert board.update_marble_positions() == 2
+    red, blue = board.marbles
+    assert (red.x, red.y, red.direction) == (6, 5, "left")
+    assert (blue.x, blue.y, blue.direction) == (6, 7, "right")
+    assert board.get_cell(5, 7) == ComponentType.BIT_RIGHT
+
+
+def test_component_view_reads_packed_cells():
+    board = GameBoard(8, 8)
+    board.add_component(ComponentType.BIT_LEFT, 5, 3)
+
+    assert board.cells[3 * board.width + 5] == CELL_CODES[ComponentType.BIT_LEFT]
+    assert board.components[3][5].type == ComponentType.BIT_LEFT
+    assert board.components[2][5].type == ComponentType.LAUNCHER
+    assert board.components[16][0].type == ComponentType.CORNER_LEFT
+    assert len(board.components) == board.height
+    assert all(len(row) == board.width for row in board.components)
+
+
+def test_component_view_writes_packed_cells():
+    board = GameBoard(8, 8)
+    board.components[5][7].type = ComponentType.CROSSOVER
+    board.components[5][7].is_occupied = True
+    assert board.get_cell(7, 5) == ComponentType.CROSSOVER
+    assert board.check_collision(7, 5)
+
+    gear_bit = Component(ComponentType.GEAR_BIT_LEFT, 6, 6)
+    gear_bit.gear_bit_state = True
+    board.components[6][6] = gear_bit
+    view = board.components[6][6]
+    assert view.is_gear_bit and not view.is_gear
+    assert view.gear_bit_state is True
+
+    board.add_component(ComponentType.EMPTY, 6, 6)
+    assert board.components[6][6].gear_bit_state is False
+
+
+if __name__ == "__main__":
+    test_challenge_runs_match_reference()
+    test_run_matches_stepping()
+    test_jump_mode_matches_tick_mode()
+    test_path_cache_replays_runs()
+    test_path_cache_evicts_least_recently_used()
+    test_board_image_round_trip()
+    test_challenge_boards_are_fresh_copies()
+    test_step_frames_replay_ticks()
+    test_bit_register_follows_every_flip()
+    test_gear_groups_follow_placements()
+    test_batch_placements_are_all_or_nothing()
+    test_boards_start_from_the_base_layout()
+    test_forks_are_independent()
+    test_snapshot_restores_state()
+    test_run_reports_halt_reason_and_bits()
+    test_transition_table_covers_every_cell_and_direction()
+    test_crossover_keeps_direction_and_bit_flips()
+    test_component_view_reads_packed_cells()
+    test_component_view_writes_packed_cells()
+    print("All game logic tests passed!")
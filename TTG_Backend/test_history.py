@@ -0,0 +1,123 @@
+import gzip
+import json
+
+import challenges
+from game_logic import GameBoard, ComponentType
+from history import BoardHistory, etag_matches
+
+
+def apply_delta(state: dict, delta: dict) -> None:
+    for cell in delta["cells"]:
+        state["components"][cell["y"]][cell["x"]] = cell
+    for key in ("marbles", "gear_groups", "red_marbles", "blue_marbles", "active_launcher"):
+        if key in delta:
+            state[key] = delta[key]
+    if "output_start" in delta:
+        state["output"] = state["output"][:delta["output_start"]] + delta["output"]
+
+
+def board_state(board: GameBoard) -> dict:
+    return {**board.get_state(), "output": list(board.marble_output)}
+
+
+def test_deltas_rebuild_the_current_state():
+    board = challenges.create_challenge_board("30")
+    history = BoardHistory(board, limit=1000)
+    states = {history.version: board_state(board)}
+    board.set_active_launcher("left")
+    board.launch_marble("blue")
+    for tick in range(120):
+        board.update_marble_positions()
+        if tick == 40:
+            board.add_component(ComponentType.GEAR, 9, 12)
+        if tick == 80:
+            board.reset()
+            board.launch_marble("red")
+        states[history.record()] = board_state(board)
+
+    current = board_state(board)
+    for version in list(states)[::7]:
+        state = states[version]
+        delta = history.since(version)
+        assert delta["version"] == history.version and delta["since"] == version
+        apply_delta(state, delta)
+        assert state == current
+    assert history.since(history.version)["cells"] == []
+
+
+def test_unknown_versions_fall_back_to_full_state():
+    board = challenges.create_challenge_board("8")
+    history = BoardHistory(board, limit=4)
+    other = BoardHistory(challenges.create_challenge_board("8"))
+    first = history.version
+    assert history.record() == first
+    board.launch_marble("blue")
+    for _ in range(10):
+        board.update_marble_positions()
+        history.record()
+    assert history.version - first == 10
+    assert history.since(first) is None
+    assert history.since(history.version - 4) is not None
+    assert history.since(other.version) is None
+    assert history.since(history.version + 1) is None
+    assert history.knows(history.version - 4) and not history.knows(first)
+
+
+def test_ticks_return_their_delta():
+    board = challenges.create_challenge_board("8")
+    stepped = challenges.create_challenge_board("8")
+    history = BoardHistory(board)
+    for twin in (board, stepped):
+        twin.set_active_launcher("left")
+        twin.launch_marble("blue")
+    state = board_state(board)
+    ran = 0
+    for steps in (0, 1, 1, 7, 30, 100, 10000):
+        delta = history.tick(steps)
+        for _ in range(delta["ticks"]):
+            stepped.update_marble_positions()
+        ran += delta["ticks"]
+        apply_delta(state, delta)
+        assert state == board_state(board) == board_state(stepped)
+        assert delta["halted"] == (delta["ticks"] < steps)
+    assert delta["halted"] and delta["halt_reason"] == "no_marbles"
+    assert ran == 226 and "".join(color[0] for color in state["output"]) == "bbrbrbrbrbrbrbr"
+    assert history.tick(5)["ticks"] == 0
+
+
+def test_cached_bytes_follow_the_version():
+    board = challenges.create_challenge_board("8")
+    history = BoardHistory(board)
+    builds = []
+
+    def build():
+        builds.append(history.version)
+        return board.get_state()
+
+    body = history.cached("state", build)
+    assert json.loads(body) == board.get_state()
+    assert history.cached("state", build) is body
+    assert gzip.decompress(history.cached("state", build, compressed=True)) == body
+    assert history.cache_bytes == len(body) + len(history.cached("state", build, compressed=True))
+    assert len(builds) == 1
+
+    board.add_component(ComponentType.RAMP_LEFT, 7, 9)
+    changed = history.cached("state", build)
+    assert json.loads(changed) == board.get_state() and changed != body
+    assert len(builds) == 2 and history.cache_bytes == len(changed)
+
+
+def test_etags_match_like_if_none_match():
+    assert etag_matches('"7"', '"7"') and etag_matches("*", '"7-gz"')
+    assert etag_matches('"6", W/"7"', '"7"') and etag_matches('"7-gz"', 'W/"7-gz"')
+    assert not etag_matches('"7"', '"7-gz"') and not etag_matches('"6", "8"', '"7"')
+    assert not etag_matches(None, '"7"') and not etag_matches("", '"7"')
+
+
+if __name__ == "__main__":
+    test_deltas_rebuild_the_current_state()
+    test_unknown_versions_fall_back_to_full_state()
+    test_ticks_return_their_delta()
+    test_cached_bytes_follow_the_version()
+    test_etags_match_like_if_none_match()
+    print("All history tests passed!")
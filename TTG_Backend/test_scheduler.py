@@ -0,0 +1,148 @@
+import asyncio
+
+import challenges
+from scheduler import TickScheduler
+from sessions import SessionStore
+
+
+def launched_board(challenge_id: str):
+    board = challenges.create_challenge_board(challenge_id)
+    board.set_active_launcher("left")
+    board.launch_marble("blue")
+    return board
+
+
+def replayed(challenge_id: str, ticks: int):
+    board = launched_board(challenge_id)
+    for _ in range(ticks):
+        board.update_marble_positions()
+    return board.snapshot()
+
+
+def schedule_boards(budget: float, seconds: float = 0.3):
+    """Tick challenges 8, 17 and 30 at 40, 20 and 10 ticks per second"""
+    scheduler = TickScheduler(slot_seconds=0.005, slots=16, budget=budget)
+    store = SessionStore(lambda: None)
+    rates = {"8": 40, "17": 20, "30": 10}
+    ticks = {challenge_id: [] for challenge_id in rates}
+    entries = {}
+
+    async def main():
+        for challenge_id, rate in rates.items():
+            store.put(challenge_id, launched_board(challenge_id))
+            entries[challenge_id] = scheduler.add(challenge_id, rate, lambda challenge_id=challenge_id: store.get(challenge_id),
+                          lambda tick, frame, challenge_id=challenge_id: ticks[challenge_id].append(tick),
+                          store.lock(challenge_id))
+        await asyncio.sleep(seconds)
+        for challenge_id in rates:
+            scheduler.remove(challenge_id)
+        await scheduler.task
+
+    asyncio.run(main())
+    return scheduler, store, ticks, entries
+
+
+def test_boards_tick_at_their_own_rates():
+    scheduler, store, ticks, entries = schedule_boards(budget=1.0)
+    for challenge_id, count in (("8", 12), ("17", 6), ("30", 3)):
+        assert ticks[challenge_id] == list(range(1, len(ticks[challenge_id]) + 1))
+        assert count * 0.5 <= len(ticks[challenge_id]) <= count
+        assert store.get(challenge_id).snapshot() == replayed(challenge_id, entries[challenge_id].ticks)
+    stats = scheduler.stats()
+    assert stats["boards"] == 0 and stats["offloaded"] == 0
+    assert stats["ticks"] == sum(entry.ticks for entry in entries.values())
+
+
+def test_ticks_over_budget_run_in_a_worker_thread():
+    scheduler, store, ticks, entries = schedule_boards(budget=0.0)
+    assert scheduler.stats()["offloaded"] == scheduler.stats()["ticks"] > 0
+    for challenge_id, board_ticks in ticks.items():
+        # A board removed while its batch ran ticked once more without a frame
+        assert entries[challenge_id].ticks - 1 <= len(board_ticks) <= entries[challenge_id].ticks
+        assert store.get(challenge_id).snapshot() == replayed(challenge_id, entries[challenge_id].ticks)
+
+
+def test_busy_boards_skip_their_slot():
+    scheduler = TickScheduler(slot_seconds=0.005, slots=4)
+    store = SessionStore(lambda: None)
+    ticks = []
+
+    async def main():
+        store.put("8", launched_board("8"))
+        lock = store.lock("8")
+        async with lock:
+            scheduler.add("8", 50, lambda: store.get("8"), lambda tick, frame: ticks.append(tick), lock)
+            await asyncio.sleep(0.1)
+            assert not ticks
+        await asyncio.sleep(0.1)
+        scheduler.remove("8")
+        await scheduler.task
+
+    asyncio.run(main())
+    assert ticks and scheduler.stats()["skipped_busy"] > 0
+    assert store.get("8").snapshot() == replayed("8", len(ticks))
+
+
+def test_ticks_never_run_before_their_deadline():
+    scheduler = TickScheduler(slot_seconds=0.01, slots=8)
+    store = SessionStore(lambda: None)
+    times = []
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        store.put("8", launched_board("8"))
+        # 15 ms apart: deadlines fall in the middle of 10 ms slots
+        entry = scheduler.add("8", 1 / 0.015, lambda: store.get("8"),
+                              lambda tick, frame: times.append((loop.time(), entry.deadline)), store.lock("8"))
+        await asyncio.sleep(0.3)
+        scheduler.remove("8")
+        await scheduler.task
+
+    asyncio.run(main())
+    assert len(times) >= 10
+    assert all(time >= deadline for time, deadline in times)
+    stats = scheduler.stats()
+    assert stats["early"] == 0 and stats["mean_lag_seconds"] > 0
+
+
+def test_busy_boards_do_not_hold_up_the_batch():
+    # Every tick is offloaded; board 8 is held by a long request and waited for by another
+    scheduler = TickScheduler(slot_seconds=0.005, slots=16, budget=0.0)
+    store = SessionStore(lambda: None)
+    ticks = {"8": [], "17": []}
+    entries = {}
+
+    async def hold(seconds: float):
+        async with store.lock("8"):
+            await asyncio.sleep(seconds)
+
+    async def main():
+        for challenge_id in ticks:
+            store.put(challenge_id, launched_board(challenge_id))
+        held = asyncio.ensure_future(hold(0.2))
+        waiting = asyncio.ensure_future(hold(0.1))
+        await asyncio.sleep(0)
+        for challenge_id in ticks:
+            entries[challenge_id] = scheduler.add(challenge_id, 40, lambda challenge_id=challenge_id: store.get(challenge_id),
+                          lambda tick, frame, challenge_id=challenge_id: ticks[challenge_id].append(tick),
+                          store.lock(challenge_id))
+        await held
+        assert not ticks["8"] and len(ticks["17"]) >= 4
+        await waiting
+        await asyncio.sleep(0.1)
+        for challenge_id in ticks:
+            scheduler.remove(challenge_id)
+        await scheduler.task
+
+    asyncio.run(main())
+    assert ticks["8"] and scheduler.stats()["skipped_busy"] > 0
+    assert store.get("8").snapshot() == replayed("8", entries["8"].ticks)
+
+
+if __name__ == "__main__":
+    test_boards_tick_at_their_own_rates()
+    test_ticks_over_budget_run_in_a_worker_thread()
+    test_busy_boards_skip_their_slot()
+    test_ticks_never_run_before_their_deadline()
+    test_busy_boards_do_not_hold_up_the_batch()
+    print("All scheduler tests passed!")
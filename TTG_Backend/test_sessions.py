@@ -0,0 +1,125 @@
+import asyncio
+
+from game_logic import GameBoard, ComponentType
+from sessions import SessionStore, board_bytes, BOARD_BYTES, MARBLE_BYTES
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_sessions_get_their_own_boards():
+    store = SessionStore(lambda: GameBoard(8, 8))
+    first = store.get("a")
+    first.add_component(ComponentType.RAMP_LEFT, 5, 3)
+    assert store.get("a") is first
+    assert store.get("b") is not first
+    assert store.get("b").components[3][5].type == ComponentType.EMPTY
+    stats = store.stats()
+    assert (stats["sessions"], stats["created"], stats["hits"]) == (2, 2, 2)
+
+
+def test_least_recently_used_sessions_are_evicted():
+    store = SessionStore(lambda: GameBoard(8, 8), max_sessions=2)
+    store.get("a")
+    store.get("b")
+    store.get("a")
+    store.get("c")
+    assert "a" in store and "c" in store and "b" not in store
+    assert store.stats()["evicted_lru"] == 1
+
+    # The memory cap evicts the same way, but never the session being used
+    store = SessionStore(lambda: GameBoard(8, 8), max_bytes=2 * BOARD_BYTES)
+    store.get("a")
+    store.get("b")
+    board = store.get("b")
+    board.launch_marble("blue")
+    assert board_bytes(board) == BOARD_BYTES + MARBLE_BYTES
+    store.get("b")
+    assert len(store) == 1 and store.total_bytes == BOARD_BYTES + MARBLE_BYTES
+    store.max_bytes = 0
+    assert store.get("b") is board
+
+
+def test_idle_sessions_expire():
+    clock = Clock()
+    store = SessionStore(lambda: GameBoard(8, 8), ttl=10, clock=clock)
+    store.get("a")
+    clock.now = 6
+    store.get("b")
+    clock.now = 12
+    board = GameBoard(0, 0)
+    store.put("c", board)
+    assert "a" not in store and store.get("c") is board
+    clock.now = 30
+    assert store.expire() == 2
+    assert len(store) == 0 and store.total_bytes == 0
+    assert store.stats()["evicted_ttl"] == 3
+
+
+def test_board_locks_serialize_one_board_only():
+    store = SessionStore(lambda: GameBoard(8, 8))
+    events = []
+
+    async def request(session_id: str, name: str):
+        async with store.lock(session_id):
+            events.append(("start", name))
+            await asyncio.sleep(0.01)
+            events.append(("end", name))
+
+    async def main():
+        await asyncio.gather(request("a", "a1"), request("a", "a2"), request("b", "b1"))
+
+    asyncio.run(main())
+    assert events.index(("end", "a1")) < events.index(("start", "a2"))
+    assert events.index(("start", "b1")) < events.index(("end", "a1"))
+    first, second = store.lock("a").metrics.stats(), store.lock("b").metrics.stats()
+    assert (first["acquisitions"], first["contended"], first["max_waiting"], first["waiting"]) == (2, 1, 1, 0)
+    assert first["max_wait_seconds"] > 0
+    assert (second["acquisitions"], second["contended"]) == (1, 0)
+    assert store.stats()["locks"]["acquisitions"] == 3
+
+
+def test_busy_sessions_are_not_evicted():
+    clock = Clock()
+    store = SessionStore(lambda: GameBoard(8, 8), max_sessions=2, ttl=10, clock=clock)
+    events = []
+
+    async def request():
+        async with store.lock("a"):
+            events.append(store.get("a"))
+
+    async def main():
+        session = store.session("a")
+        async with session.lock:
+            waiter = asyncio.ensure_future(request())
+            await asyncio.sleep(0)
+            store.get("b")
+            store.get("c")
+            assert list(store.sessions) == ["a", "c"]
+            clock.now = 30
+            assert store.expire() == 1 and list(store.sessions) == ["a"]
+            store.get("d")
+            events.append(session.board)
+        await waiter
+        # Once nobody holds or waits for its lock the session can go
+        store.get("e")
+        store.get("f")
+        assert list(store.sessions) == ["e", "f"]
+
+    asyncio.run(main())
+    assert events[0] is events[1]
+    assert (store.stats()["evicted_lru"], store.stats()["evicted_ttl"]) == (3, 1)
+
+
+if __name__ == "__main__":
+    test_sessions_get_their_own_boards()
+    test_least_recently_used_sessions_are_evicted()
+    test_idle_sessions_expire()
+    test_board_locks_serialize_one_board_only()
+    test_busy_sessions_are_not_evicted()
+    print("All session tests passed!")
@@ -0,0 +1,88 @@
+import random
+
+import pytest
+
+import challenges
+from game_logic import GameBoard, ComponentType, Marble
+
+pytest.importorskip("numpy")
+from vector_engine import LockstepSimulator  # noqa: E402
+
+PARTS = [ComponentType.RAMP_LEFT, ComponentType.RAMP_RIGHT, ComponentType.CROSSOVER, ComponentType.BIT_LEFT,
+         ComponentType.BIT_RIGHT, ComponentType.GEAR, ComponentType.GEAR_BIT_LEFT, ComponentType.GEAR_BIT_RIGHT,
+         ComponentType.INTERCEPTOR, ComponentType.LEVER_BLUE, ComponentType.LEVER_RED, ComponentType.EMPTY]
+
+
+def make_boards():
+    """Every challenge from both launchers plus random variants with resting marbles"""
+    boards = []
+    for challenge_id in ["default"] + [str(number) for number in range(1, 31)]:
+        for launcher, color in (("left", "blue"), ("right", "red")):
+            board = challenges.create_challenge_board(challenge_id)
+            board.set_active_launcher(launcher)
+            board.launch_marble(color)
+            boards.append(board)
+    rng = random.Random(7)
+    for _ in range(100):
+        board = GameBoard(rng.randint(0, 6), rng.randint(1, 6))
+        for _ in range(rng.randint(10, 60)):
+            board.add_component(rng.choice(PARTS), rng.randint(1, 13), rng.randint(3, 15))
+        x, y = rng.randint(1, 13), rng.randint(3, 15)
+        board.marbles.append(Marble("red", x, y, "left"))
+        board.marbles[-1].is_moving = False
+        board.components[y][x].is_occupied = True
+        board.set_active_launcher("left")
+        board.launch_marble("blue")
+        boards.append(board)
+    return boards
+
+
+def board_state(board: GameBoard, ticks: int) -> dict:
+    return {
+        "cells": bytes(board.cells),
+        "occupied": bytes(board.occupied),
+        "marbles": sorted((m.color, m.x, m.y, m.direction, m.is_moving) for m in board.marbles),
+        "red_marbles": board.red_marbles,
+        "blue_marbles": board.blue_marbles,
+        "active_launcher": board.active_launcher,
+        "output": board.marble_output,
+        "ticks": ticks
+    }
+
+
+def test_lockstep_matches_scalar_engine():
+    boards = make_boards()
+    simulator = LockstepSimulator(make_boards())
+    ticks = [0] * len(boards)
+    for _ in range(300):
+        for index, board in enumerate(boards):
+            if any(marble.is_moving for marble in board.marbles):
+                board.update_marble_positions()
+                ticks[index] += 1
+        simulator.step()
+        for index, board in enumerate(boards):
+            state = simulator.board_state(index)
+            state["marbles"].sort()
+            assert state == board_state(board, ticks[index])
+
+
+def test_halted_boards_are_left_alone():
+    board = challenges.create_challenge_board("1")
+    simulator = LockstepSimulator([board])
+    assert not simulator.running.any()
+    assert simulator.step() == 0
+    assert simulator.ticks[0] == 0
+
+
+def test_rejects_several_moving_marbles():
+    board = GameBoard(8, 8)
+    board.marbles = [Marble("red", 5, 5, "left"), Marble("blue", 7, 5, "left")]
+    with pytest.raises(ValueError):
+        LockstepSimulator([board])
+
+
+if __name__ == "__main__":
+    test_lockstep_matches_scalar_engine()
+    test_halted_boards_are_left_alone()
+    test_rejects_several_moving_marbles()
+    print("All vector engine tests passed!")
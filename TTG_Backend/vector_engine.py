@@ -0,0 +1,289 @@
+"""
+Lockstep simulation of many boards at once with NumPy.
+
+N boards of the same size are kept as an (N, height, width) uint8 array of
+packed cell codes plus per-board arrays for the moving marble, the marble
+counts and the output. Every tick advances all running boards together with
+array operations built from the scalar transition table, and gives the same
+result as GameBoard.update_marble_positions on each board.
+
+Every board may hold at most one moving marble, which is how runs started
+from a launcher behave: a lever removes its marble before launching the
+next one. Marbles that are not moving only block their cells.
+"""
+from typing import Any, Dict, List
+
+import numpy as np
+
+from game_logic import (GameBoard, CELL_TYPES, DIRECTIONS, DEFAULT_MAX_TICKS,
+                        CELL_GEAR, CELL_GEAR_BIT_LEFT, CELL_GEAR_BIT_RIGHT,
+                        ACTION_MOVE, ACTION_STOP, ACTION_INTERCEPT, ACTION_LEVER_BLUE, ACTION_LEVER_RED,
+                        FLIP_GEARS, BLOCKED_STALL, BLOCKED_RETURN, transition_table)
+
+COLORS = ("red", "blue")
+COLOR_RED = 0
+COLOR_BLUE = 1
+LAUNCHERS = ("left", "right")
+# Direction index of marbles whose direction the cells do not know (the None rule)
+DIRECTION_OTHER = len(DIRECTIONS)
+
+_DIRECTION_INDEX = {direction: index for index, direction in enumerate(DIRECTIONS)}
+_tables: Dict[int, tuple] = {}
+
+
+def vector_tables(width: int) -> tuple:
+    """
+    The transition table of a board width as arrays indexed [cell code, direction
+    index]: action, effect direction and flip (-1 when there is no effect),
+    blocked rule and, per candidate step k, dx, dy, direction after moving
+    (-1 for unchanged) and whether the step exists.
+    """
+    tables = _tables.get(width)
+    if tables is not None:
+        return tables
+    rules = transition_table(width)
+    shape = (len(CELL_TYPES), len(DIRECTIONS) + 1)
+    max_moves = max(len(rule[2]) for code_rules in rules for rule in code_rules.values())
+    action = np.zeros(shape, np.int8)
+    effect_direction = np.full(shape, -1, np.int8)
+    flip = np.full(shape, -1, np.int8)
+    blocked = np.zeros(shape, np.int8)
+    move_dx = np.zeros(shape + (max_moves,), np.int64)
+    move_dy = np.zeros(shape + (max_moves,), np.int64)
+    move_direction = np.full(shape + (max_moves,), -1, np.int8)
+    move_valid = np.zeros(shape + (max_moves,), bool)
+    for code, code_rules in enumerate(rules):
+        for direction_index, direction in enumerate(DIRECTIONS + (None,)):
+            rule_action, effect, moves, rule_blocked = code_rules[direction]
+            action[code, direction_index] = rule_action
+            blocked[code, direction_index] = rule_blocked
+            if effect is not None:
+                effect_direction[code, direction_index] = _DIRECTION_INDEX[effect[0]]
+                flip[code, direction_index] = effect[1]
+            for k, (_, dx, dy, _, after) in enumerate(moves):
+                move_dx[code, direction_index, k] = dx
+                move_dy[code, direction_index, k] = dy
+                move_valid[code, direction_index, k] = True
+                if after is not None:
+                    move_direction[code, direction_index, k] = _DIRECTION_INDEX[after]
+    tables = _tables[width] = (action, effect_direction, flip, blocked,
+                               move_dx, move_dy, move_direction, move_valid)
+    return tables
+
+
+class LockstepSimulator:
+    """
+    Steps N boards of the same size in lockstep. Boards without a moving
+    marble are halted and left untouched by step().
+    """
+
+    def __init__(self, boards: List[GameBoard]):
+        if not boards:
+            raise ValueError("At least one board is needed")
+        self.width = boards[0].width
+        self.height = boards[0].height
+        if any(board.width != self.width or board.height != self.height for board in boards):
+            raise ValueError("All boards must have the same size")
+        count = len(boards)
+        shape = (count, self.height, self.width)
+        self.tables = vector_tables(self.width)
+        self.cells = np.frombuffer(b"".join(bytes(board.cells) for board in boards), np.uint8).reshape(shape).copy()
+        self.occupied = np.frombuffer(b"".join(bytes(board.occupied) for board in boards), np.uint8).reshape(shape).copy()
+
+        # The moving marble of every board; has_marble is False once it left the board
+        self.x = np.zeros(count, np.int64)
+        self.y = np.zeros(count, np.int64)
+        self.direction = np.zeros(count, np.int8)
+        self.color = np.zeros(count, np.int8)
+        self.has_marble = np.zeros(count, bool)
+        self.running = np.zeros(count, bool)
+        self.counts = np.array([[board.red_marbles, board.blue_marbles] for board in boards], np.int64)
+        self.launcher = np.array([LAUNCHERS.index(board.active_launcher) for board in boards], np.int8)
+        self.ticks = np.zeros(count, np.int64)
+        # Marble output as color indices, grown on demand
+        self.output = np.zeros((count, 16), np.int8)
+        self.output_length = np.zeros(count, np.int64)
+        # Marbles that do not move, kept only to report the board state
+        self.resting: List[List[tuple]] = []
+
+        for index, board in enumerate(boards):
+            resting = []
+            for marble in board.marbles:
+                if not marble.is_moving:
+                    resting.append((marble.color, marble.x, marble.y, marble.direction, False))
+                elif self.has_marble[index]:
+                    raise ValueError("Boards may hold at most one moving marble")
+                else:
+                    self.x[index] = marble.x
+                    self.y[index] = marble.y
+                    self.direction[index] = _DIRECTION_INDEX.get(marble.direction, DIRECTION_OTHER)
+                    self.color[index] = COLORS.index(marble.color)
+                    self.has_marble[index] = True
+                    self.running[index] = True
+            self.resting.append(resting)
+            for color in board.marble_output:
+                self._append_output(np.array([index]), np.array([COLORS.index(color)]))
+
+    def __len__(self) -> int:
+        return len(self.running)
+
+    def _append_output(self, boards: np.ndarray, colors: np.ndarray) -> None:
+        """Append one color to the output of each listed (distinct) board"""
+        length = self.output_length[boards]
+        if len(boards) and length.max() >= self.output.shape[1]:
+            self.output = np.concatenate([self.output, np.zeros_like(self.output)], axis=1)
+        self.output[boards, length] = colors
+        self.output_length[boards] = length + 1
+
+    def _flip_gears(self, boards: np.ndarray, y: np.ndarray, x: np.ndarray) -> None:
+        """Flip the gear bits of the gear network at (x, y) on each listed board"""
+        cells = self.cells[boards]
+        gears = (cells == CELL_GEAR) | (cells == CELL_GEAR_BIT_LEFT) | (cells == CELL_GEAR_BIT_RIGHT)
+        network = np.zeros_like(gears)
+        network[np.arange(len(boards)), y, x] = True
+        while True:
+            grown = network.copy()
+            grown[:, 1:, :] |= network[:, :-1, :]
+            grown[:, :-1, :] |= network[:, 1:, :]
+            grown[:, :, 1:] |= network[:, :, :-1]
+            grown[:, :, :-1] |= network[:, :, 1:]
+            grown &= gears
+            if np.array_equal(grown, network):
+                break
+            network = grown
+        left = network & (cells == CELL_GEAR_BIT_LEFT)
+        right = network & (cells == CELL_GEAR_BIT_RIGHT)
+        cells[left] = CELL_GEAR_BIT_RIGHT
+        cells[right] = CELL_GEAR_BIT_LEFT
+        self.cells[boards] = cells
+
+    def _advance(self, boards: np.ndarray, removed: list) -> np.ndarray:
+        """
+        Move the marble of each listed board by one step. Cells of marbles that
+        left the board are added to removed and freed at the end of the tick.
+        Returns the boards on which a lever launched a marble that still has
+        to take its step in this tick.
+        """
+        (action_table, effect_direction, flip_table, blocked_table,
+         move_dx, move_dy, move_direction, move_valid) = self.tables
+        x = self.x[boards]
+        y = self.y[boards]
+        direction = self.direction[boards].astype(np.int64)
+        code = self.cells[boards, y, x].astype(np.int64)
+        action = action_table[code, direction]
+        moves = action == ACTION_MOVE
+
+        # Effects apply as soon as the marble is on the cell
+        effect = effect_direction[code, direction]
+        flip = flip_table[code, direction]
+        affected = moves & (effect >= 0)
+        new_direction = np.where(affected, effect, direction)
+        flipped = affected & (flip >= 0)
+        self.cells[boards[flipped], y[flipped], x[flipped]] = flip[flipped]
+        geared = affected & (flip == FLIP_GEARS)
+        if geared.any():
+            self._flip_gears(boards[geared], y[geared], x[geared])
+
+        # Take the first free candidate cell
+        chosen = np.full(len(boards), -1, np.int64)
+        for k in range(move_dx.shape[2]):
+            target_x = x + move_dx[code, direction, k]
+            target_y = y + move_dy[code, direction, k]
+            inside = (target_x >= 0) & (target_x < self.width) & (target_y >= 0) & (target_y < self.height)
+            free = self.occupied[boards, np.clip(target_y, 0, self.height - 1),
+                                 np.clip(target_x, 0, self.width - 1)] == 0
+            take = moves & (chosen < 0) & move_valid[code, direction, k] & inside & free
+            chosen[take] = k
+
+        stepped = chosen >= 0
+        step = np.maximum(chosen, 0)
+        next_x = x + move_dx[code, direction, step]
+        next_y = y + move_dy[code, direction, step]
+        after = move_direction[code, direction, step]
+        moved = boards[stepped]
+        self.occupied[moved, y[stepped], x[stepped]] = 0
+        self.occupied[moved, next_y[stepped], next_x[stepped]] = 1
+        self.x[moved] = next_x[stepped]
+        self.y[moved] = next_y[stepped]
+        new_direction = np.where(stepped & (after >= 0), after, new_direction)
+        self.direction[boards] = new_direction
+
+        # Blocked marbles wait, stall or go back to their count
+        blocked = blocked_table[code, direction]
+        stalled = (moves & ~stepped & (blocked == BLOCKED_STALL)) | (action == ACTION_STOP)
+        returned = moves & ~stepped & (blocked == BLOCKED_RETURN)
+        taken = (action == ACTION_INTERCEPT) | (action == ACTION_LEVER_BLUE) | (action == ACTION_LEVER_RED)
+        colors = self.color[boards]
+        np.add.at(self.counts, (boards[returned], colors[returned]), 1)
+        np.add.at(self.counts, (boards[taken], colors[taken]), -1)
+        self.running[boards[stalled | returned | taken]] = False
+        self.has_marble[boards[returned | taken]] = False
+        gone = returned | taken
+        removed.append((boards[gone], y[gone], x[gone]))
+
+        # Levers record the output and launch the next marble
+        lever = (action == ACTION_LEVER_BLUE) | (action == ACTION_LEVER_RED)
+        if not lever.any():
+            return boards[:0]
+        levers = boards[lever]
+        launch_color = np.where(action[lever] == ACTION_LEVER_BLUE, COLOR_BLUE, COLOR_RED)
+        self.launcher[levers] = np.where(launch_color == COLOR_BLUE, 0, 1)
+        self._append_output(levers, colors[lever])
+        launch_x = np.where(launch_color == COLOR_BLUE, 5, 9)
+        inside = launch_x < self.width
+        free = self.occupied[levers, 0, np.minimum(launch_x, self.width - 1)] == 0
+        launched = (self.counts[levers, launch_color] > 0) & inside & free
+        launched_boards = levers[launched]
+        self.x[launched_boards] = launch_x[launched]
+        self.y[launched_boards] = 0
+        self.direction[launched_boards] = np.where(launch_color[launched] == COLOR_BLUE,
+                                                   _DIRECTION_INDEX["right"], _DIRECTION_INDEX["left"])
+        self.color[launched_boards] = launch_color[launched]
+        self.occupied[launched_boards, 0, launch_x[launched]] = 1
+        self.has_marble[launched_boards] = True
+        self.running[launched_boards] = True
+        return launched_boards
+
+    def step(self) -> int:
+        """
+        Advance every running board by one tick.
+        Returns the number of boards that are still running.
+        """
+        boards = np.flatnonzero(self.running)
+        self.ticks[boards] += 1
+        removed: list = []
+        while len(boards):
+            boards = self._advance(boards, removed)
+        for gone, y, x in removed:
+            self.occupied[gone, y, x] = 0
+        return int(np.count_nonzero(self.running))
+
+    def run(self, max_ticks: int = DEFAULT_MAX_TICKS) -> int:
+        """
+        Step until every board halted or max_ticks ticks passed.
+        Returns the number of ticks stepped; per-board counts are in ticks.
+        """
+        ticks = 0
+        while ticks < max_ticks and self.running.any():
+            self.step()
+            ticks += 1
+        return ticks
+
+    def board_state(self, index: int) -> Dict[str, Any]:
+        """State of one board in the terms of GameBoard"""
+        marbles = list(self.resting[index])
+        if self.has_marble[index]:
+            direction = int(self.direction[index])
+            marbles.append((COLORS[self.color[index]], int(self.x[index]), int(self.y[index]),
+                            DIRECTIONS[direction] if direction < DIRECTION_OTHER else None,
+                            bool(self.running[index])))
+        return {
+            "cells": self.cells[index].tobytes(),
+            "occupied": self.occupied[index].tobytes(),
+            "marbles": marbles,
+            "red_marbles": int(self.counts[index, COLOR_RED]),
+            "blue_marbles": int(self.counts[index, COLOR_BLUE]),
+            "active_launcher": LAUNCHERS[self.launcher[index]],
+            "output": [COLORS[color] for color in self.output[index, :self.output_length[index]].tolist()],
+            "ticks": int(self.ticks[index])
+        }
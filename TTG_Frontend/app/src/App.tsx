@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import {Layout, Dropdown, Menu, Space, Button, Drawer, Typography, notification, Empty } from 'antd';
 import Board, { BoardCell } from "./board/board";
-import { Toolbar } from "./ui/toolbar";
+import { Toolbar, FAST_FORWARD_TICKS } from "./ui/toolbar";
 import { PartsPanel } from "./ui/partsPanel";
 import { ItemType } from './parts/constants';
 import { CHALLENGES, updateChallengeInitialBoard, Challenge, DEFAULT_CHALLENGE } from './components/challenges';
@@ -12,8 +12,10 @@ import {
     launchMarble,
     resetBoard,
     updateBoard,
-    addComponent,
-    getMarbleOutput,
+    tickBoard,
+    addComponents,
+    ComponentPlacement,
+    BoardState,
     fetchChallengeById,
     getMarbleCounts
 } from "./services/api";
@@ -55,6 +57,7 @@ const mapComponentType = (type: string): ItemType => {
 const App: React.FC = () => {
     const [zoomLevel, setZoomLevel] = useState(1);
     const [isRunning, setIsRunning] = useState(false);
+    const [launches, setLaunches] = useState(0);
     const [currentSpeed, setCurrentSpeed] = useState(1);
     const [board, setBoard] = useState<BoardCell[][]>([]);
     const [activeLauncher, setActiveLauncher] = useState<'left' | 'right'>('left');
@@ -154,15 +157,17 @@ const App: React.FC = () => {
                 initialBoard: backendChallenge.initialBoard
             };
             await resetBoard(); // clear old board
-            // Add components one-by-one to backend
+            // Add all components to backend in one batch
+            const placements: ComponentPlacement[] = [];
             for (let y = 0; y < mergedChallenge.initialBoard.length; y++) {
                 for (let x = 0; x < mergedChallenge.initialBoard[y].length; x++) {
                     const cell = mergedChallenge.initialBoard[y][x];
                     if (cell.type && cell.type !== ItemType.Empty) {
-                        await addComponent(cell.type, x, y);
+                        placements.push({ type: cell.type, x, y });
                     }
                 }
             }
+            await addComponents(placements);
             setCurrentChallenge(mergedChallenge);
             setBoard(mergedChallenge.initialBoard);
             setMarbleCounts({
@@ -250,6 +255,21 @@ const App: React.FC = () => {
         setIsRunning(true);
     };
 
+    // One /tick request advances the paused board and returns everything it changed
+    const handleFastForward = async () => {
+        try {
+            const { state } = await tickBoard(FAST_FORWARD_TICKS);
+            setBoard(buildBoard(state));
+            setMarbleCounts({
+                red: state.red_marbles,
+                blue: state.blue_marbles
+            });
+            setMarbleOutput(state.output ?? []);
+        } catch (error) {
+            console.error('Error fast-forwarding board:', error);
+        }
+    };
+
     const handleClearBoard = async () => {
         await resetBoard();
         await refreshBoard();
@@ -271,38 +291,31 @@ const App: React.FC = () => {
         // reset backend (clears both components & marbles)
         await resetBoard();
 
-        // re-add every component cell
+        // re-add every component cell in one batch
+        const placements: ComponentPlacement[] = [];
         for (let y = 0; y < compTypes.length; y++) {
             for (let x = 0; x < compTypes[y].length; x++) {
                 const type = compTypes[y][x];
                 if (type && type !== 'empty') {
-                    await addComponent(type, x, y);
+                    placements.push({ type, x, y });
                 }
             }
         }
+        await addComponents(placements);
         // restore launcher and counts
         await refreshBoard();
         setMarbleCounts(marbleCountsAux);
         setActiveLauncher(launcherBefore);
     };
 
-    const handleMarbleOutput = async () => {
-            try {
-                const output = await getMarbleOutput();
-                //console.log("Fetched Marble Outputs:", output); // Debugging
-                setMarbleOutput(output || []); // Ensure it sets an array
-            } catch (error) {
-                console.error("Error fetching marble outputs:", error);
-                setMarbleOutput([]); // Fallback to an empty array on error
-            }
-        };
-    
-    useEffect(() => {
-        if (isRunning) {
-            const interval = setInterval(handleMarbleOutput, 1000);
-            return () => clearInterval(interval);
-        }
-    }, [isRunning]);
+    // While running, the simulation stream carries the counts and output
+    const handleStreamState = (state: BoardState) => {
+        setMarbleCounts({
+            red: state.red_marbles,
+            blue: state.blue_marbles
+        });
+        setMarbleOutput(state.output ?? []);
+    };
 
     const renderMarbleOutputs = () => {
         //console.log("Rendering Marble Outputs:", marbleOutput); // Debugging
@@ -341,6 +354,7 @@ const App: React.FC = () => {
             await setLauncher("left");
             console.log('Launcher set, launching blue marble...');
             await launchMarble("blue");
+            setLaunches(count => count + 1);
             console.log('Marble launched, getting board state...');
             const state = await getBoardState();
             console.log('Board state updated:', state);
@@ -360,6 +374,7 @@ const App: React.FC = () => {
             await setLauncher("right");
             console.log('Launcher set, launching red marble...');
             await launchMarble("red");
+            setLaunches(count => count + 1);
             console.log('Marble launched, getting board state...');
             const state = await getBoardState();
             console.log('Board state updated:', state);
@@ -406,21 +421,6 @@ const App: React.FC = () => {
         }
     };
 
-    // Update marble counts periodically when running
-    useEffect(() => {
-        let interval: NodeJS.Timeout;
-        if (isRunning) {
-            interval = setInterval(async () => {
-                const state = await getBoardState();
-                setMarbleCounts({
-                    red: state.red_marbles,
-                    blue: state.blue_marbles
-                });
-            }, 1000);
-        }
-        return () => clearInterval(interval);
-    }, [isRunning]);
-
     const handleAIMove = async () => {
         await refreshBoard();
         const state = await getBoardState();
@@ -532,6 +532,7 @@ const App: React.FC = () => {
                         onZoomOut={handleZoomOut}
                         onSlowDown={handleSlowDown}
                         onSpeedUp={handleSpeedUp}
+                        onFastForward={handleFastForward}
                         onClearBoard={handleClearBoard}
                         onResetMarbles={handleResetMarbles}
                         onTriggerLeft={handleTriggerLeft}
@@ -563,6 +564,8 @@ const App: React.FC = () => {
                             setBoard={setBoard}
                             isRunning={isRunning}
                             currentSpeed={currentSpeed}
+                            launches={launches}
+                            onStreamState={handleStreamState}
                         />
                         {renderMarbleOutputs()}
                     </div>
@@ -1,7 +1,7 @@
 import React, {useEffect, useRef, useState} from "react";
 import {IMAGE_FILENAMES, ItemType} from "../parts/constants";
 import "./board.css";
-import {addComponent, BoardState, getBoardState, updateBoard, getMarbleOutput} from "../services/api";
+import {addComponent, applyFrame, BoardState, getBoardState, getMarbleOutput, openSimulationStream} from "../services/api";
 import { useChallenge } from "../components/challengeContext";
 
 export type BoardCell = {
@@ -17,6 +17,9 @@ interface BoardProps {
     setBoard: React.Dispatch<React.SetStateAction<BoardCell[][]>>;
     isRunning: boolean;
     currentSpeed: number;
+    // Counts marble launches, so a halted stream knows to start again
+    launches: number;
+    onStreamState?: (state: BoardState) => void;
 }
 
 export interface GameState {
@@ -60,9 +63,14 @@ const canPlaceComponent = (item: ItemType, target: ItemType) => {
 };
 
 
-const Board: React.FC<BoardProps> = ({ board, setBoard, isRunning, currentSpeed }) => {
+const Board: React.FC<BoardProps> = ({ board, setBoard, isRunning, currentSpeed, launches, onStreamState }) => {
     const [backendState, setBackendState] = useState<BoardState | null>(null);
-    const updateInterval = useRef<NodeJS.Timeout | null>(null);
+    const streamState = useRef<BoardState | null>(null);
+    const stream = useRef<WebSocket | null>(null);
+    const halted = useRef(false);
+    const launchCount = useRef(launches);
+    const startedAt = useRef(launches);
+    launchCount.current = launches;
     const [mode, setMode] = useState("freeplay"); // "freeplay" or "challenge"
     const [selectedChallenge, setSelectedChallenge] = useState(null);
     const [availableParts, setAvailableParts] = useState(unlimitedParts);
@@ -77,34 +85,79 @@ const Board: React.FC<BoardProps> = ({ board, setBoard, isRunning, currentSpeed
         };
 
         initializeBoard();
-
-        return () => {
-            if (updateInterval.current) {
-                clearInterval(updateInterval.current);
-            }
-        };
     }, []);
 
-    // Handle simulation running state
+    // App also changes the board (challenges, clearing, resets, fast forward): keep the
+    // backend state that gear clicks look their groups up in in step with it
     useEffect(() => {
         if (isRunning) {
-            updateInterval.current = setInterval(async () => {
-                await updateBoard();
-                const state = await getBoardState();
+            return;
+        }
+        let current = true;
+        getBoardState().then(state => {
+            if (current) {
                 setBackendState(state);
-                updateFrontendBoard(state);
-            }, 1000 / currentSpeed);
-        } else if (updateInterval.current) {
-            clearInterval(updateInterval.current);
+            }
+        });
+        return () => {
+            current = false;
+        };
+    }, [board, isRunning]);
+
+    // Handle simulation running state: the backend ticks the board and streams what changed
+    useEffect(() => {
+        if (!isRunning) {
+            return;
         }
 
-        return () => {
-            if (updateInterval.current) {
-                clearInterval(updateInterval.current);
+        const start = () => {
+            startedAt.current = launchCount.current;
+            halted.current = false;
+            socket.send(JSON.stringify({ action: 'start', rate: currentSpeed }));
+        };
+        const socket = openSimulationStream((message) => {
+            let state: BoardState;
+            if (message.type === 'state') {
+                state = message;
+            } else if (message.type === 'frame' && streamState.current) {
+                state = applyFrame(streamState.current, message);
+            } else {
+                if (message.type === 'halted') {
+                    // A marble launched since the last start may have missed the running stream
+                    if (launchCount.current !== startedAt.current) {
+                        start();
+                    } else {
+                        halted.current = true;
+                    }
+                } else if (message.type === 'error') {
+                    console.error('Simulation stream error:', message.detail);
+                }
+                return;
             }
+            streamState.current = state;
+            setBackendState(state);
+            updateFrontendBoard(state);
+            onStreamState?.(state);
+        });
+        socket.onopen = start;
+        stream.current = socket;
+
+        return () => {
+            stream.current = null;
+            socket.close();
         };
     }, [isRunning, currentSpeed]);
 
+    // The backend stops ticking a halted board; start it again when a marble is launched
+    useEffect(() => {
+        const socket = stream.current;
+        if (socket && socket.readyState === WebSocket.OPEN && halted.current) {
+            startedAt.current = launches;
+            halted.current = false;
+            socket.send(JSON.stringify({ action: 'start', rate: currentSpeed }));
+        }
+    }, [launches]);
+
 
     const updateFrontendBoard = (state: BoardState) => {
         const newBoard: BoardCell[][] = Array.from({ length: numRows }, () =>
@@ -193,12 +246,14 @@ const Board: React.FC<BoardProps> = ({ board, setBoard, isRunning, currentSpeed
     };
 
     const handleMoveGearBit = async (type: ItemType, x: number, y: number) => {
-        // Find connected gear groups for each neighbor
+        // Find connected gear groups for each neighbor, on the board as the backend has it now
+        const state = await getBoardState();
+        setBackendState(state);
         const gearGroups = [
-            findConnectedGearGroup(y - 1, x, board),
-            findConnectedGearGroup(y + 1, x, board),
-            findConnectedGearGroup(y, x - 1, board),
-            findConnectedGearGroup(y, x + 1, board),
+            findConnectedGearGroup(y - 1, x, state),
+            findConnectedGearGroup(y + 1, x, state),
+            findConnectedGearGroup(y, x - 1, state),
+            findConnectedGearGroup(y, x + 1, state),
         ];
 
         // Eliminate duplicates by converting to a Set
@@ -268,7 +323,7 @@ const Board: React.FC<BoardProps> = ({ board, setBoard, isRunning, currentSpeed
         setBackendState(state);
         updateFrontendBoard(state);
     
-        const gearGroup = findConnectedGearGroup(y, x, updatedBoard);
+        const gearGroup = findConnectedGearGroup(y, x, state);
     
         let leftCount = 0;
         let rightCount = 0;
@@ -297,31 +352,11 @@ const Board: React.FC<BoardProps> = ({ board, setBoard, isRunning, currentSpeed
     };
 
 
-    const findConnectedGearGroup = (row: number, col: number, board: BoardCell[][]): [number, number][] => {
-        const visited = new Set<string>();
-        const queue: [number, number][] = [[row, col]];
-        const group: [number, number][] = [];
-    
-        while (queue.length > 0) {
-            const [r, c] = queue.pop()!;
-            const key = `${r},${c}`;
-            if (visited.has(key)) continue;
-            visited.add(key);
-    
-            const cell = board[r]?.[c];
-            if (!cell) continue;
-            console.log("Cell: ", cell.type, " at: ", r, c);
-            if (cell.type === ItemType.GearBitLeft || cell.type === ItemType.GearBitRight || cell.type === ItemType.Gear) {
-                group.push([r, c]);
-    
-                queue.push([r-1, c]); 
-                queue.push([r+1, c]); 
-                queue.push([r, c-1]); 
-                queue.push([r, c+1]); 
-            }
-        }
-        return group;
-    };    
+    // Gear networks come from the backend, which keeps them up to date as parts are placed
+    const findConnectedGearGroup = (row: number, col: number, state: BoardState | null): [number, number][] => {
+        const group = state?.gear_groups?.find(cells => cells.some(cell => cell.x === col && cell.y === row));
+        return group ? group.map(({ x, y }): [number, number] => [y, x]) : [];
+    };
 
     const handleAddComponent = async (type: ItemType, x: number, y: number) => {
         let backendType = '';
@@ -384,7 +419,7 @@ const Board: React.FC<BoardProps> = ({ board, setBoard, isRunning, currentSpeed
                 case ItemType.GearBitRight:
                 case ItemType.Gear:
                     {
-                    const group = findConnectedGearGroup(row, col, newBoard);
+                    const group = findConnectedGearGroup(row, col, backendState);
                     group.forEach(([r, c]) => {
                         const gearCell = newBoard[r][c];
                         if (gearCell.type === ItemType.GearBitLeft) {
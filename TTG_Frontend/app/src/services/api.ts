@@ -1,9 +1,24 @@
 import axios from 'axios';
 
+const API_URL = 'http://localhost:8000';
+
+// Every browser tab plays on its own board on the backend
+const getSessionId = (): string => {
+    let sessionId = sessionStorage.getItem('ttg-session-id');
+    if (!sessionId) {
+        sessionId = crypto.randomUUID();
+        sessionStorage.setItem('ttg-session-id', sessionId);
+    }
+    return sessionId;
+};
+
+const sessionId = getSessionId();
+
 export const api = axios.create({
-    baseURL: 'http://localhost:8000',
+    baseURL: API_URL,
     headers: {
         'Content-Type': 'application/json',
+        'X-Session-Id': sessionId,
     },
 });
 
@@ -20,21 +35,138 @@ export interface BoardState {
         color: string;
         x: number;
         y: number;
-        direction: string;
-        is_moving: boolean;
+        direction?: string;
+        is_moving?: boolean;
     }>;
     red_marbles: number;
     blue_marbles: number;
     active_launcher: string;
     width: number;
     height: number;
+    gear_groups?: Array<Array<{
+        x: number;
+        y: number;
+    }>>;
+    version?: number;
+    output?: string[];
+}
+
+// What changed on the board after a version, from /board/state?since=<version>
+export interface BoardDelta {
+    version: number;
+    since: number;
+    cells: Array<BoardState['components'][number][number] & {
+        x: number;
+        y: number;
+    }>;
+    marbles?: BoardState['marbles'];
+    output_start?: number;
+    output?: string[];
+    red_marbles: number;
+    blue_marbles: number;
+    active_launcher: string;
+    gear_groups?: BoardState['gear_groups'];
+}
+
+export const applyDelta = (state: BoardState, delta: BoardDelta): BoardState => {
+    const components = delta.cells.length ? state.components.map(row => row.slice()) : state.components;
+    delta.cells.forEach(cell => {
+        components[cell.y][cell.x] = cell;
+    });
+    return {
+        ...state,
+        components,
+        marbles: delta.marbles ?? state.marbles,
+        red_marbles: delta.red_marbles,
+        blue_marbles: delta.blue_marbles,
+        active_launcher: delta.active_launcher,
+        gear_groups: delta.gear_groups ?? state.gear_groups,
+        output: delta.output_start === undefined
+            ? state.output
+            : [...(state.output ?? []).slice(0, delta.output_start), ...(delta.output ?? [])],
+        version: delta.version,
+    };
+};
+
+// What changed on the board in one tick; parts that did not change are left out
+export interface SimulationFrame {
+    type: 'frame';
+    tick: number;
+    moving: number;
+    marbles?: Array<{
+        color: string;
+        x: number;
+        y: number;
+    }>;
+    flipped?: Array<{
+        x: number;
+        y: number;
+        type: string;
+    }>;
+    output?: string[];
+    red_marbles?: number;
+    blue_marbles?: number;
+    active_launcher?: string;
 }
 
+export type SimulationMessage =
+    | ({ type: 'state'; tick: number } & BoardState)
+    | SimulationFrame
+    | { type: 'halted'; tick: number }
+    | { type: 'error'; detail: string };
+
+// Open the simulation stream of this tab's board. Send {action: 'start', rate}
+// to run it at rate ticks per second and {action: 'stop'} to pause it. The
+// stream sends 'halted' and stops ticking once nothing moves; send 'start'
+// again after launching a marble.
+export const openSimulationStream = (onMessage: (message: SimulationMessage) => void): WebSocket => {
+    const url = `${API_URL.replace(/^http/, 'ws')}/ws/simulation?session=${encodeURIComponent(sessionId)}`;
+    const socket = new WebSocket(url);
+    socket.onmessage = (event) => onMessage(JSON.parse(event.data));
+    socket.onerror = (error) => console.error('Simulation stream error:', error);
+    return socket;
+};
+
+// Apply a frame to the last known board state
+export const applyFrame = (state: BoardState, frame: SimulationFrame): BoardState => {
+    let components = state.components;
+    if (frame.flipped || frame.marbles) {
+        components = components.map(row => row.slice());
+    }
+    frame.flipped?.forEach(cell => {
+        components[cell.y][cell.x] = { ...components[cell.y][cell.x], type: cell.type };
+    });
+    if (frame.marbles) {
+        state.marbles.forEach(marble => {
+            components[marble.y][marble.x] = { ...components[marble.y][marble.x], is_occupied: false };
+        });
+        frame.marbles.forEach(marble => {
+            components[marble.y][marble.x] = { ...components[marble.y][marble.x], is_occupied: true };
+        });
+    }
+    return {
+        ...state,
+        components,
+        marbles: frame.marbles ?? state.marbles,
+        red_marbles: frame.red_marbles ?? state.red_marbles,
+        blue_marbles: frame.blue_marbles ?? state.blue_marbles,
+        active_launcher: frame.active_launcher ?? state.active_launcher,
+        output: frame.output ? [...(state.output ?? []), ...frame.output] : state.output,
+    };
+};
+
+// Last state fetched from the backend; later fetches only ask for what changed since its version
+let lastBoardState: BoardState | null = null;
+
 export const getBoardState = async (): Promise<BoardState> => {
     try {
-        const response = await api.get('/board/state');
-        console.log('Board state from backend:', response.data);
-        return response.data;
+        const since = lastBoardState?.version;
+        const response = await api.get('/board/state', { params: since === undefined ? {} : { since } });
+        lastBoardState = response.data.full || !lastBoardState
+            ? response.data
+            : applyDelta(lastBoardState, response.data);
+        console.log('Board state from backend:', lastBoardState);
+        return lastBoardState as BoardState;
     } catch (error) {
         console.error('Error fetching board state:', error);
         // Return a default board state if the backend is not available
@@ -61,6 +193,22 @@ export const addComponent = async (type: string, x: number, y: number) => {
     }
 };
 
+export interface ComponentPlacement {
+    type: string;
+    x: number;
+    y: number;
+}
+
+// Places every component in one request; the backend adds all of them or none
+export const addComponents = async (components: ComponentPlacement[]) => {
+    if (components.length === 0) return;
+    try {
+        await api.post('/components/batch', { components });
+    } catch (error) {
+        console.error('Error adding components:', error);
+    }
+};
+
 export const launchMarble = async (color: string) => {
     try {
         await api.post('/marbles', { color });
@@ -85,6 +233,24 @@ export const updateBoard = async () => {
     }
 };
 
+// What /tick returns: the delta of the ticks it ran and whether the board halted
+export interface TickResult extends BoardDelta {
+    ticks: number;
+    halted: boolean;
+    halt_reason: string;
+}
+
+// Advance the board up to steps ticks in one request and return its new state
+export const tickBoard = async (steps: number = 1): Promise<{ state: BoardState; ticks: number; halted: boolean }> => {
+    const response = await api.post('/tick', null, { params: { steps } });
+    const result: TickResult = response.data;
+    // The delta only applies to the state it was taken from; otherwise fetch what changed since ours
+    const state = lastBoardState && lastBoardState.version === result.since
+        ? (lastBoardState = applyDelta(lastBoardState, result))
+        : await getBoardState();
+    return { state, ticks: result.ticks, halted: result.halted };
+};
+
 export const resetBoard = async () => {
     try {
         await api.post('/reset');
@@ -10,14 +10,19 @@ import {
     CaretLeftOutlined,
     CaretRightOutlined,
     PlayCircleOutlined,
+    StepForwardOutlined,
     RobotOutlined
 } from '@ant-design/icons';
 
+// Ticks one press of Fast Forward advances the board by
+export const FAST_FORWARD_TICKS = 20;
+
 interface ToolbarProps {
     onZoomIn: () => void;
     onZoomOut: () => void;
     onSlowDown: () => void;
     onSpeedUp: () => void;
+    onFastForward: () => void;
     onClearBoard: () => void;
     onResetMarbles: () => void;
     onTriggerLeft: () => void;
@@ -28,7 +33,7 @@ interface ToolbarProps {
     isAIVisible: boolean;
 }
 
-export const Toolbar: React.FC<ToolbarProps> = ({onZoomIn, onZoomOut, onSlowDown, onSpeedUp, onClearBoard, onResetMarbles, onTriggerLeft, onTriggerRight,onToggleAI, isRunning, currentSpeed, isAIVisible}) => {
+export const Toolbar: React.FC<ToolbarProps> = ({onZoomIn, onZoomOut, onSlowDown, onSpeedUp, onFastForward, onClearBoard, onResetMarbles, onTriggerLeft, onTriggerRight,onToggleAI, isRunning, currentSpeed, isAIVisible}) => {
     const speedOptions = [0.5, 1, 2, 5];
     return (
         <div style={{ padding: '8px' }}>
@@ -89,6 +94,17 @@ export const Toolbar: React.FC<ToolbarProps> = ({onZoomIn, onZoomOut, onSlowDown
                         </Button>
                     </Tooltip>
 
+                    <Tooltip title={`Advance the paused board ${FAST_FORWARD_TICKS} ticks at once`}>
+                        <Button
+                            icon={<StepForwardOutlined />}
+                            block
+                            onClick={onFastForward}
+                            disabled={isRunning}
+                        >
+                            Fast Forward
+                        </Button>
+                    </Tooltip>
+
                     <Divider style={{ margin: '12px 0' }} />
 
                     <Tooltip title="Remove all parts from the board">